@@ -0,0 +1,143 @@
+import json, sys, pathlib, concurrent.futures, requests
+from word_info_extractor import Word, WordNotAvailable
+
+
+def read_words(path) -> list:
+    """Returns the words of a word list (one per line) without
+    blank lines and repetitions, keeping their original order."""
+    with open(path, encoding="utf-8") as word_list:
+        words = (line.strip() for line in word_list)
+        return list(dict.fromkeys(word for word in words if word))
+
+
+def lookup(word_class: type, word: str) -> dict:
+    """Returns a JSON-serializable record with everything word_class
+    knows about word. Errors are stored in record["error"] instead of
+    being raised."""
+    record = {
+        "word": word,
+        "root": None,
+        "ipa": None,
+        "pronunciation_url": None,
+        "root_ipa": None,
+        "root_pronunciation_url": None,
+        "root_info": None,
+        "entry": None,
+        "inflections": [],
+        "error": None,
+    }
+    try:
+        result = word_class(word)
+        # the root page is only fetched (and can turn out to be unavailable) here
+        entry = result.root_entry
+    except WordNotAvailable as e:
+        record["error"] = str(e)
+        return record
+    except requests.exceptions.RequestException as e:
+        record["error"] = f"network: {e}"
+        return record
+    except Exception as e:
+        record["error"] = repr(e)
+        return record
+    record["root"] = result.root
+    record["ipa"] = result.ipa
+    record["pronunciation_url"] = result.pronunciation_url
+    record["root_ipa"] = result.root_ipa
+    record["root_pronunciation_url"] = result.root_pronunciation_url
+    record["root_info"] = result.root_info
+    # structured, so that consumers don't have to parse the formatted root_info
+    record["entry"] = entry.to_json()
+    if hasattr(result, "get_inflections"):
+        inflections = result.get_inflections()
+        if isinstance(inflections, str):
+            inflections = [inflections]
+        record["inflections"] = sorted(inflections)
+    return record
+
+
+def recorded_words(out_path) -> set:
+    """Returns the words that already have a record in out_path. A last
+    record that was cut off by a crash is removed from the file."""
+    path = pathlib.Path(out_path)
+    if not path.exists():
+        return set()
+    with open(path, "rb+") as out:
+        lines = out.read().split(b"\n")
+        # the file ends with a newline unless the last write didn't finish
+        if lines[-1]:
+            out.truncate(out.tell() - len(lines[-1]))
+    return {json.loads(line)["word"] for line in lines[:-1] if line}
+
+
+class Checkpoint:
+    """Set of words that were already looked up, persisted
+    in a file with one word per line.
+
+    Args:
+        path (str): checkpoint file path
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.done = set()
+        if self.path.exists():
+            self.done = set(self.path.read_text(encoding="utf-8").splitlines())
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def add(self, word: str):
+        self._file.write(word + "\n")
+        self._file.flush()
+        self.done.add(word)
+
+    def close(self):
+        self._file.close()
+
+
+def run_batch(words, word_class: type, out_path, workers=4, checkpoint_path=None):
+    """Looks up every word with a pool of workers and appends one JSON
+    record per word to out_path as soon as it is ready. Words listed in the
+    checkpoint file or already recorded in out_path are skipped, so an
+    interrupted run can be resumed by running it again. Words that failed with a network error get no record
+    and aren't checkpointed, so they are looked up again when resumed.
+
+    Args:
+        words (iterable): words to look up.
+        word_class (type): Word subclass used for the lookups.
+        out_path (str): JSONL output file.
+        workers (int, optional): number of concurrent lookups. Defaults to 4.
+        checkpoint_path (str, optional): defaults to out_path + ".checkpoint".
+
+    Returns:
+        int: number of words recorded in this run
+    """
+    checkpoint = Checkpoint(checkpoint_path or str(out_path) + ".checkpoint")
+    # records are written before their word is checkpointed, so a crash
+    # in between leaves words that are only found in out_path
+    for word in recorded_words(out_path) - checkpoint.done:
+        checkpoint.add(word)
+    pending = [word for word in words if word not in checkpoint.done]
+    done = 0
+    retried = []
+    executor = concurrent.futures.ThreadPoolExecutor(workers)
+    try:
+        with open(out_path, "a", encoding="utf-8") as out:
+            futures = [executor.submit(lookup, word_class, word) for word in pending]
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                # network errors are not definitive, so those words are
+                # tried again when the batch is resumed, and only recorded then
+                if (record["error"] or "").startswith("network:"):
+                    retried.append(record["word"])
+                else:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    checkpoint.add(record["word"])
+                    done += 1
+                print(f"\r{done + len(retried)}/{len(pending)}", end="", file=sys.stderr)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        checkpoint.close()
+        print(file=sys.stderr)
+    if retried:
+        print(f"Network errors, run again to look up: {', '.join(retried)}", file=sys.stderr)
+    return done
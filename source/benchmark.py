@@ -0,0 +1,191 @@
+import argparse, json, pathlib, re, sys, time, urllib.parse
+from utils import make_soup
+from metrics import percentile
+from word_info_extractor import (
+    DEWiktionaryWord,
+    ENWiktionaryWord,
+    LAWiktionaryWord,
+    FRWiktionaryWord,
+    ENRUWiktionaryWord,
+    DWDSWord,
+    DudenWord,
+    ENDictionaryWord,
+    BRDicioWord,
+)
+
+# recorded pages, stored like the test fixtures: <host of base_url>/<word>.html
+CORPUS_DIR = pathlib.Path(__file__).parent / "tests" / "fixtures"
+CORPUS = (
+    (DEWiktionaryWord, "gehen"),
+    (DEWiktionaryWord, "ging"),
+    (ENWiktionaryWord, "house"),
+    (LAWiktionaryWord, "domus"),
+    (FRWiktionaryWord, "chat"),
+    (FRWiktionaryWord, "chats"),
+    (ENRUWiktionaryWord, "дом"),
+    (DWDSWord, "Stuhl"),
+    (DudenWord, "Stuhl"),
+    (ENDictionaryWord, "house"),
+    (BRDicioWord, "bola"),
+)
+BASELINE_PATH = pathlib.Path(__file__).parent / ".benchmark_baseline.json"
+PHASES = ("parse", "isolate", "extract")
+# their _get_pronunciation looks the word up in another source
+NETWORK_PRONUNCIATION = (ENDictionaryWord,)
+# copies of the page content in the "large" variant of each page, which
+# stands for the entries of very common words (dozens of languages and senses)
+LARGE_COPIES = 200
+
+
+def corpus_page(word_class: type, word: str) -> bytes:
+    host = urllib.parse.urlparse(word_class.base_url).netloc
+    return (CORPUS_DIR / host / f"{word}.html").read_bytes()
+
+
+def enlarge(content: bytes, copies: int) -> bytes:
+    """Returns the page with the content of its <body> repeated copies times"""
+    match = re.search(rb"<body[^>]*>(.*)</body>", content, re.DOTALL)
+    start, end = match.span(1)
+    return content[:start] + match[1] * copies + content[end:]
+
+
+def extract(word_class: type, word: str, page):
+    """Runs everything a lookup extracts from a page, without requests.
+
+    Returns:
+        Entry: the definitions found in page
+    """
+    instance = word_class.__new__(word_class)
+    instance.word = word
+    instance.root, instance.root_page = word, page
+    entry = instance._get_info(page)
+    if not isinstance(instance, NETWORK_PRONUNCIATION):
+        instance._get_pronunciation(page)
+    instance._is_inflection_without_own_definition(page)
+    instance.get_inflections()
+    return entry
+
+
+def time_page(word_class: type, word: str, content: bytes) -> dict:
+    """Returns the seconds each phase took to process content"""
+    timings = {}
+    start = time.perf_counter()
+    page = make_soup(content, "utf-8")
+    timings["parse"] = time.perf_counter() - start
+    start = time.perf_counter()
+    page = word_class._only_relevant_part(page)
+    timings["isolate"] = time.perf_counter() - start
+    start = time.perf_counter()
+    extract(word_class, word, page)
+    timings["extract"] = time.perf_counter() - start
+    return timings
+
+
+def run(repeat=10, large_copies=LARGE_COPIES, only=None) -> dict:
+    """Times every page of CORPUS and its large variant.
+
+    Args:
+        repeat (int, optional): times each page is processed.
+        large_copies (int, optional): size of the large variants (0 to skip them).
+        only (str, optional): name of the only Word class to benchmark.
+
+    Returns:
+        dict: {"Class/word/variant": {"bytes": size, phase: {"p50", "p95", "p99", "mean"}}}
+    """
+    results = {}
+    for word_class, word in CORPUS:
+        if only and word_class.__name__ != only:
+            continue
+        content = corpus_page(word_class, word)
+        variants = {"page": content}
+        if large_copies:
+            variants["large"] = enlarge(content, large_copies)
+        for variant, variant_content in variants.items():
+            samples = {phase: [] for phase in PHASES}
+            for _ in range(repeat):
+                for phase, seconds in time_page(word_class, word, variant_content).items():
+                    samples[phase].append(seconds)
+            result = {"bytes": len(variant_content)}
+            for phase, phase_samples in samples.items():
+                result[phase] = {
+                    "p50": percentile(phase_samples, 0.5),
+                    "p95": percentile(phase_samples, 0.95),
+                    "p99": percentile(phase_samples, 0.99),
+                    "mean": sum(phase_samples) / len(phase_samples),
+                }
+            results[f"{word_class.__name__}/{word}/{variant}"] = result
+    return results
+
+
+def regressions(results: dict, baseline: dict, threshold: float, min_delta=0.0002) -> list:
+    """Returns a description of every phase whose median is more than
+    threshold (0.25 = 25%) slower than in baseline. Differences under
+    min_delta seconds are ignored, they are timer noise.
+
+    Returns:
+        list: lines like "DudenWord/Stuhl/page extract: 1.20ms -> 2.00ms (+67%)"
+    """
+    found = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for phase in PHASES:
+            before, after = baseline[key][phase]["p50"], result[phase]["p50"]
+            if after > before * (1 + threshold) and after - before > min_delta:
+                found.append(
+                    f"{key} {phase}: {before * 1000:.2f}ms -> {after * 1000:.2f}ms"
+                    f" (+{(after / before - 1) * 100:.0f}%)"
+                )
+    return found
+
+
+def report(results: dict) -> str:
+    """Returns a table with the percentiles and throughput of every page"""
+    lines = [
+        f"{'page':<34}{'KB':>8}"
+        + "".join(f"{phase + ' p50/p95/p99 (ms)':>30}" for phase in PHASES)
+        + f"{'pages/s':>10}{'MB/s':>8}"
+    ]
+    for key, result in results.items():
+        line = f"{key:<34}{result['bytes'] / 1024:>8.1f}"
+        for phase in PHASES:
+            percentiles = "/".join(f"{result[phase][p] * 1000:.2f}" for p in ("p50", "p95", "p99"))
+            line += f"{percentiles:>30}"
+        total = sum(result[phase]["mean"] for phase in PHASES)
+        line += f"{1 / total:>10.1f}{result['bytes'] / total / 1e6:>8.2f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Time the extractors on the recorded pages, without network"
+    )
+    arg_parser.add_argument("-n", "--repeat", type=int, default=10, help="runs per page")
+    arg_parser.add_argument(
+        "--large-copies", type=int, default=LARGE_COPIES, help="size of the large pages (0 skips them)"
+    )
+    arg_parser.add_argument("--only", help="only benchmark this Word class")
+    arg_parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    arg_parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as the new baseline"
+    )
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="fail if a median is this much slower than the baseline (0.25 = 25%%)",
+    )
+    args = arg_parser.parse_args()
+    results = run(args.repeat, args.large_copies, args.only)
+    print(report(results))
+    baseline_path = pathlib.Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=1))
+        print(f"baseline saved to {baseline_path}")
+    elif baseline_path.exists():
+        slower = regressions(results, json.loads(baseline_path.read_text()), args.threshold)
+        if slower:
+            print("\nREGRESSIONS:\n" + "\n".join(slower))
+            sys.exit(1)
+        print("\nno regression")
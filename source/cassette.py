@@ -0,0 +1,174 @@
+import base64, contextlib, datetime, gzip, json, os, pathlib, threading, time
+import requests
+from requests.structures import CaseInsensitiveDict
+from utils import CONFIG_PARSER
+
+MODES = ("replay", "record", "once")
+# the recorded body is already decoded and its length may have changed
+DROPPED_HEADERS = ("Content-Encoding", "Transfer-Encoding", "Content-Length")
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Raised in replay mode for a request that isn't in the cassette.
+    It isn't a ConnectionError, so NeverSayNeverSession doesn't retry it."""
+
+
+class Cassette:
+    """Recorded HTTP exchanges, one per (method, url), stored as JSON
+    (gzip-compressed if path ends with .gz).
+
+    Args:
+        path (str): cassette file. It doesn't have to exist yet.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.exchanges = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self._open("rt") as file:
+                for exchange in json.load(file)["exchanges"]:
+                    self.exchanges[(exchange["method"], exchange["url"])] = exchange
+
+    def _open(self, mode, path=None):
+        path = path or self.path
+        if str(self.path).endswith(".gz"):
+            return gzip.open(path, mode, encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    def get(self, method: str, url: str):
+        """Returns the recorded exchange of (method, url) or None"""
+        with self._lock:
+            return self.exchanges.get((method, url))
+
+    def put(self, request: requests.PreparedRequest, response: requests.Response):
+        """Records response as the answer to request and saves the cassette"""
+        body = response.content or b""
+        try:
+            body, body_encoding = body.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, body_encoding = base64.b64encode(body).decode("ascii"), "base64"
+        exchange = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.title() not in DROPPED_HEADERS
+            },
+            "encoding": response.encoding,
+            "body": body,
+            "body_encoding": body_encoding,
+            "elapsed": response.elapsed.total_seconds(),
+        }
+        with self._lock:
+            self.exchanges[(request.method, request.url)] = exchange
+            self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = self.path.with_name(self.path.name + f".{threading.get_ident()}.part")
+        with self._open("wt", partial_path) as file:
+            json.dump({"exchanges": list(self.exchanges.values())}, file, ensure_ascii=False, indent=1)
+        os.replace(partial_path, self.path)
+
+
+class CassetteAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter that answers requests from a Cassette.
+
+    Args:
+        cassette (Cassette): where the exchanges are recorded.
+        mode (str, optional): "replay" only answers from the cassette,
+            "record" always uses the network and records the answers,
+            "once" records what isn't in the cassette yet and replays the rest.
+        latency (float or str, optional): seconds to wait before each replayed
+            answer, or "recorded" to wait as long as the recorded request took.
+        real_adapter (requests.adapters.BaseAdapter, optional): adapter used to
+            record. Defaults to a new HTTPAdapter.
+    """
+
+    def __init__(self, cassette: Cassette, mode="once", latency=None, real_adapter=None):
+        super().__init__()
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, not {mode!r}")
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.real_adapter = real_adapter or requests.adapters.HTTPAdapter()
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        exchange = None if self.mode == "record" else self.cassette.get(request.method, request.url)
+        if exchange is not None:
+            return self._replay(request, exchange)
+        if self.mode == "replay":
+            raise CassetteMiss(f"{request.method} {request.url} is not in {self.cassette.path}", request=request)
+        response = self.real_adapter.send(request, **kwargs)
+        self.cassette.put(request, response)
+        return response
+
+    def _replay(self, request: requests.PreparedRequest, exchange: dict) -> requests.Response:
+        if self.latency == "recorded":
+            time.sleep(exchange["elapsed"])
+        elif self.latency:
+            time.sleep(float(self.latency))
+        response = requests.Response()
+        response.request = request
+        response.connection = self
+        response.url = exchange["url"]
+        response.status_code = exchange["status"]
+        response.reason = exchange["reason"]
+        response.headers = CaseInsensitiveDict(exchange["headers"])
+        response.encoding = exchange["encoding"]
+        response.elapsed = datetime.timedelta(seconds=exchange["elapsed"])
+        if exchange["body_encoding"] == "base64":
+            response._content = base64.b64decode(exchange["body"])
+        else:
+            response._content = exchange["body"].encode("utf-8")
+        return response
+
+    def close(self):
+        self.real_adapter.close()
+
+
+def mount_cassette(session: requests.Session, path, mode="once", latency=None) -> Cassette:
+    """Makes every request of session go through the cassette at path,
+    whatever adapter it used before (the host-specific ones included).
+
+    Returns:
+        Cassette: the mounted cassette
+    """
+    cassette = Cassette(path)
+    for prefix, adapter in list(session.adapters.items()):
+        session.mount(prefix, CassetteAdapter(cassette, mode, latency, real_adapter=adapter))
+    return cassette
+
+
+@contextlib.contextmanager
+def use_cassette(session: requests.Session, path, mode="once", latency=None):
+    """Temporary mount_cassette(), for tests and benchmarks.
+    >>> with use_cassette(SESSION, "tests/cassettes/lookups.json.gz", "replay"):
+    ...     DEWiktionaryWord("ging")
+    """
+    previous_adapters = session.adapters.copy()
+    try:
+        yield mount_cassette(session, path, mode, latency)
+    finally:
+        session.adapters = previous_adapters
+
+
+def cassette_from_config(session: requests.Session):
+    """Mounts the cassette set by "cassette = <path>" in the config file
+    on session ("cassette_mode" and "cassette_latency" are optional).
+
+    Returns:
+        Cassette or None: the mounted cassette
+    """
+    config = CONFIG_PARSER["DEFAULT"]
+    if not config.get("cassette"):
+        return None
+    latency = config.get("cassette_latency")
+    if latency and latency != "recorded":
+        latency = float(latency)
+    return mount_cassette(session, config["cassette"], config.get("cassette_mode", "once"), latency)
@@ -0,0 +1,195 @@
+import re, itertools
+
+
+class Section:
+    """One part of a dictionary entry, usually one part of speech.
+
+    Args:
+        grammar (str, optional): grammatical header, like "Noun" or "Verb, Deutsch".
+        headline (str, optional): line with the forms of the word, like "house (plural houses)".
+        senses (iterable, optional): (number, definition) pairs; number may be "".
+        examples (iterable, optional): (number, example) pairs, number being
+            the one of the sense the example illustrates.
+    """
+
+    __slots__ = ("grammar", "headline", "senses", "examples")
+
+    def __init__(self, grammar="", headline="", senses=(), examples=()):
+        self.grammar = grammar
+        self.headline = headline
+        self.senses = tuple(tuple(sense) for sense in senses)
+        self.examples = tuple(tuple(example) for example in examples)
+
+    def __eq__(self, other):
+        return isinstance(other, Section) and self.to_json() == other.to_json()
+
+    def __repr__(self):
+        return f"Section({self.grammar!r}, {self.headline!r}, {len(self.senses)} senses)"
+
+    def to_json(self) -> list:
+        return [self.grammar, self.headline, self.senses, self.examples]
+
+    @classmethod
+    def from_json(cls, data: list):
+        return cls(*data)
+
+
+class Entry:
+    """What a Word extracted from a dictionary page, kept as data and only
+    turned into text by render(), so that programs which don't print it
+    never pay for the formatting.
+
+    Args:
+        layout (str): name of the text layout in LAYOUTS, which mimics the site.
+        sections (iterable): Sections of the entry, in page order.
+        hidden_word (str, optional): word replaced by "_" when rendering with show_word=False.
+    """
+
+    __slots__ = ("layout", "sections", "hidden_word")
+
+    def __init__(self, layout: str, sections=(), hidden_word=""):
+        self.layout = layout
+        self.sections = tuple(sections)
+        self.hidden_word = hidden_word
+
+    def __eq__(self, other):
+        return isinstance(other, Entry) and self.to_json() == other.to_json()
+
+    def __repr__(self):
+        return f"Entry({self.layout!r}, {self.sections!r})"
+
+    @property
+    def shows_pronunciation(self) -> bool:
+        return self.layout in PRONUNCIATION_LAYOUTS
+
+    def render(self, show_word=True, title="", pronunciation=("", "")) -> str:
+        """Returns the entry as the text shown to the user.
+
+        Args:
+            show_word (bool, optional): when False, self.hidden_word is replaced by "_".
+            title (str, optional): word shown above the definitions by the layouts that have one.
+            pronunciation (tuple, optional): (ipa, audio url) shown under the title.
+
+        Returns:
+            str: formatted entry
+        """
+        text = LAYOUTS[self.layout](self, title, pronunciation)
+        if not show_word and self.hidden_word:
+            text = text.replace(self.hidden_word, "_")
+        return text
+
+    def to_json(self) -> dict:
+        return {
+            "layout": self.layout,
+            "hidden_word": self.hidden_word,
+            "sections": [section.to_json() for section in self.sections],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict):
+        sections = [Section.from_json(section) for section in data["sections"]]
+        return cls(data["layout"], sections, data["hidden_word"])
+
+
+def numbered(number: str, text: str, separator=" ") -> str:
+    """Returns text preceded by [number], or just text without a number"""
+    return f"[{number}]{separator}{text}" if number else text
+
+
+def _render_wiktionary(entry: Entry, title, pronunciation) -> str:
+    info = ""
+    for section in entry.sections:
+        definitions = []
+        grammar = section.grammar.upper()
+        # prevents repeating information
+        if grammar not in info:
+            definitions.append(grammar)
+        if section.headline:
+            definitions.append(section.headline)
+        definitions += [numbered(*sense) for sense in section.senses]
+        examples = [numbered(*example) for example in section.examples]
+        info += "\n\n" + "\n".join(definitions)
+        if examples:
+            info += "\n\nEXAMPLES:\n" + "\n".join(examples)
+        info += "\n"
+    return re.sub(r"\n_\n", "\n", info)
+
+
+def _render_de_wiktionary(entry: Entry, title, pronunciation) -> str:
+    result = ""
+    for section in entry.sections:
+        info = section.grammar + "\n"
+        if section.senses:
+            info += "\n" + "\n".join(numbered(*sense) for sense in section.senses)
+        if section.examples:
+            info += "\n" * 2 + "\n".join(numbered(*example) for example in section.examples)
+        result += info + "\n"
+    return result
+
+
+def _render_fr_wiktionary(entry: Entry, title, pronunciation) -> str:
+    info = ""
+    for section in entry.sections:
+        info += "\n\n" + section.grammar.upper() + "\n" + section.headline.strip() + "\n"
+        definitions = "".join(
+            numbered(number, text, "").strip() + "\n" for number, text in section.senses
+        )
+        # the examples of each sense are stripped together
+        examples = ""
+        for number, sense_examples in itertools.groupby(section.examples, lambda pair: pair[0]):
+            sense_examples = [numbered(number, example, "") for _, example in sense_examples]
+            examples += "\n".join(sense_examples).strip() + "\n"
+        info += "\n" + definitions + "\n\n" + examples
+    return info
+
+
+def _render_dictionary(entry: Entry, title, pronunciation, indent_long_numbers=False) -> str:
+    definitions = []
+    examples = []
+    for section in entry.sections:
+        for number, text in section.senses:
+            indentation = " " if indent_long_numbers and len(number) > 1 else ""
+            definitions.append(indentation + numbered(number, text))
+        examples += [numbered(*example) for example in section.examples]
+    info = "\n".join(definitions)
+    if examples:
+        info += "\n\nEXAMPLES:\n" + "\n".join(examples)
+    ipa, pronunciation_url = pronunciation
+    audio_section = f"Phonetics: {ipa} {pronunciation_url}" if pronunciation_url else ""
+    return f"{title}\n{audio_section}\n{info}"
+
+
+def _render_dwds(entry: Entry, title, pronunciation) -> str:
+    # sub-senses (like 1a) are indented, and so are the senses from 10 on
+    return _render_dictionary(entry, title, pronunciation, indent_long_numbers=True)
+
+
+def _render_dictionary_com(entry: Entry, title, pronunciation) -> str:
+    definitions_text = f"{title}\n"
+    examples_text = ""
+    for section in entry.sections:
+        if section.grammar:
+            definitions_text += "\n" + section.grammar + "\n"
+        definitions_text += "".join(text + "\n" for _, text in section.senses)
+        examples_text += "".join(text + "\n" for _, text in section.examples)
+    return f"{definitions_text}\n\nEXAMPLES\n{examples_text}"
+
+
+def _render_lines(entry: Entry, title, pronunciation) -> str:
+    return "".join(
+        numbered(*sense) + "\n" for section in entry.sections for sense in section.senses
+    )
+
+
+# text layouts of the entries, named after the sites whose format they reproduce
+LAYOUTS = {
+    "wiktionary": _render_wiktionary,
+    "de.wiktionary": _render_de_wiktionary,
+    "fr.wiktionary": _render_fr_wiktionary,
+    "dictionary": _render_dictionary,
+    "dwds": _render_dwds,
+    "dictionary.com": _render_dictionary_com,
+    "lines": _render_lines,
+}
+# layouts that use the pronunciation given to Entry.render
+PRONUNCIATION_LAYOUTS = {"dictionary", "dwds"}
@@ -0,0 +1,123 @@
+import re, sqlite3, pathlib
+from sentences import sentence_offsets
+
+INSERT_BATCH_SIZE = 1000
+# bumped when the way texts are split into sentences changes,
+# which makes indexes built before out of date
+SENTENCE_RULES_VERSION = 3
+
+
+def sentence_units(data, language=None):
+    """Yields (offset in bytes, decoded sentence) for every sentence of data.
+
+    Args:
+        data (bytes, mmap.mmap or str): text of a book, UTF-8 if it isn't a str.
+        language (str, optional): language code, for its abbreviations.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    sentences = sentence_offsets(data, language)
+    for i in range(len(sentences)):
+        start, end = sentences[i]
+        yield start, data[start:end].decode("utf-8", errors="replace")
+
+
+def match_query(phrases) -> str:
+    """Returns an FTS5 query matching any of phrases"""
+    return " OR ".join(
+        '"' + phrase.replace('"', '""') + '"' for phrase in phrases if re.search(r"\w", phrase)
+    )
+
+
+class SentenceIndex:
+    """Full-text index (SQLite FTS5) of the sentences of the books of one
+    language, so that example searches only look at the sentences that
+    contain the words instead of scanning every book.
+    Matching ignores case but not accents, so the candidates it returns
+    include every sentence ExampleMatcher can find an example in.
+
+    Args:
+        path (str): path of the SQLite database.
+        language (str, optional): language of the books, which decides where sentences end.
+    """
+
+    def __init__(self, path, language=None):
+        self.path = pathlib.Path(path)
+        self.language = language
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version != SENTENCE_RULES_VERSION:
+            self._connection.executescript(
+                f"""
+                DROP TABLE IF EXISTS sentences;
+                DROP TABLE IF EXISTS books;
+                PRAGMA user_version = {SENTENCE_RULES_VERSION};
+                """
+            )
+        self._connection.executescript(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS sentences USING fts5 (
+                sentence,
+                book UNINDEXED,
+                offset UNINDEXED,
+                tokenize = "unicode61 remove_diacritics 0"
+            );
+            CREATE TABLE IF NOT EXISTS books (
+                name TEXT PRIMARY KEY,
+                stamp TEXT NOT NULL
+            );
+            """
+        )
+
+    @staticmethod
+    def stamp(path) -> str:
+        """Returns what identifies the version of a book file"""
+        stat = pathlib.Path(path).stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def books(self) -> dict:
+        """Returns {book name: stamp of the indexed version}"""
+        return dict(self._connection.execute("SELECT name, stamp FROM books"))
+
+    def add(self, name: str, data, stamp: str):
+        """Indexes the sentences of a book (see sentence_units), replacing its previous version"""
+        with self._connection:
+            self._delete(name)
+            batch = []
+            for offset, sentence in sentence_units(data, self.language):
+                batch.append((sentence, name, offset))
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+            self._connection.execute("INSERT INTO books (name, stamp) VALUES (?, ?)", (name, stamp))
+
+    def _insert(self, batch):
+        self._connection.executemany(
+            "INSERT INTO sentences (sentence, book, offset) VALUES (?, ?, ?)", batch
+        )
+
+    def remove(self, name: str):
+        with self._connection:
+            self._delete(name)
+
+    def _delete(self, name: str):
+        self._connection.execute("DELETE FROM sentences WHERE book = ?", (name,))
+        self._connection.execute("DELETE FROM books WHERE name = ?", (name,))
+
+    def book_candidates(self, name: str, phrases):
+        """Yields the sentences of a book containing any of phrases, in its
+        order. They are only read from the database as they're consumed."""
+        query = match_query(phrases)
+        if not query:
+            return
+        # the sentences of a book are inserted together, in its order
+        rows = self._connection.execute(
+            "SELECT sentence FROM sentences WHERE sentences MATCH ? AND book = ? ORDER BY rowid",
+            (query, name),
+        )
+        for (sentence,) in rows:
+            yield sentence
+
+    def close(self):
+        self._connection.close()
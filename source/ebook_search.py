@@ -1,16 +1,314 @@
-import os, pathlib, re, termcolor, ebooklib, bs4, ast, fitz, logging
+import os, pathlib, re, sys, termcolor, bs4, ast, logging, time, threading, heapq, itertools, mmap, concurrent.futures, cachetools
 from pathlib import Path
-from ipdb import set_trace as s
 from utils import VALID_LANGUAGE_CODES
 from utils import *
+from ebook_index import SentenceIndex
+from sentences import SentenceCursor, sentence_offsets
 
 EBOOK_DIR = Path(__file__).parent / "ebooks"
 
 
+# megabytes of books kept in memory ("ebook_memory_budget" in the config file)
+EBOOK_MEMORY_BUDGET = 256
+# processes searching the books that aren't indexed ("ebook_workers" in the
+# config file), 0 for one per core
+EBOOK_WORKERS = 0
+# tasks per worker the books are partitioned into, so that the workers that
+# got the small books take more of them while the big ones are searched
+TASKS_PER_WORKER = 4
+# examples shown by "examples" ("examples_limit" in the config file), 0 for all
+EXAMPLES_LIMIT = 10
+# matches read from each book for every example shown, which are ranked
+CANDIDATES_PER_EXAMPLE = 4
+# length (in characters) of the sentences ranked first: shorter ones lack
+# context, longer ones are hard to read
+IDEAL_EXAMPLE_LENGTH = 80
+# workers are forked by a server process, which has none of the threads, locks
+# and SQLite connections of the program. Where there's none (Windows) the
+# books are searched by the calling process
+POOL_START_METHOD = "forkserver"
+
+
 class WrongFileType(Exception):
     pass
 
 
+def book_size(book: tuple) -> int:
+    """Returns the bytes a (data, SentenceOffsets) book takes in memory.
+    The text of a mapped book is in the page cache, not in the process,
+    so it's mostly its offsets (8 bytes per sentence)."""
+    data, sentences = book
+    return sys.getsizeof(data) + sentences.nbytes
+
+
+def partition_books(sizes: dict, parts: int) -> list:
+    """Splits books into about parts tasks of similar size: a book bigger
+    than the size of a task is one by itself, smaller ones are grouped.
+
+    Args:
+        sizes (dict): {book name: size in bytes}.
+        parts (int): number of tasks wanted.
+
+    Returns:
+        list: [[book name, ...], ...], the biggest tasks first
+    """
+    target = sum(sizes.values()) / max(parts, 1)
+    tasks, task, task_size = [], [], 0
+    for name in sorted(sizes, key=sizes.get, reverse=True):
+        if task and task_size + sizes[name] > target:
+            tasks.append(task)
+            task, task_size = [], 0
+        task.append(name)
+        task_size += sizes[name]
+    if task:
+        tasks.append(task)
+    return tasks
+
+
+def _search_books(books: list, words: tuple, count=None) -> list:
+    """Searches books whole, in a worker process.
+
+    Args:
+        books (list): [(language, path, SentenceOffsets or None if they're not known yet), ...].
+        words (tuple): inflections, as given to get_examples.
+        count (int, optional): matches searched in each book. Defaults to all of them.
+
+    Returns:
+        list: [(matches, SentenceOffsets if they were split or None, seconds, bytes searched), ...],
+        matches being what ExampleMatcher.matches yields
+    """
+    matcher = ExampleMatcher(words)
+    results = []
+    for language, path, sentences in books:
+        start = time.perf_counter()
+        data = map_book(path)
+        new_sentences = None
+        # with a count, the books that aren't split are only split as far as they're searched
+        if sentences is None and count is None:
+            sentences = new_sentences = sentence_offsets(data, language)
+        matches = list(itertools.islice(matcher.matches(data, sentences, language), count))
+        results.append((matches, new_sentences, time.perf_counter() - start, len(data)))
+    return results
+
+
+def _timed(matches, phase: str, size=0):
+    """Yields from matches, recording the time spent searching them as
+    ("ebooks", phase), without the time spent reading them"""
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            match = next(matches, None)
+            seconds += time.perf_counter() - start
+            if match is None:
+                return
+            yield match
+    finally:
+        METRICS.record("ebooks", phase, seconds, size)
+
+
+def map_book(path):
+    """Returns the UTF-8 text of the file at path, mapped in memory
+    read-only: its pages are read when searched, and shared through the
+    page cache by every process that maps the same file."""
+    with open(path, "rb") as file:
+        # an empty file can't be mapped
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class EbookLibrary:
+    """The converted books of EBOOK_DIR (<language>/<name>.txt), registered
+    by path and only mapped (see map_book) and split into sentences when
+    the examples of their language are searched. Mapped books stay open
+    until their sentence offsets exceed the memory budget, then the least
+    recently searched ones are dropped.
+    >>> library = EbookLibrary.from_directory(EBOOK_DIR)
+    >>> for name, examples in library.examples("de", inflections):
+    ...     print(name, examples)
+
+    Args:
+        paths (dict): {language: {book name: path of the txt file}}.
+        memory_budget (int, optional): bytes of books kept in memory, see book_size.
+        directory (str, optional): where the sentence indexes are (<language>.sqlite).
+        workers (int, optional): processes searching the books that aren't
+            indexed. With 1, they are searched by the calling process.
+    """
+
+    def __init__(self, paths: dict, memory_budget=EBOOK_MEMORY_BUDGET * 2**20, directory=EBOOK_DIR, workers=1):
+        self.paths = paths
+        self.directory = pathlib.Path(directory)
+        # {language: SentenceIndex or None}
+        self._indexes = {}
+        self.memory_budget = memory_budget
+        self.workers = workers
+        self._pool = None
+        # {(language, name): (mmap.mmap, SentenceOffsets)}
+        self._books = cachetools.LRUCache(memory_budget, getsizeof=book_size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_directory(cls, directory=EBOOK_DIR, memory_budget=None, workers=None):
+        """Registers the books of directory without reading them"""
+        paths = {}
+        for language_dir in sorted(pathlib.Path(directory).glob("*")):
+            if language_dir.is_dir():
+                paths[language_dir.name] = {
+                    path.stem: path for path in sorted(language_dir.glob("*.txt"))
+                }
+        if memory_budget is None:
+            memory_budget = (
+                float(CONFIG_PARSER["DEFAULT"].get("ebook_memory_budget", EBOOK_MEMORY_BUDGET))
+                * 2**20
+            )
+        if workers is None:
+            workers = int(CONFIG_PARSER["DEFAULT"].get("ebook_workers", EBOOK_WORKERS))
+        return cls(paths, int(memory_budget), directory, workers or os.cpu_count() or 1)
+
+    def names(self, language: str) -> list:
+        return list(self.paths.get(language, {}))
+
+    def book(self, language: str, name: str) -> tuple:
+        """Returns the mapped UTF-8 text of the book and its sentences,
+        mapping and splitting it if it isn't in memory"""
+        book = self._cached(language, name)
+        if book is not None:
+            return book
+        start = time.perf_counter()
+        data = map_book(self.paths[language][name])
+        book = (data, sentence_offsets(data, language))
+        METRICS.record("ebooks", "load", time.perf_counter() - start, len(data))
+        self._keep(language, name, book)
+        return book
+
+    def _cached(self, language: str, name: str):
+        """Returns the book if it's in memory, or None"""
+        with self._lock:
+            return self._books.get((language, name))
+
+    def _keep(self, language: str, name: str, book: tuple):
+        # a book bigger than the whole budget is split every time
+        if book_size(book) <= self.memory_budget:
+            with self._lock:
+                self._books[(language, name)] = book
+
+    def index_path(self, language: str) -> pathlib.Path:
+        """Returns where the SentenceIndex of language is stored"""
+        return self.directory / f"{language}.sqlite"
+
+    def _index(self, language: str):
+        """Returns the SentenceIndex of language, or None if it wasn't built"""
+        if language not in self._indexes:
+            path = self.index_path(language)
+            self._indexes[language] = SentenceIndex(path) if path.exists() else None
+        return self._indexes[language]
+
+    def examples(self, language: str, words, limit=None):
+        """Yields (name, example) for the examples of words in the books of
+        language, with the inflections in red (see rank_examples).
+        Books whose current version is in the SentenceIndex of language are
+        only searched in the sentences containing words, the other ones are
+        mapped and searched whole, by the worker processes if there are
+        several, as they finish.
+
+        Args:
+            language (str): language code.
+            words (iterable): inflections, as given to get_examples.
+            limit (int, optional): number of examples, the best of the first
+                CANDIDATES_PER_EXAMPLE * limit matches of every book. Defaults to all of them.
+        """
+        count = limit * CANDIDATES_PER_EXAMPLE if limit else None
+        for name, (sentence, spans) in rank_examples(self._matches(language, words, count), limit):
+            yield name, color_spans(sentence, spans)
+
+    def _matches(self, language: str, words, count=None):
+        """Yields (name, matches) for every book of language, matches
+        being what ExampleMatcher.matches yields, at most count of them"""
+        words = tuple([words]) if isinstance(words, str) else tuple(words)
+        index = self._index(language)
+        indexed = {}
+        if index is not None:
+            start = time.perf_counter()
+            indexed = index.books()
+            METRICS.record("ebooks", "index", time.perf_counter() - start)
+        matcher = ExampleMatcher(words)
+        whole = []
+        for name, path in self.paths.get(language, {}).items():
+            if indexed.get(name) == SentenceIndex.stamp(path):
+                sentences = index.book_candidates(name, index_phrases(words))
+                matches = (
+                    (sentence, spans) for sentence in sentences for spans in matcher.sentence_matches(sentence)
+                )
+                yield name, _timed(itertools.islice(matches, count), "index")
+            else:
+                whole.append(name)
+        pool = self._executor() if len(whole) > 1 else None
+        if pool is None:
+            for name in whole:
+                yield name, self._book_matches(language, name, matcher, count)
+            return
+        paths = self.paths[language]
+        sizes = {name: paths[name].stat().st_size for name in whole}
+        futures = {}
+        for task in partition_books(sizes, self.workers * TASKS_PER_WORKER):
+            # the workers don't keep anything, the sentences they split are kept here
+            books = []
+            for name in task:
+                book = self._cached(language, name)
+                books.append((language, paths[name], book and book[1]))
+            futures[pool.submit(_search_books, books, words, count)] = task
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                for name, (matches, sentences, seconds, size) in zip(futures[future], future.result()):
+                    if sentences is not None:
+                        self._keep(language, name, (map_book(paths[name]), sentences))
+                    METRICS.record("ebooks", "examples", seconds, size)
+                    yield name, matches
+        finally:
+            # the caller stopped reading the examples
+            for future in futures:
+                future.cancel()
+
+    def _book_matches(self, language: str, name: str, matcher, count=None):
+        """Returns the matches of a whole book, at most count of them"""
+        book = self._cached(language, name)
+        if book is None and count is not None:
+            # only split as far as the matches are read
+            data = map_book(self.paths[language][name])
+            matches = matcher.matches(data, language=language)
+        else:
+            data, sentences = book or self.book(language, name)
+            matches = matcher.matches(data, sentences)
+        return _timed(itertools.islice(matches, count), "examples", len(data))
+
+    def _executor(self):
+        """Returns the pool of worker processes, started by the first search
+        that needs it and reused by the next ones, or None if there's one worker"""
+        import multiprocessing
+
+        if self.workers <= 1 or POOL_START_METHOD not in multiprocessing.get_all_start_methods():
+            return None
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(POOL_START_METHOD)
+                # imported once by the server instead of by every worker
+                context.set_forkserver_preload([__name__])
+                self._pool = concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context)
+            return self._pool
+
+    def close(self):
+        """Stops the worker processes and closes the sentence indexes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        for index in self._indexes.values():
+            if index is not None:
+                index.close()
+        self._indexes = {}
+
+
 def setup_ebooks():
     try:
         for language in VALID_LANGUAGE_CODES:
@@ -30,6 +328,9 @@ def setup_ebooks():
                     with open(ebook_path, "r") as txt:
                         ebook_txt = txt.read()
                 elif ebook_path.endswith("pdf"):
+                    # PyMuPDF takes a while to import, only conversions need it
+                    import fitz
+
                     with open(ebook_path, "rb") as pdf:
                         viewer = fitz.open(pdf)
                         common_stuff = set()
@@ -43,10 +344,13 @@ def setup_ebooks():
                 ebook_txt_path.write_text(ebook_txt)
     except KeyError as e:
         pass
+    index_ebooks()
 
 
 def epub_to_bs(epub_path: str):
     """Picks all EpubHtmls from the epub file and returns a nice BeautifulSoup object with them"""
+    import ebooklib.epub
+
     book = ebooklib.epub.read_epub(epub_path, options={"ignore_ncx": True})
     book_items = book.get_items()
     ugly_book_html = bytes()
@@ -54,91 +358,310 @@ def epub_to_bs(epub_path: str):
         item_class = str(item.__class__)
         if item_class == "<class 'ebooklib.epub.EpubHtml'>":
             ugly_book_html += item.content + bytes("\n", "utf-8")
-    book_html = bs4.BeautifulSoup(ugly_book_html, "html.parser")
+    book_html = make_soup(ugly_book_html)
     return book_html
 
 
-def slice_with_red_color(text: str, start: int, end: int):
-    to_be_colored = text[start:end]
-    colored_slice = termcolor.colored(to_be_colored, "red")
-    result = f"{text[:start]}{colored_slice}{text[end:]}"
-    return result
+def split_inflection(word: str) -> tuple:
+    """Returns (stem, preffix) of word, preffix being the separated
+    prefix of separable verbs ("schläft ein") or ""."""
+    word_split = word.split(" ")
+    return (word, "") if len(word_split) == 1 else tuple(word_split)
 
 
-def red_groups(match: re.Match) -> str:
-    """Returns match.group() but with all elements of match.groups()
-    painted in red.
+def trie_pattern(words, char_pattern=re.escape) -> str:
+    """Returns a regex matching any of words, shaped like the trie of
+    words ("gehe", "gehen", "ging" give "g(?:ehe(?:n)?|ing)"), so
+    that its cost doesn't grow with the number of words.
 
     Args:
-        match (re.Match): Match object
+        words (iterable): words to match.
+        char_pattern (callable, optional): returns the regex matching a character.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
 
-    Returns:
-        str: match.group() but with red groups
+    def pattern(node):
+        alternatives = [char_pattern(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        group = alternatives[0] if len(alternatives) == 1 and "" not in node else f"(?:{'|'.join(alternatives)})"
+        return group + "?" if "" in node else group
+
+    return pattern(trie)
+
+
+def utf8_case_pattern(char: str) -> str:
+    """Returns a regex (for bytes) matching the UTF-8 encoding of char in
+    lowercase, uppercase or titlecase: re.IGNORECASE only folds ASCII
+    letters in bytes ("ä" gives "(?:\\xc3\\x84|\\xc3\\xa4)")."""
+    variants = sorted({char, char.lower(), char.upper(), char.title()})
+    alternatives = ["".join(f"\\x{byte:02x}" for byte in variant.encode("utf-8")) for variant in variants]
+    if len(alternatives) == 1:
+        return alternatives[0]
+    if all(len(variant.encode("utf-8")) == 1 for variant in variants):
+        return f"[{''.join(alternatives)}]"
+    return f"(?:{'|'.join(alternatives)})"
+
+
+# what can't be around a word in bytes: the other letters, that aren't ASCII,
+# are told apart from punctuation once the sentence is decoded
+ASCII_WORD_CHARACTERS = "0-9A-Za-z_"
+# what ends the clause of a separated prefix: "schläft sie ein, ..." or "schläft sie ein."
+PREFIX_ENDINGS = {",": "clause", ";": "clause", ".": "sentence", "?": "sentence", "!": "sentence"}
+# a clause, from the end of the stem of a separable verb to its prefix
+CLAUSE_PATTERN = re.compile(r"[\w\s]*")
+
+
+def color_spans(text: str, spans) -> str:
+    """Returns text with the (start, end) spans painted in red"""
+    pieces, last_end = [], 0
+    for start, end in spans:
+        pieces += [text[last_end:start], termcolor.colored(text[start:end], "red")]
+        last_end = end
+    pieces.append(text[last_end:])
+    return "".join(pieces)
+
+
+class ExampleMatcher:
+    """Finds the examples of all the inflections of a word: the sentences
+    (see sentences.py) that contain one of them, with its first occurrence
+    painted red. Inflections are words, matched whatever their case. A
+    separable verb ("schläft ein") is matched as one word ("einschläft")
+    or as its stem followed, in the same clause, by its prefix ("schläft
+    sie ein." or "schläft sie ein, ...").
+    Books are searched as UTF-8 bytes by a single regex shaped like a trie,
+    that finds the sentences that may contain an inflection in one pass.
+    Only these sentences are decoded and searched for the examples, and
+    none of them twice, so the time is linear in the length of the text
+    whatever the text and the number of inflections.
+
+    Args:
+        words (iterable or str): inflections, as given to get_examples.
     """
-    full_match = match.group()
-    full_start, _ = match.span()
-    for i in range(len(match.groups())):
-        span_group = match.span(i + 1)
-        start, end = span_group[0] - full_start, span_group[1] - full_start
-        full_match = slice_with_red_color(full_match, start, end)
-        full_start -= 9
-    return full_match
 
+    def __init__(self, words):
+        if isinstance(words, str):
+            words = tuple([words])
+        self.inflections = [split_inflection(word) for word in dict.fromkeys(words)]
+        # {lowercase word: [(index of an inflection, kind)]}, kind being "word",
+        # "joined" (prefix and stem in one word) or "stem" (of a separable verb)
+        self.keys = {}
+        for i, (stem, preffix) in enumerate(self.inflections):
+            if preffix:
+                self.keys.setdefault(stem.lower(), []).append((i, "stem"))
+                self.keys.setdefault((preffix + stem).lower(), []).append((i, "joined"))
+            else:
+                self.keys.setdefault(stem.lower(), []).append((i, "word"))
+        # a superset of the sentences the patterns match in: the sentences
+        # only overlapping matches ("E-Mail" and "Mail") miss are matched anyway
+        self.candidate_pattern = re.compile(
+            (
+                f"(?<![{ASCII_WORD_CHARACTERS}])"
+                f"{trie_pattern(self.keys, utf8_case_pattern)}"
+                f"(?![{ASCII_WORD_CHARACTERS}])"
+            ).encode("ascii")
+        ) if self.keys else None
+        words_keys = [key for key in self.keys if re.fullmatch(r"\w+", key)]
+        self.patterns = [
+            re.compile(rf"(?<!\w){trie_pattern(words_keys)}(?!\w)", re.IGNORECASE)
+        ] if words_keys else []
+        # "E-Mail" overlaps with "Mail", so they can't be alternatives of one regex
+        self.patterns += [
+            re.compile(rf"(?<!\w){re.escape(key)}(?!\w)", re.IGNORECASE)
+            for key in self.keys
+            if key not in words_keys
+        ]
+
+    def matches(self, data, sentences=None, language=None):
+        """Yields the examples in a text, in its order, as (sentence, spans):
+        the decoded sentence and the (start, end) spans to paint red. The
+        text is only searched (and split, without sentences) as far as the
+        examples are read.
+
+        Args:
+            data (bytes, mmap.mmap or str): text to search, UTF-8 if it isn't a str.
+            sentences (SentenceOffsets, optional): sentences of data. Defaults to a SentenceCursor.
+            language (str, optional): language code, to split data without sentences.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if sentences is None:
+            sentences = SentenceCursor(data, language)
+        if self.candidate_pattern is None:
+            return
+        position = 0
+        while True:
+            candidate = self.candidate_pattern.search(data, position)
+            if candidate is None:
+                return
+            span = sentences.span_containing(*candidate.span())
+            if span is None:
+                position = candidate.start() + 1
+                continue
+            sentence_start, sentence_end = span
+            sentence = data[sentence_start:sentence_end].decode("utf-8", errors="replace")
+            for spans in self.sentence_matches(sentence):
+                yield sentence, spans
+            position = sentence_end
+
+    def sentence_matches(self, sentence: str) -> list:
+        """Returns the spans to paint red in sentence for each inflection found in it"""
+        if len(self.patterns) == 1:
+            hits = self.patterns[0].finditer(sentence)
+        else:
+            hits = heapq.merge(*(pattern.finditer(sentence) for pattern in self.patterns), key=re.Match.start)
+        first_hits, stem_hits = {}, {}
+        for hit in hits:
+            word = hit.group()
+            for inflection, kind in self.keys.get(word.lower(), ()):
+                stem, preffix = self.inflections[inflection]
+                if kind == "word" or kind == "joined" and word == preffix + stem:
+                    first_hits.setdefault((inflection, kind), [hit.span()])
+                elif kind == "stem" and word == stem:
+                    stem_hits.setdefault(inflection, []).append(hit.span())
+        for inflection, spans in stem_hits.items():
+            first_hits.update(self._separated(sentence, inflection, spans))
+        return list(first_hits.values())
+
+    def _separated(self, sentence, inflection, stem_spans) -> dict:
+        """Returns {(inflection, ending): [stem span, prefix span]} for the
+        first stem of stem_spans followed by the prefix at the end of a
+        clause, and for the first one followed by the prefix at the end of
+        the sentence. Each clause is only searched once."""
+        preffix = self.inflections[inflection][1]
+        found = {}
+        clause_end = -1
+        for stem_start, stem_end in stem_spans:
+            if stem_start < clause_end:
+                # in the clause of a previous stem, that ends at the same place
+                continue
+            clause_end = CLAUSE_PATTERN.match(sentence, stem_end).end()
+            ending = PREFIX_ENDINGS.get(sentence[clause_end : clause_end + 1])
+            preffix_start = clause_end - len(preffix)
+            if (
+                ending
+                and (inflection, ending) not in found
+                and preffix_start > stem_end
+                and sentence[preffix_start - 1].isspace()
+                and sentence[preffix_start:clause_end] == preffix
+            ):
+                found[(inflection, ending)] = [(stem_start, stem_end), (preffix_start, clause_end)]
+        return found
+
+
+def index_phrases(words) -> list:
+    """Returns what the sentences matched by example_patterns(words)
+    contain, to look them up in a SentenceIndex"""
+    if isinstance(words, str):
+        words = tuple([words])
+    phrases = []
+    for word in words:
+        stem, preffix = split_inflection(word)
+        # the prefix can be separated from the stem or joined to it
+        phrases += [stem, preffix + stem] if preffix else [stem]
+    return phrases
 
-def findall_with_red_groups(pattern, text, **kwargs):
-    """The same as re.findall but with the usage of red_groups()
+
+def example_key(sentence: str) -> str:
+    """Returns what near-identical sentences have in common: their words, in lowercase"""
+    return " ".join(re.findall(r"\w+", sentence.lower()))
+
+
+def rank_examples(books, limit=None):
+    """Picks the examples to show among the matches of every book. A
+    sentence near-identical to one already picked (see example_key) isn't
+    picked twice. Without limit, the examples are picked as they're found.
+    With a limit, the matches of each book are ranked, the sentences closest
+    to IDEAL_EXAMPLE_LENGTH first, and the books take turns, so that the
+    examples come from as many books as possible. Each book takes its first
+    turn as soon as its matches are read, so the first examples don't wait
+    for the other books, which aren't read at all once limit is reached.
 
     Args:
-        pattern (re.Pattern): pattern
-        text (str): text
+        books (iterable): (name, matches) for every book, matches being
+            (sentence, spans) like ExampleMatcher.matches yields.
+        limit (int, optional): number of examples.
 
-    Returns:
-        list: same style as re.findall
+    Yields:
+        tuple: (name, (sentence, spans))
     """
-    match_iterator = re.finditer(pattern, text, **kwargs)
-    result = []
-    for match in match_iterator:
-        red_match = red_groups(match)
-        result.append(red_match)
-    return result
+    seen = set()
 
+    def unseen(matches):
+        for sentence, spans in matches:
+            key = example_key(sentence)
+            if key not in seen:
+                seen.add(key)
+                yield sentence, spans
 
-def get_examples(words, book_txt):
-    word_tuple = words
-    if isinstance(words, str):
-        word_tuple = tuple([words])
-    examples = set()
-    for word in word_tuple:
-        word_split = word.split(" ")
-        stem, preffix = (word, "") if len(word_split) == 1 else word_split
-        if preffix:
-            patterns = [
-                rf"^[^.?!]*?\b({stem})\b[\w\s]*?\b({preffix})[,;][^.]*?[.!?]",
-                rf"^[^.?!]*?\b({preffix}{stem})\b[^.]*?[.!?]",
-                rf"^[^.?!]*?\b({stem})\b[\w\s]*?({preffix})[.!?]",
-            ]
-            compiled_patterns = [
-                re.compile(pattern, flags=re.MULTILINE) for pattern in patterns
-            ]
-            bs4_examples = [
-                findall_with_red_groups(pattern, book_txt)
-                for pattern in compiled_patterns
-            ]
-            # planify bs4_examples. Otherwise bs4_examples would look like [[...],[...],[...]]
-            bs4_examples = [
-                example for findall_list in bs4_examples for example in findall_list
-            ]
-        else:
-            pattern = rf"^[^.?!]*?\b({stem})\b[^.]*?[.?!]"
-            bs4_examples = findall_with_red_groups(
-                pattern, book_txt, flags=re.MULTILINE | re.IGNORECASE
-            )
-        for example in bs4_examples:
-            if preffix:
-                examples.add(example)
-            else:
-                examples.add(example)
-    return examples
+    if not limit:
+        for name, matches in books:
+            for match in unseen(matches):
+                yield name, match
+        return
+    ranked = []
+    picked = 0
+    for name, matches in books:
+        book = (name, unseen(sorted(matches, key=lambda match: abs(len(match[0]) - IDEAL_EXAMPLE_LENGTH))))
+        match = next(book[1], None)
+        if match is None:
+            continue
+        ranked.append(book)
+        yield name, match
+        picked += 1
+        if picked == limit:
+            return
+    while ranked:
+        for book in list(ranked):
+            match = next(book[1], None)
+            if match is None:
+                ranked.remove(book)
+                continue
+            yield book[0], match
+            picked += 1
+            if picked == limit:
+                return
+
+
+def get_examples(words, book_txt, language=None, limit=None):
+    """Yields the examples of words in book_txt, with the inflections in red.
+
+    Args:
+        words (iterable or str): inflections ("schläft ein" for separable verbs).
+        book_txt (str, bytes or mmap.mmap): text to search, UTF-8 if it isn't a str.
+        language (str, optional): language code, for the sentence rules.
+        limit (int, optional): number of examples, the best of the first
+            CANDIDATES_PER_EXAMPLE * limit matches (see rank_examples). Defaults to all of them.
+    """
+    if isinstance(book_txt, str):
+        book_txt = book_txt.encode("utf-8")
+    count = limit * CANDIDATES_PER_EXAMPLE if limit else None
+    matches = ExampleMatcher(words).matches(book_txt, language=language)
+    matches = _timed(itertools.islice(matches, count), "examples", len(book_txt))
+    for _, (sentence, spans) in rank_examples([(None, matches)], limit):
+        yield color_spans(sentence, spans)
+
+
+def index_ebooks(directory=EBOOK_DIR):
+    """Indexes the sentences of the books of directory that changed since
+    they were last indexed, one SentenceIndex per language."""
+    library = EbookLibrary.from_directory(directory)
+    for language, paths in library.paths.items():
+        index = SentenceIndex(library.index_path(language), language)
+        indexed = index.books()
+        for name, path in paths.items():
+            stamp = SentenceIndex.stamp(path)
+            if indexed.get(name) != stamp:
+                print(f"Indexing {name}...")
+                index.add(name, map_book(path), stamp)
+        for name in indexed.keys() - paths.keys():
+            index.remove(name)
+        index.close()
 
 
 book_txt = """[1] Warum musst du immer im Kino einschlafen?
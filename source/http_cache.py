@@ -0,0 +1,463 @@
+import sqlite3, zlib, time, json, threading, atexit, argparse, urllib.parse, pathlib, hashlib
+import requests
+from collections import Counter
+from requests.structures import CaseInsensitiveDict
+from utils import NeverSayNeverSession, CONFIG_PARSER, METRICS
+
+CACHE_PATH = pathlib.Path(__file__).parent / ".http_cache.sqlite"
+DAY = 24 * 60 * 60
+DEFAULT_TTL = 30 * DAY
+# dictionary entries rarely change, but some sites change more than others
+HOST_TTLS = {
+    "de.wiktionary.org": 14 * DAY,
+    "en.wiktionary.org": 14 * DAY,
+    "fr.wiktionary.org": 14 * DAY,
+    "www.dwds.de": 30 * DAY,
+    "www.duden.de": 30 * DAY,
+    "www.dictionary.com": 30 * DAY,
+    "www.dicio.com.br": 30 * DAY,
+}
+# how long a 404 (which turns into WordNotAvailable) is remembered
+NEGATIVE_TTL = 1 * DAY
+MAX_SIZE = 256 * 1024 * 1024
+CACHEABLE_STATUS_CODES = (200, 404)
+# hits: fresh responses; revalidated: expired responses confirmed by a 304;
+# refetched: expired responses downloaded again; misses: never stored.
+COUNTER_NAMES = ("hits", "revalidated", "refetched", "misses")
+
+
+def normalize_url(url: str) -> str:
+    """Returns url in a canonical form, so that the same page is
+    always stored under the same key. "HTTPS://De.Wiktionary.org/wiki/Stra%C3%9Fe#x"
+    and "https://de.wiktionary.org/wiki/Straße" become the same key.
+
+    Args:
+        url (str): url
+
+    Returns:
+        str: normalized url
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = urllib.parse.quote(urllib.parse.unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query)))
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path or "/", query, "")
+    )
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=12).hexdigest()
+
+
+class ResponseCache:
+    """Persistent cache of HTTP responses backed by SQLite.
+    Bodies are stored zlib-compressed along with their validators (ETag,
+    Last-Modified). Every host has its own TTL, 404s are kept for
+    NEGATIVE_TTL seconds and the least recently used entries are evicted
+    once the cache is bigger than max_size.
+
+    Every response returned by the cache has a cache_version attribute,
+    the digest of its body. It only changes when the body changes, so
+    results extracted from a page can be stored with put_result() and
+    reused while the page keeps the same version.
+
+    Args:
+        path (str): path of the SQLite database.
+        max_size (int, optional): maximum size (compressed bytes) of all bodies together.
+        default_ttl (int, optional): TTL for hosts that are not in host_ttls.
+        host_ttls (dict, optional): {host: ttl in seconds}.
+        negative_ttl (int, optional): TTL for 404 responses.
+    """
+
+    def __init__(
+        self,
+        path=CACHE_PATH,
+        max_size=MAX_SIZE,
+        default_ttl=DEFAULT_TTL,
+        host_ttls=None,
+        negative_ttl=NEGATIVE_TTL,
+    ):
+        self.path = str(path)
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.host_ttls = HOST_TTLS if host_ttls is None else host_ttls
+        self.negative_ttl = negative_ttl
+        # counts of this process; stats() adds the ones saved by previous processes
+        self.counter = Counter()
+        self._saved_counter = Counter()
+        self._lock = threading.Lock()
+        # access times are written in batches; writing them on
+        # every hit would make a hit as slow as a commit.
+        self._pending_accesses = {}
+        # opened by the first lookup, so that importing a module with a cache
+        # (like word_info_extractor) doesn't create nor lock the database
+        self._database = None
+        self._open_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        with self._open_lock:
+            if self._database is None:
+                self._database = self._open()
+            return self._database
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                encoding TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                digest TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                response_key TEXT NOT NULL,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        return connection
+
+    @property
+    def hits(self):
+        return self.counter["hits"]
+
+    @property
+    def misses(self):
+        return self.counter["misses"]
+
+    def ttl(self, host: str, status_code: int) -> int:
+        if status_code == 404:
+            return self.negative_ttl
+        return self.host_ttls.get(host, self.default_ttl)
+
+    def lookup(self, url: str):
+        """Returns (response, fresh) for url. response is None when
+        url was never stored; fresh is False when it expired.
+
+        Returns:
+            (requests.Response or None, bool)
+        """
+        key = normalize_url(url)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, url, encoding, headers, body, digest, expires_at"
+                " FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return (None, False)
+            self._pending_accesses[key] = time.time()
+        status, response_url, encoding, headers, body, digest, expires_at = row
+        response = self._build_response(status, response_url, encoding, headers, body)
+        response.cache_version = digest or content_digest(response.content)
+        return (response, expires_at >= time.time())
+
+    def get(self, url: str):
+        """Returns the cached response for url or None when
+        there is no fresh response for it.
+
+        Returns:
+            requests.Response or None
+        """
+        response, fresh = self.lookup(url)
+        if not fresh:
+            self.count("misses")
+            return None
+        self.count("hits")
+        return response
+
+    def count(self, name: str):
+        with self._lock:
+            self.counter[name] += 1
+
+    @staticmethod
+    def _build_response(status, url, encoding, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response.encoding = encoding
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response._content = zlib.decompress(body)
+        response.from_cache = True
+        return response
+
+    def put(self, url: str, response: requests.Response):
+        """Stores response under url if its status code is cacheable
+        and sets response.cache_version."""
+        if response.status_code not in CACHEABLE_STATUS_CODES:
+            return
+        key = normalize_url(url)
+        host = urllib.parse.urlsplit(key).netloc
+        body = zlib.compress(response.content)
+        digest = content_digest(response.content)
+        now = time.time()
+        headers = json.dumps(dict(response.headers))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, host, status, url, encoding, headers, body, size,"
+                " stored_at, expires_at, accessed_at, digest)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    host,
+                    response.status_code,
+                    response.url or url,
+                    response.encoding,
+                    headers,
+                    body,
+                    len(body),
+                    now,
+                    now + self.ttl(host, response.status_code),
+                    now,
+                    digest,
+                ),
+            )
+            self._flush_accesses()
+            self._evict()
+            self._connection.commit()
+        response.cache_version = digest
+
+    def refresh(self, url: str, not_modified: requests.Response = None):
+        """Marks the stored response of url as fresh again after the
+        server answered a conditional request with 304 Not Modified.
+        The body (and therefore cache_version) stays the same."""
+        key = normalize_url(url)
+        host = urllib.parse.urlsplit(key).netloc
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, headers FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return
+            status, headers = row
+            headers = json.loads(headers)
+            if not_modified is not None:
+                for validator in ("ETag", "Last-Modified"):
+                    if validator in not_modified.headers:
+                        headers[validator] = not_modified.headers[validator]
+            self._connection.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ?, headers = ?"
+                " WHERE key = ?",
+                (now + self.ttl(host, status), now, json.dumps(headers), key),
+            )
+            self._connection.commit()
+
+    def get_result(self, key: str):
+        """Returns the value stored with put_result(key, ...) or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_result(self, key: str, url: str, value):
+        """Stores a JSON-serializable value extracted from the response of url"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (key, normalize_url(url), json.dumps(value)),
+            )
+            self._connection.commit()
+
+    def _flush_accesses(self):
+        if self._pending_accesses:
+            self._connection.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(t, key) for key, t in self._pending_accesses.items()],
+            )
+            self._pending_accesses.clear()
+
+    def _flush_counter(self):
+        unsaved = self.counter - self._saved_counter
+        if unsaved:
+            self._connection.executemany(
+                "INSERT INTO counters VALUES (?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                list(unsaved.items()),
+            )
+            self._saved_counter.update(unsaved)
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache
+        is smaller than self.max_size."""
+        total = self._total_size()
+        if total <= self.max_size:
+            return
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        )
+        to_remove = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            to_remove.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", to_remove)
+
+    def _total_size(self) -> int:
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def flush(self):
+        with self._lock:
+            if self._database is None and not self.counter:
+                return
+            self._flush_accesses()
+            self._flush_counter()
+            self._connection.commit()
+
+    def prune(self) -> int:
+        """Removes expired entries without validators (they can't be
+        revalidated) and returns how many were removed."""
+        with self._lock:
+            self._flush_accesses()
+            expired = self._connection.execute(
+                "SELECT key, headers FROM responses WHERE expires_at < ?", (time.time(),)
+            ).fetchall()
+            to_remove = [
+                (key,)
+                for key, headers in expired
+                if not {"etag", "last-modified"} & {h.lower() for h in json.loads(headers)}
+            ]
+            self._connection.executemany("DELETE FROM responses WHERE key = ?", to_remove)
+            self._evict()
+            self._connection.execute(
+                "DELETE FROM results WHERE response_key NOT IN (SELECT key FROM responses)"
+            )
+            self._connection.commit()
+        return len(to_remove)
+
+    def clear(self):
+        with self._lock:
+            self._pending_accesses.clear()
+            self._connection.execute("DELETE FROM responses")
+            self._connection.execute("DELETE FROM results")
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._flush_counter()
+            self._connection.commit()
+            entries, size, negative, expired = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0),"
+                " COALESCE(SUM(status = 404), 0),"
+                " COALESCE(SUM(expires_at < ?), 0) FROM responses",
+                (time.time(),),
+            ).fetchone()
+            hosts = dict(
+                self._connection.execute(
+                    "SELECT host, COUNT(*) FROM responses GROUP BY host"
+                ).fetchall()
+            )
+            saved_counter = dict(
+                self._connection.execute("SELECT name, value FROM counters").fetchall()
+            )
+        stats = {
+            "entries": entries,
+            "size": size,
+            "max_size": self.max_size,
+            "negative": negative,
+            "expired": expired,
+            "hosts": hosts,
+        }
+        for name in COUNTER_NAMES:
+            stats[name] = saved_counter.get(name, 0)
+        return stats
+
+
+class CachedSession(NeverSayNeverSession):
+    """NeverSayNeverSession that answers GET requests from a
+    ResponseCache whenever it can. Expired responses are revalidated
+    with If-None-Match/If-Modified-Since, so unchanged pages cost a 304
+    instead of a full download.
+
+    Args:
+        cache (ResponseCache, optional): cache to use. Set to None to disable caching.
+        policy (RetryPolicy, optional): retry policy used on cache misses.
+    """
+
+    def __init__(self, cache=None, policy=None):
+        super().__init__(policy)
+        self.cache = cache
+
+    def get(self, url, **kwargs):
+        if self.cache is None:
+            return super().get(url, **kwargs)
+        with METRICS.phase(urllib.parse.urlsplit(url).netloc, "cache"):
+            cached_response, fresh = self.cache.lookup(url)
+        if fresh:
+            self.cache.count("hits")
+            return cached_response
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached_response is not None:
+            if "ETag" in cached_response.headers:
+                headers["If-None-Match"] = cached_response.headers["ETag"]
+            if "Last-Modified" in cached_response.headers:
+                headers["If-Modified-Since"] = cached_response.headers["Last-Modified"]
+        response = super().get(url, headers=headers, **kwargs)
+        if cached_response is not None and response.status_code == 304:
+            self.cache.refresh(url, response)
+            self.cache.count("revalidated")
+            return cached_response
+        self.cache.count("misses" if cached_response is None else "refetched")
+        self.cache.put(url, response)
+        return response
+
+
+def cache_from_config():
+    """Returns the ResponseCache described in the config file or None
+    if the user disabled caching with "http_cache = 0"."""
+    config = CONFIG_PARSER["DEFAULT"]
+    if config.get("http_cache", "1") == "0":
+        return None
+    return ResponseCache(
+        path=config.get("http_cache_path", CACHE_PATH),
+        max_size=int(config.get("http_cache_max_size", MAX_SIZE)),
+        default_ttl=int(config.get("http_cache_ttl", DEFAULT_TTL)),
+        negative_ttl=int(config.get("http_cache_negative_ttl", NEGATIVE_TTL)),
+    )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Manage the HTTP response cache")
+    arg_parser.add_argument("command", choices=("stats", "prune", "clear"))
+    args = arg_parser.parse_args()
+    cache = cache_from_config() or ResponseCache()
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"path: {cache.path}")
+        print(f"entries: {stats['entries']} ({stats['negative']} not found, {stats['expired']} expired)")
+        print(f"size: {stats['size'] / 1024 / 1024:.2f} MB of {stats['max_size'] / 1024 / 1024:.0f} MB")
+        for host, count in sorted(stats["hosts"].items()):
+            print(f"  {host}: {count}")
+        print(
+            f"hits: {stats['hits']}, revalidated: {stats['revalidated']},"
+            f" refetched: {stats['refetched']}, misses: {stats['misses']}"
+        )
+    elif args.command == "prune":
+        print(f"Removed {cache.prune()} expired entries.")
+    elif args.command == "clear":
+        cache.clear()
+        print("Cache cleared.")
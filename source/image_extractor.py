@@ -1,14 +1,11 @@
-import logging
-from google_images_search import GoogleImagesSearch
+import logging, functools
 from utils import *
 import os, subprocess, re, pathlib, tempfile
-from ipdb import set_trace as s
 
 IMAGE_EXTRACTION = True
 try:
     GOOGLE_SEARCH_API_KEY = CONFIG_PARSER['DEFAULT']["GOOGLE_SEARCH_API_KEY"]
     CX = CONFIG_PARSER['DEFAULT']["CX"]
-    gis = GoogleImagesSearch(GOOGLE_SEARCH_API_KEY, CX)
 except KeyError:
     IMAGE_EXTRACTION = False
 
@@ -16,6 +13,16 @@ image_temp_directory = tempfile.TemporaryDirectory()
 IMAGE_DIR = pathlib.Path(image_temp_directory.name)
 
 
+@functools.cache
+def images_client():
+    """Returns the GoogleImagesSearch client, built on the first search:
+    google_images_search pulls in the whole Google API client, which
+    takes longer to import than the rest of the program."""
+    from google_images_search import GoogleImagesSearch
+
+    return GoogleImagesSearch(GOOGLE_SEARCH_API_KEY, CX)
+
+
 def get_images_from_word(word: str, image_dir=IMAGE_DIR):
     _search_params = {
         "q": word,
@@ -25,7 +32,7 @@ def get_images_from_word(word: str, image_dir=IMAGE_DIR):
         "imgSize":"medium"
     }
     logging.info(f"searching for images from '{word}'")
-    gis.search(
+    images_client().search(
         _search_params,
         path_to_dir=image_dir,
     )
@@ -1,7 +1,6 @@
 import bs4, re
-from word_info_extractor import SESSION
-from utils import TRENNBARE_PRÄFIXE
-from ipdb import set_trace as s
+from word_info_extractor import SESSION, TIMEOUT
+from utils import TRENNBARE_PRÄFIXE, make_soup, s
 INFLECTION_BASE_URL = 'https://de.wiktionary.org/wiki/Flexion:'
 
 def break_german_verb(verb: str):
@@ -16,9 +15,9 @@ def break_german_verb(verb: str):
 class NotPreciseInflections:
     def __init__(self, word):
         url = INFLECTION_BASE_URL + word
-        request = SESSION.get(url, timeout=0.8)
+        request = SESSION.get(url, timeout=TIMEOUT)
         self.word = word
-        self.page = bs4.BeautifulSoup(request.text, 'html.parser')
+        self.page = make_soup(request.content, request.encoding)
         self.inflections = _get_inflections(self)
         
     def _get_inflections(self):
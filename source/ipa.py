@@ -10,6 +10,8 @@ def ipa(text: str, language: str):
         try:
             if word:
                 ipa_transcription = word_class(word.strip())
+                # a page without definitions is only detected here
+                ipa_transcription.root_entry
         except WordNotAvailable:
             result += word + ": not found\n"
             continue
@@ -1,70 +1,101 @@
 import os, readline, atexit, signal, sys, argparse
-from word_info_extractor import *
-from image_extractor import *
-from ebook_search import *
-import logging
 
-logging.basicConfig(
-    filename="main.log",
-    encoding="utf-8",
-    level=logging.DEBUG,
-    filemode="w",
-    format="%(asctime)s %(message)s",
-    datefmt="%m/%d/%Y %I:%M:%S %p",
-)
-histfile = os.path.join(os.path.expanduser("~"), ".wiktionary_history")
-try:
-    readline.read_history_file(histfile)
-    h_len = readline.get_current_history_length()
-except FileNotFoundError:
-    open(histfile, "wb").close()
-    h_len = 0
+# the processes searching the ebooks import this module as __mp_main__
+if __name__ == "__main__":
+    from word_info_extractor import *
+    from image_extractor import *
+    from ebook_search import *
+    import logging
 
+    logging.basicConfig(
+        # main.log is only created (and emptied) when something is logged
+        handlers=[logging.FileHandler("main.log", mode="w", encoding="utf-8", delay=True)],
+        level=logging.DEBUG,
+        format="%(asctime)s %(message)s",
+        datefmt="%m/%d/%Y %I:%M:%S %p",
+    )
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-w", "--word", help="The word you are trying to search")
+    arg_parser.add_argument(
+        "-s",
+        "--source",
+        choices=("wiktionary", "dwds", "duden", "examples", "all"),
+        default="wiktionary",
+        help="The source you are going to search from. Valid values: wiktionary (default), dwds, duden, examples, all",
+    )
+    arg_parser.add_argument("-c", "--config", action="store_true")
+    arg_parser.add_argument(
+        "-b", "--batch", help="Look up every word in this file (one per line) and exit"
+    )
+    arg_parser.add_argument(
+        "--workers", type=int, default=4, help="Concurrent lookups in batch mode"
+    )
+    arg_parser.add_argument(
+        "-o", "--out", default="results.jsonl", help="JSONL output file of batch mode"
+    )
+    args = arg_parser.parse_args()
+    interactive = not (args.word or args.batch)
+    histfile = os.path.join(os.path.expanduser("~"), ".wiktionary_history")
+    try:
+        readline.read_history_file(histfile)
+        h_len = readline.get_current_history_length()
+    except FileNotFoundError:
+        open(histfile, "wb").close()
+        h_len = 0
 
-# --- exit handlers --
-def remove_q():
-    h_len = readline.get_current_history_length()
-    readline.remove_history_item(h_len - 1)
 
+    # --- exit handlers --
+    def remove_q():
+        h_len = readline.get_current_history_length()
+        readline.remove_history_item(h_len - 1)
 
-def save(prev_h_len, histfile):
-    new_h_len = readline.get_current_history_length()
-    readline.set_history_length(1000)
-    readline.append_history_file(new_h_len - prev_h_len, histfile)
 
+    def save(prev_h_len, histfile):
+        new_h_len = readline.get_current_history_length()
+        readline.set_history_length(1000)
+        readline.append_history_file(new_h_len - prev_h_len, histfile)
 
-def save_when_ctrl_c(signum, frame):
-    save(h_len, histfile)
-    print("\033[0m", end="")
-    sys.exit()
 
+    def save_when_ctrl_c(signum, frame):
+        save(h_len, histfile)
+        print("\033[0m", end="")
+        sys.exit()
 
-signal.signal(signal.SIGINT, save_when_ctrl_c)
-atexit.register(save, h_len, histfile)
-atexit.register(remove_q)
-atexit.register(print, "\033[0m")
-# --- exit handlers --
-arg_parser = argparse.ArgumentParser()
-arg_parser.add_argument("-w", "--word", help="The word you are trying to search")
-arg_parser.add_argument(
-    "-s",
-    "--source",
-    choices=("wiktionary", "dwds", "duden", "examples"),
-    default="wiktionary",
-    help="The source you are going to search from. Valid values: wiktionary (default), dwds, duden",
-)
-arg_parser.add_argument("-c", "--config", action="store_true")
-args = arg_parser.parse_args()  
-setup_empty_config()
-print(
-    "Current language: " + CONFIG_PARSER["DEFAULT"]["language"],
-)
-print("-" * 72)
-setup_ebooks()
-language = CONFIG_PARSER["DEFAULT"]["language"]
-import programs
 
-program = programs.Program()
-program.word_class = programs.WORD_PRIMARY_CLASSES[language]
-program.cmdloop()
+    if interactive:
+        signal.signal(signal.SIGINT, save_when_ctrl_c)
+        atexit.register(save, h_len, histfile)
+        atexit.register(remove_q)
+        atexit.register(print, "\033[0m")
+    # --- exit handlers --
+    setup_empty_config()
+    if args.batch:
+        import programs, batch
+
+        language = CONFIG_PARSER["DEFAULT"]["language"]
+        if args.source == "wiktionary":
+            word_class = programs.WORD_PRIMARY_CLASSES[language]
+        elif args.source in programs.Program.all_sources.get(language, {}):
+            word_class = programs.Program.all_sources[language][args.source]
+        else:
+            arg_parser.error(f"--source {args.source} can't be used with --batch")
+        words = batch.read_words(args.batch)
+        batch.run_batch(words, word_class, args.out, workers=args.workers)
+        sys.exit()
+    print(
+        "Current language: " + CONFIG_PARSER["DEFAULT"]["language"],
+    )
+    print("-" * 72)
+    setup_ebooks()
+    language = CONFIG_PARSER["DEFAULT"]["language"]
+    import programs
+
+    program = programs.Program()
+    program.word_class = programs.WORD_PRIMARY_CLASSES[language]
+    if args.word:
+        program.preloop()
+        command = args.word if args.source == "wiktionary" else f"{args.source} {args.word}"
+        program.onecmd(program.precmd(command))
+    else:
+        program.cmdloop()
 # Soli Deo Gloria
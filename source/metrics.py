@@ -0,0 +1,128 @@
+import collections, threading, time
+
+# samples kept for each (source, phase); percentiles are computed over them
+WINDOW = 1000
+QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+
+def percentile(samples, fraction: float) -> float:
+    """Returns the nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PhaseTimer:
+    """Context manager returned by Metrics.phase(). Set self.bytes inside
+    the block when the size isn't known beforehand."""
+
+    __slots__ = ("metrics", "source", "phase", "bytes", "start")
+
+    def __init__(self, metrics, source: str, phase: str, bytes=0):
+        self.metrics, self.source, self.phase, self.bytes = metrics, source, phase, bytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.source, self.phase, time.perf_counter() - self.start, self.bytes)
+
+
+class NullTimer:
+    """What Metrics.phase() returns when metrics are disabled"""
+
+    __slots__ = ("bytes",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics:
+    """Durations and byte counts of the phases of a lookup (request,
+    parse, isolate, extract...), grouped by source. The source is the
+    Word class, the host of a request or a part of the program.
+    >>> with METRICS.phase("DEWiktionaryWord", "parse", len(content)):
+    ...     page = make_soup(content)
+
+    Args:
+        enabled (bool, optional): when False, nothing is recorded and phase() costs a method call.
+        window (int, optional): number of recent durations kept per phase.
+    """
+
+    def __init__(self, enabled=True, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        # {(source, phase): deque of the durations of the last calls}
+        self.durations = {}
+        self.counts = collections.Counter()
+        self.bytes = collections.Counter()
+        self._lock = threading.Lock()
+
+    def phase(self, source: str, phase: str, bytes=0):
+        """Returns a context manager that records how long its block takes"""
+        if not self.enabled:
+            return NULL_TIMER
+        return PhaseTimer(self, source, phase, bytes)
+
+    def record(self, source: str, phase: str, seconds: float, bytes=0):
+        if not self.enabled:
+            return
+        key = (source, phase)
+        with self._lock:
+            if key not in self.durations:
+                self.durations[key] = collections.deque(maxlen=self.window)
+            self.durations[key].append(seconds)
+            self.counts[key] += 1
+            self.bytes[key] += bytes
+
+    def clear(self):
+        with self._lock:
+            self.durations.clear()
+            self.counts.clear()
+            self.bytes.clear()
+
+    def summary(self) -> list:
+        """Returns one dict per (source, phase) with its percentiles
+        (over the last self.window calls), total count and total bytes"""
+        with self._lock:
+            items = [(key, list(durations)) for key, durations in sorted(self.durations.items())]
+            counts, total_bytes = self.counts.copy(), self.bytes.copy()
+        summary = []
+        for (source, phase), durations in items:
+            row = {"source": source, "phase": phase, "count": counts[(source, phase)]}
+            row.update({name: percentile(durations, fraction) for name, fraction in QUANTILES})
+            row["bytes"] = total_bytes[(source, phase)]
+            summary.append(row)
+        return summary
+
+    def report(self) -> str:
+        """Returns the summary as a table, durations in milliseconds"""
+        lines = [f"{'source':<24}{'phase':<14}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'KB':>10}"]
+        for row in self.summary():
+            lines.append(
+                f"{row['source']:<24}{row['phase']:<14}{row['count']:>7}"
+                + "".join(f"{row[name] * 1000:>10.2f}" for name, _ in QUANTILES)
+                + f"{row['bytes'] / 1024:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Writes the summary to path in the Prometheus text format"""
+        lines = [
+            "# TYPE lookup_phase_seconds summary",
+            "# TYPE lookup_phase_bytes_total counter",
+        ]
+        for row in self.summary():
+            labels = f'source="{row["source"]}",phase="{row["phase"]}"'
+            for name, fraction in QUANTILES:
+                lines.append(f'lookup_phase_seconds{{{labels},quantile="{fraction}"}} {row[name]:.6f}')
+            lines.append(f"lookup_phase_seconds_count{{{labels}}} {row['count']}")
+            lines.append(f"lookup_phase_bytes_total{{{labels}}} {row['bytes']}")
+        with open(path, "w") as file:
+            file.write("\n".join(lines) + "\n")
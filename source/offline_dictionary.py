@@ -0,0 +1,172 @@
+import sqlite3, json, zlib, gzip, bz2, argparse, pathlib, sys
+from utils import CONFIG_PARSER
+
+OFFLINE_PATH = pathlib.Path(__file__).parent / ".offline_dictionary.sqlite"
+IMPORT_BATCH_SIZE = 1000
+# forms with these tags are names of inflection templates, not words
+IGNORED_FORM_TAGS = {"table-tags", "inflection-template", "class"}
+
+
+def open_dump(path):
+    """Opens a (possibly gzip or bz2 compressed) JSONL dump as text"""
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def slim_entry(entry: dict) -> dict:
+    """Returns only the parts of a Kaikki entry that the
+    Word classes use, so that the store stays small."""
+    senses = []
+    for sense in entry.get("senses", []):
+        senses.append(
+            {
+                "glosses": sense.get("glosses", []),
+                "examples": [
+                    example["text"] for example in sense.get("examples", []) if example.get("text")
+                ],
+                "form_of": [form["word"] for form in sense.get("form_of", []) if form.get("word")],
+            }
+        )
+    sounds = entry.get("sounds", [])
+    return {
+        "pos": entry.get("pos", ""),
+        "senses": senses,
+        "ipa": [sound["ipa"] for sound in sounds if sound.get("ipa")],
+        "audio": [
+            sound.get("ogg_url") or sound.get("mp3_url")
+            for sound in sounds
+            if sound.get("ogg_url") or sound.get("mp3_url")
+        ],
+        "forms": [
+            form["form"]
+            for form in entry.get("forms", [])
+            if form.get("form") and not IGNORED_FORM_TAGS & set(form.get("tags", []))
+        ],
+    }
+
+
+class OfflineStore:
+    """Indexed local copy of a Wiktionary extract (Kaikki-style JSONL,
+    one entry per line). Entries are grouped by the Wiktionary edition
+    they come from ("en" for en.wiktionary.org) and by the language of
+    the word (its lang_code).
+
+    Args:
+        path (str): path of the SQLite database.
+    """
+
+    def __init__(self, path=OFFLINE_PATH):
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                edition TEXT NOT NULL,
+                lang_code TEXT NOT NULL,
+                word TEXT NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_word ON entries (edition, lang_code, word);
+            """
+        )
+
+    def import_dump(self, dump_path, edition: str, lang_codes=None) -> int:
+        """Streams the dump into the store. Languages that are imported
+        replace what was stored for them before, so a dump can be imported
+        one language at a time. The lines are inserted in batches, so the
+        size of the dump doesn't change memory usage.
+
+        Args:
+            dump_path (str): JSONL file (.gz and .bz2 are also accepted).
+            edition (str): code of the Wiktionary the dump comes from.
+            lang_codes (iterable, optional): languages to import. Defaults to all of them.
+
+        Returns:
+            int: number of imported entries
+        """
+        lang_codes = set(lang_codes) if lang_codes else None
+        cleared = set()
+        imported = 0
+        batch = []
+        with self._connection, open_dump(dump_path) as dump:
+            for line in dump:
+                entry = json.loads(line)
+                lang_code, word = entry.get("lang_code"), entry.get("word")
+                if not (lang_code and word):
+                    continue
+                if lang_codes is not None and lang_code not in lang_codes:
+                    continue
+                if lang_code not in cleared:
+                    self._connection.execute(
+                        "DELETE FROM entries WHERE edition = ? AND lang_code = ?",
+                        (edition, lang_code),
+                    )
+                    cleared.add(lang_code)
+                data = zlib.compress(json.dumps(slim_entry(entry)).encode("utf-8"))
+                batch.append((edition, lang_code, word, data))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self._insert(batch)
+                    imported += len(batch)
+                    batch = []
+                    print(f"\r{imported} entries", end="", file=sys.stderr)
+            self._insert(batch)
+            imported += len(batch)
+        print(f"\r{imported} entries", file=sys.stderr)
+        return imported
+
+    def _insert(self, batch):
+        self._connection.executemany(
+            "INSERT INTO entries (edition, lang_code, word, data) VALUES (?, ?, ?, ?)",
+            batch,
+        )
+
+    def entries(self, edition: str, lang_code: str, word: str) -> list:
+        """Returns every entry (one per part of speech) of word"""
+        rows = self._connection.execute(
+            "SELECT data FROM entries WHERE edition = ? AND lang_code = ? AND word = ?"
+            " ORDER BY id",
+            (edition, lang_code, word),
+        ).fetchall()
+        return [json.loads(zlib.decompress(data)) for data, in rows]
+
+    def stats(self) -> dict:
+        """Returns {(edition, lang_code): number of entries}"""
+        rows = self._connection.execute(
+            "SELECT edition, lang_code, COUNT(*) FROM entries GROUP BY edition, lang_code"
+        )
+        return {(edition, lang_code): count for edition, lang_code, count in rows}
+
+
+def store_from_config():
+    """Returns the OfflineStore to use when the config file says
+    "backend = offline", otherwise None."""
+    config = CONFIG_PARSER["DEFAULT"]
+    if config.get("backend", "online") != "offline":
+        return None
+    return OfflineStore(config.get("offline_path", OFFLINE_PATH))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Manage the offline dictionary")
+    sub_parsers = arg_parser.add_subparsers(dest="command", required=True)
+    import_parser = sub_parsers.add_parser("import", help="import a Kaikki JSONL dump")
+    import_parser.add_argument("dump", help="path to the .jsonl (or .jsonl.gz/.bz2) file")
+    import_parser.add_argument(
+        "-e", "--edition", default="en", help="Wiktionary edition of the dump (en, de, fr...)"
+    )
+    import_parser.add_argument(
+        "-l", "--lang", action="append", help="only import this language code (repeatable)"
+    )
+    sub_parsers.add_parser("stats", help="show how many entries each language has")
+    args = arg_parser.parse_args()
+    store = OfflineStore(CONFIG_PARSER["DEFAULT"].get("offline_path", OFFLINE_PATH))
+    if args.command == "import":
+        store.import_dump(args.dump, args.edition, args.lang)
+    elif args.command == "stats":
+        for (edition, lang_code), count in sorted(store.stats().items()):
+            print(f"{edition}.wiktionary {lang_code}: {count}")
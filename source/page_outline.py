@@ -0,0 +1,137 @@
+import bisect, collections, re, bs4
+
+
+class PageOutline:
+    """Index of every tag of a parsed page, built in a single walk over it.
+    Tags are grouped by name, class and title, in document order, and the
+    position of each tag is known, so looking for "the h3 before this ol"
+    or "the first ol after this headword" is a binary search instead of
+    a walk over the tree.
+
+    Use PageOutline.of(page), which indexes each page only once. The
+    outline describes the page as it was when it was indexed, so pages
+    shouldn't be changed after that.
+
+    Args:
+        page (bs4.BeautifulSoup): page to index.
+    """
+
+    def __init__(self, page: bs4.BeautifulSoup):
+        self.page = page
+        self.tags = []
+        self.by_name = collections.defaultdict(list)
+        self.by_class = collections.defaultdict(list)
+        self.by_title = collections.defaultdict(list)
+        self._positions = {}
+        for tag in page.descendants:
+            if not isinstance(tag, bs4.Tag):
+                continue
+            self._positions[id(tag)] = len(self.tags)
+            self.tags.append(tag)
+            self.by_name[tag.name].append(tag)
+            for class_ in tag.get("class", ()):
+                self.by_class[class_].append(tag)
+            if "title" in tag.attrs:
+                self.by_title[tag["title"]].append(tag)
+
+    @classmethod
+    def of(cls, page: bs4.BeautifulSoup):
+        """Returns the outline of page, indexing it on the first call"""
+        # vars() skips Tag.__getattr__, which would look for a child tag
+        outline = vars(page).get("_outline")
+        if outline is None:
+            outline = page._outline = cls(page)
+        return outline
+
+    def position(self, tag: bs4.Tag) -> int:
+        """Returns the position of tag in document order"""
+        return self._positions[id(tag)]
+
+    def find_all(self, name=None, class_=None, title=None) -> list:
+        """Returns the tags with the given name, class and title, in
+        document order. Like in bs4, class_ can also be a compiled pattern
+        that has to match part of one of the classes.
+
+        Args:
+            name (str, optional): tag name.
+            class_ (str or re.Pattern, optional): one of the classes of the tag.
+            title (str, optional): title attribute of the tag.
+
+        Returns:
+            list: the matching tags
+        """
+        if isinstance(class_, re.Pattern):
+            tags = sorted(
+                {
+                    id(tag): tag
+                    for matched_class, tags in self.by_class.items()
+                    if class_.search(matched_class)
+                    for tag in tags
+                }.values(),
+                key=self.position,
+            )
+        elif class_ is not None:
+            tags = self.by_class.get(class_, [])
+        elif title is not None:
+            tags = self.by_title.get(title, [])
+        elif name is not None:
+            tags = self.by_name.get(name, [])
+        else:
+            tags = self.tags
+        return [
+            tag
+            for tag in tags
+            if (name is None or tag.name == name)
+            and (title is None or tag.get("title") == title)
+        ]
+
+    def find(self, name=None, class_=None, title=None) -> bs4.Tag:
+        """Returns the first tag self.find_all would return or None"""
+        found = self.find_all(name, class_, title)
+        return found[0] if found else None
+
+    def previous(self, tag: bs4.Tag, names, siblings_only=False) -> bs4.Tag:
+        """Returns the closest tag before tag whose name is in names, like
+        tag.find_previous(names), or None.
+
+        Args:
+            tag (bs4.Tag): tag of the page to start from.
+            names (iterable): names of the tags to look for.
+            siblings_only (bool, optional): only look among the previous siblings of tag.
+
+        Returns:
+            bs4.Tag: the closest tag found
+        """
+        position = self.position(tag)
+        found = None
+        for name in names:
+            candidates = self.by_name.get(name, [])
+            index = bisect.bisect_left(candidates, position, key=self.position)
+            for candidate_index in range(index - 1, -1, -1):
+                candidate = candidates[candidate_index]
+                if siblings_only and candidate.parent is not tag.parent:
+                    continue
+                if found is None or self.position(candidate) > self.position(found):
+                    found = candidate
+                break
+        return found
+
+    def next(self, tag: bs4.Tag, name: str, siblings_only=False) -> bs4.Tag:
+        """Returns the first tag called name after tag, like
+        tag.find_next(name), or None.
+
+        Args:
+            tag (bs4.Tag): tag of the page to start from.
+            name (str): name of the tag to look for.
+            siblings_only (bool, optional): only look among the next siblings of tag.
+
+        Returns:
+            bs4.Tag: the tag found
+        """
+        candidates = self.by_name.get(name, [])
+        index = bisect.bisect_right(candidates, self.position(tag), key=self.position)
+        for candidate_index in range(index, len(candidates)):
+            candidate = candidates[candidate_index]
+            if not siblings_only or candidate.parent is tag.parent:
+                return candidate
+        return None
@@ -1,4 +1,4 @@
-import termcolor, ebook_search, pyperclip, sys, cmd, typing
+import termcolor, ebook_search, pyperclip, sys, cmd, typing, requests, asyncio, urllib, time, re
 from word_info_extractor import *
 from utils import VALID_LANGUAGE_CODES
 from image_extractor import IMAGE_EXTRACTION, get_images_from_word
@@ -69,6 +69,8 @@ class Program(cmd.Cmd):
                 return func(arg)
             except WordNotAvailable as e:
                 print(e)
+            except requests.exceptions.RequestException as e:
+                print(f"Could not reach the dictionary: {e}", file=self.stdout)
 
     def cmdloop(self, intro=None):
         """Repeatedly issue a prompt, accept input, parse an initial prefix
@@ -143,10 +145,20 @@ class Program(cmd.Cmd):
             phrase = "_".join(input_list_wo_modifiers)
             term = phrase if ("--p" in modifiers) else word_str
             word = self.word_class(term)
+            # the definitions are extracted (and the root page fetched) here
+            word.root_entry
             self.previous_word = word
         except WordNotAvailable as e:
             print(e, file=self.stdout)
             return
+        except requests.exceptions.RequestException as e:
+            print(f"Could not reach the dictionary: {e}", file=self.stdout)
+            return
+        self.show_word(word)
+
+    def show_word(self, word: Word):
+        """Prints everything the primary source knows about word
+        and sends its phonetic information to the clipboard."""
         if not word.root == word.word:
             print(f"Redirecting to {word.root}\n", file=self.stdout)
         print(f"IPA: {word.ipa}\n", file=self.stdout)
@@ -155,6 +167,42 @@ class Program(cmd.Cmd):
         pyperclip.copy(f"{word.root_ipa} {word.root_pronunciation_url}")
         print(word.root_info, file=self.stdout)
 
+    def do_all(self, arg):
+        """Prints the definitions of every source of the current language.
+        The sources are fetched concurrently and each one is printed as soon
+        as it arrives."""
+        term = arg or (self.get_previous_word() and self.previous_word.root)
+        if not term:
+            print("Search for a word first or use all {word}.", file=self.stdout)
+            return
+        primary_source_name = urllib.parse.urlparse(self.word_class.base_url).netloc
+        sources = {
+            primary_source_name: self.word_class,
+            **self.all_sources.get(self.lang, {}),
+        }
+        asyncio.run(self._show_all_sources(term, sources))
+
+    async def _show_all_sources(self, term: str, sources: dict):
+        async def fetch(source_name, source_class):
+            try:
+                return source_name, source_class, await source_class.fetch(term), ""
+            except (WordNotAvailable, requests.exceptions.RequestException) as e:
+                return source_name, source_class, None, str(e)
+            except Exception as e:
+                return source_name, source_class, None, f"{source_name} failed: {e!r}"
+
+        fetches = [fetch(name, source_class) for name, source_class in sources.items()]
+        for next_fetch in asyncio.as_completed(fetches):
+            source_name, source_class, word, error = await next_fetch
+            print(termcolor.colored(source_name.upper(), "blue"), file=self.stdout)
+            if error:
+                print(error + "\n", file=self.stdout)
+            elif source_class is self.word_class:
+                self.previous_word = word
+                self.show_word(word)
+            else:
+                print(word.root_info, file=self.stdout)
+
     def get_previous_word(self):
         return vars(self).get("previous_word", "")
 
@@ -180,27 +228,20 @@ class Program(cmd.Cmd):
             CONFIG_PARSER.write(file)
 
     def do_examples(self, arg):
-        """prints examples on the screen"""
+        """prints examples on the screen: "examples [--limit N] [word]",
+        the best N examples (all of them with 0)"""
+        limit = int(CONFIG_PARSER["DEFAULT"].get("examples_limit", ebook_search.EXAMPLES_LIMIT))
+        option = re.match(r"--limit[ =](\d+)\s*", arg)
+        if option:
+            limit, arg = int(option[1]), arg[option.end() :]
         word = arg or self.previous_word
         if arg:
             inflections = tuple([word])
         else:
             inflections = self.previous_word.get_inflections()
-        for lang, book_name_text in self.ebook_lang_name_txt.items():
-            if lang != self.lang:
-                continue
-            book_name_text = [
-                (name, txt)
-                for book_name_txt in book_name_text
-                for name, txt in book_name_txt.items()
-            ]
-            for book_name, book_txt in book_name_text:
-                examples = ebook_search.get_examples(inflections, book_txt)
-                for example in examples:
-                    print(
-                        termcolor.colored(book_name.upper(), "blue"), file=self.stdout
-                    )
-                    print(example + "\n", file=self.stdout)
+        for book_name, example in self.ebooks.examples(self.lang, inflections, limit):
+            print(termcolor.colored(book_name.upper(), "blue"), file=self.stdout)
+            print(example + "\n", file=self.stdout)
 
     def do_toggle(self, arg):
         if arg == "show_word":
@@ -220,10 +261,25 @@ class Program(cmd.Cmd):
         except AttributeError:
             return default
 
+    def do_stats(self, arg):
+        """Shows how long each phase of the lookups took (p50/p95/p99 of the
+        last calls, in milliseconds). "stats export <path>" writes them to a
+        metrics text file and "stats clear" forgets them."""
+        command, _, path = arg.partition(" ")
+        if not METRICS.enabled:
+            print("Metrics are disabled (metrics = 0 in the configfile).", file=self.stdout)
+        elif command == "export":
+            path = path or "metrics.prom"
+            METRICS.export(path)
+            print(f"Metrics written to {path}", file=self.stdout)
+        elif command == "clear":
+            METRICS.clear()
+        else:
+            print(METRICS.report(), file=self.stdout)
+
     def preloop(self):
+        start = time.perf_counter()
         directory = ebook_search.EBOOK_DIR
-        dir_paths = absolute_file_paths(directory)
-        from collections import defaultdict
 
         for sources in self.all_sources.values():
             for source_name, source_class in sources.items():
@@ -236,18 +292,12 @@ class Program(cmd.Cmd):
                     return s
 
                 setattr(self, "do_" + source_name, source_func(source_class))
-        # {lang: [{name: txt}]}
-        self.ebook_lang_name_txt = defaultdict(list)
-        for dir_path in dir_paths:
-            dir_pathlib = pathlib.Path(dir_path)
-            file_paths = absolute_file_paths(dir_pathlib)
-            lang = dir_pathlib.name
-            for file_path in file_paths:
-                with open(file_path) as ebook_txt:
-                    ebook_name = os.path.splitext(os.path.basename(file_path))[0]
-                    self.ebook_lang_name_txt[lang].append(
-                        {ebook_name: ebook_txt.read()}
-                    )
+        # books are only read by the first "examples" of their language
+        self.ebooks = ebook_search.EbookLibrary.from_directory(directory)
+        METRICS.record("program", "preloop", time.perf_counter() - start)
+
+    def postloop(self):
+        self.ebooks.close()
 
 
 class TestProgram(Program):
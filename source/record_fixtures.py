@@ -0,0 +1,67 @@
+import argparse, json, pathlib, sys
+from unittest import mock
+from word_info_extractor import SESSION, RECENT_WORDS
+
+sys.path.append(str(pathlib.Path(__file__).parent / "tests"))
+from test_word_info_extractor import FIXTURE_DIR, fixture_path, fixture_get, word_result, ParserParityTestCase
+
+EXPECTED_PATH = FIXTURE_DIR / "expected" / "results.json"
+
+
+def save_pages(word_class: type, word: str):
+    """Looks word up on the real site and stores every HTML page it
+    fetched where fixture_get() finds them."""
+    real_get = SESSION.get
+
+    def saving_get(url, **kwargs):
+        response = real_get(url, **kwargs)
+        if response.ok and "html" in response.headers.get("Content-Type", ""):
+            path = fixture_path(url)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(response.content)
+            print(f"saved {path.relative_to(FIXTURE_DIR)}", file=sys.stderr)
+        return response
+
+    with mock.patch.object(SESSION, "cache", None), mock.patch.object(SESSION, "get", saving_get):
+        word_class(word).root_info
+    RECENT_WORDS.clear()
+
+
+def expected_results(keys) -> dict:
+    """Returns what html.parser, the parser every page went through before
+    html_parser was configurable, extracts from the stored pages.
+
+    Args:
+        keys (iterable): "<Word class>/<word>" strings
+    """
+    word_classes = ParserParityTestCase.word_classes
+    results = {}
+    with mock.patch.object(SESSION, "get", side_effect=fixture_get), mock.patch.object(
+        SESSION, "cache", None
+    ), mock.patch("utils.HTML_PARSER", "html.parser"):
+        for key in keys:
+            class_name, word = key.split("/")
+            results[key] = word_result(word_classes[class_name](word))
+    RECENT_WORDS.clear()
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Save the pages of the parser parity fixtures from the real sites and record what they contain"
+    )
+    arg_parser.add_argument(
+        "keys", nargs="*", help="<Word class>/<word> to add (all the recorded ones by default)"
+    )
+    arg_parser.add_argument(
+        "--results-only", action="store_true", help="don't fetch the pages again, only record the results"
+    )
+    args = arg_parser.parse_args()
+    expected = json.loads(EXPECTED_PATH.read_bytes())
+    keys = sorted(set(expected) | set(args.keys))
+    if not args.results_only:
+        for key in keys:
+            class_name, word = key.split("/")
+            save_pages(ParserParityTestCase.word_classes[class_name], word)
+    expected = expected_results(keys)
+    EXPECTED_PATH.write_text(json.dumps(expected, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
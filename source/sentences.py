@@ -0,0 +1,163 @@
+import array, bisect, re
+
+# texts are split as UTF-8 bytes, so that books can be searched through mmap
+# without being decoded. A terminator (with the quotes and brackets closing
+# the sentence: "'])»«“”‘’) or a blank line
+BOUNDARY_PATTERN = re.compile(
+    rb"[.?!]+(?:[\"')\]]|\xc2[\xab\xbb]|\xe2\x80[\x98\x99\x9c\x9d])*|\n[^\S\n]*\n\s*"
+)
+# the next character, with the continuation bytes of its UTF-8 encoding
+NEXT_CHARACTER_PATTERN = re.compile(rb"\s*(\S[\x80-\xbf]*)")
+WHITESPACE_PATTERN = re.compile(rb"\s*")
+# any byte of a non-ASCII character counts as a letter
+WORD_CHARACTER_PATTERN = re.compile(rb"[0-9A-Za-z_\x80-\xff]")
+# abbreviations that are followed by a "." without ending the sentence,
+# besides single letters ("z. B.", "d. h.", "J. S. Bach") which never do
+ABBREVIATIONS = {
+    "de": {
+        "abs", "bd", "bspw", "bzw", "ca", "dr", "evtl", "fr", "geb", "gest", "ggf", "hr",
+        "inkl", "jh", "jhd", "kap", "mio", "mrd", "nr", "prof", "sog", "st", "str", "usw",
+        "vgl", "zit",
+    },
+    "en": {"dr", "e.g", "etc", "i.e", "jr", "mr", "mrs", "ms", "no", "prof", "sr", "st", "vs"},
+    "fr": {"cf", "etc", "mlle", "mme", "mm", "dr", "st"},
+    "br": {"dr", "dra", "etc", "ex", "pág", "prof", "sr", "sra", "srta"},
+    "la": {"cf"},
+    "en-ru": {"г", "гг", "др", "им", "млн", "пр", "см", "ср", "стр", "тыс"},
+}
+# the word (possibly with "." inside, like "z.B") before a ".", at most
+# 8 characters: 8 bytes if they're ASCII, else decoded
+ABBREVIATION_PATTERN = re.compile(rb"[0-9A-Za-z_.\x80-\xff]{1,8}\Z")
+DECODED_ABBREVIATION_PATTERN = re.compile(r"[\w.]{1,8}\Z")
+# where "am 3. Mai" and "im 19. Jahrhundert" don't end sentences
+ORDINAL_LANGUAGES = {"de"}
+
+
+class SentenceOffsets:
+    """Start and end offsets (in UTF-8 bytes) of the sentences of a text,
+    in two arrays of integers (4 bytes per offset instead of a str per sentence).
+
+    Args:
+        starts (array.array): offset of the first character of every sentence.
+        ends (array.array): offset right after the terminator of every sentence.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, starts, ends):
+        self.starts, self.ends = starts, ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i) -> tuple:
+        return self.starts[i], self.ends[i]
+
+    def containing(self, start: int, end: int) -> int:
+        """Returns the index of the sentence data[start:end] is in, or -1"""
+        i = bisect.bisect_right(self.starts, start) - 1
+        if i >= 0 and end <= self.ends[i]:
+            return i
+        return -1
+
+    def span_containing(self, start: int, end: int):
+        """Returns the (start, end) of the sentence data[start:end] is in, or None"""
+        i = self.containing(start, end)
+        return None if i == -1 else self[i]
+
+    @property
+    def nbytes(self) -> int:
+        return self.starts.itemsize * (len(self.starts) + len(self.ends))
+
+
+def _is_abbreviation(data, dot: int, abbreviations: set, ordinals: bool) -> bool:
+    """Tells whether the "." at data[dot] ends an abbreviation"""
+    token = ABBREVIATION_PATTERN.search(data, max(0, dot - 8), dot)
+    if token is None:
+        return False
+    if token.group().isascii():
+        token = token.group().decode("ascii").lower()
+    else:
+        # at most 4 bytes per character, the first one may be cut
+        before = data[max(0, dot - 32) : dot].decode("utf-8", errors="ignore")
+        token = DECODED_ABBREVIATION_PATTERN.search(before, max(0, len(before) - 8))
+        if token is None:
+            return False
+        token = token.group().lower()
+    word = token.rsplit(".", 1)[-1]
+    if word.isdigit():
+        # years ("im Jahr 1990.") end sentences
+        return ordinals and len(word) <= 2
+    return len(word) == 1 and word.isalpha() or word in abbreviations or token in abbreviations
+
+
+def iter_sentences(data, language=None):
+    """Splits a text into sentences in one pass, without backtracking. A
+    sentence ends at ".", "?" or "!" followed by whitespace, unless the
+    next word starts in lowercase or the "." ends an abbreviation of
+    language ("z. B.", "usw."). A blank line also ends a sentence, but
+    only sentences ending with a terminator are kept: headings and
+    unfinished lines aren't examples.
+
+    Args:
+        data (bytes or mmap.mmap): UTF-8 text of a book.
+        language (str, optional): language code, for its abbreviations.
+
+    Yields:
+        tuple: (start, end) of every sentence, without its leading whitespace
+    """
+    abbreviations = ABBREVIATIONS.get(language, set())
+    ordinals = language in ORDINAL_LANGUAGES
+    start = 0
+    for boundary in BOUNDARY_PATTERN.finditer(data):
+        end = boundary.end()
+        if boundary.group()[:1] == b"\n":
+            start = end
+            continue
+        next_character = NEXT_CHARACTER_PATTERN.match(data, end)
+        if next_character is not None:
+            # "3.5", "z.B." or "ca. drei"
+            if end == next_character.start(1):
+                continue
+            if next_character.group(1).decode("utf-8", errors="ignore").islower():
+                continue
+        if boundary.group() == b"." and _is_abbreviation(data, boundary.start(), abbreviations, ordinals):
+            continue
+        start = WHITESPACE_PATTERN.match(data, start, end).end()
+        # "..." between two sentences isn't one
+        if WORD_CHARACTER_PATTERN.search(data, start, end):
+            yield start, end
+        start = end
+
+
+def sentence_offsets(data, language=None) -> SentenceOffsets:
+    """Returns the sentences of a text (see iter_sentences)"""
+    typecode = "I" if len(data) < 2**32 else "Q"
+    starts, ends = array.array(typecode), array.array(typecode)
+    for start, end in iter_sentences(data, language):
+        starts.append(start)
+        ends.append(end)
+    return SentenceOffsets(starts, ends)
+
+
+class SentenceCursor:
+    """The sentences of a text, only split as far as it's searched, for
+    searches that go forward and may stop before the end of the text.
+
+    Args:
+        data (bytes or mmap.mmap): UTF-8 text of a book.
+        language (str, optional): language code, for its abbreviations.
+    """
+
+    def __init__(self, data, language=None):
+        self._sentences = iter_sentences(data, language)
+        self._current = (-1, -1)
+
+    def span_containing(self, start: int, end: int):
+        """Returns the (start, end) of the sentence data[start:end] is in,
+        or None. start can't be before the one of the previous call."""
+        while self._current is not None and self._current[1] < end:
+            self._current = next(self._sentences, None)
+        if self._current is None or self._current[0] > start:
+            return None
+        return self._current
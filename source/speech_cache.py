@@ -0,0 +1,84 @@
+import hashlib, os, pathlib, threading, concurrent.futures
+from utils import CONFIG_PARSER
+
+SPEECH_DIR = pathlib.Path(__file__).parent / ".speech_cache"
+
+
+class SpeechCache:
+    """Directory of gTTS recordings, each one named after a hash of the
+    text and the accent (tld) it was synthesized with, so that the same
+    text is only synthesized once. Synthesis happens in a background
+    thread: url() returns right away and the file appears when gTTS is done.
+
+    Args:
+        directory (str): where the recordings are kept.
+    """
+
+    def __init__(self, directory=SPEECH_DIR):
+        self.directory = pathlib.Path(directory)
+        # one worker, so that gTTS isn't flooded with requests
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="speech")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def path(self, text: str, tld="us") -> pathlib.Path:
+        """Returns where the recording of text is (or will be) stored"""
+        digest = hashlib.sha256(f"{tld}\0{text}".encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.mp3"
+
+    def url(self, text: str, tld="us") -> str:
+        """Returns the file:// url of the recording of text, starting
+        its synthesis if it isn't stored yet.
+
+        Args:
+            text (str): what to say.
+            tld (str, optional): Google Translate domain, which picks the accent ("us", "co.uk"...).
+
+        Returns:
+            str: file url of the recording
+        """
+        self.synthesize(text, tld)
+        return self.path(text, tld).as_uri()
+
+    def synthesize(self, text: str, tld="us") -> concurrent.futures.Future:
+        """Returns a future that is done once the recording of text is stored"""
+        path = self.path(text, tld)
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                if path.exists():
+                    future = concurrent.futures.Future()
+                    future.set_result(path)
+                    return future
+                future = self._pending[path] = self._executor.submit(
+                    self._synthesize, text, tld, path
+                )
+        # outside the lock, the callback runs right away if the future is done
+        future.add_done_callback(lambda _: self._forget(path))
+        return future
+
+    def _forget(self, path):
+        with self._lock:
+            self._pending.pop(path, None)
+
+    @staticmethod
+    def _synthesize(text: str, tld: str, path: pathlib.Path) -> pathlib.Path:
+        # imported by the worker, so that starting the program doesn't wait for it
+        import gtts
+
+        partial_path = path.with_suffix(f".{threading.get_ident()}.part")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(partial_path, "wb") as file:
+                gtts.gTTS(text, tld=tld).write_to_fp(file)
+            # players never see a half-written file
+            os.replace(partial_path, path)
+        finally:
+            partial_path.unlink(missing_ok=True)
+        return path
+
+
+def speech_cache_from_config() -> SpeechCache:
+    """Returns the SpeechCache in the directory set by "speech_cache_path"
+    in the config file"""
+    return SpeechCache(CONFIG_PARSER["DEFAULT"].get("speech_cache_path", SPEECH_DIR))
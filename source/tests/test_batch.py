@@ -0,0 +1,89 @@
+import sys, pathlib, tempfile, json
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main, mock
+from batch import *
+from word_info_extractor import SESSION, DEWiktionaryWord
+from dictionary_entry import Entry
+from test_word_info_extractor import fixture_get
+
+
+@mock.patch.object(SESSION, "get", side_effect=fixture_get)
+class BatchTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.dir_path = pathlib.Path(self.test_dir.name)
+        self.out_path = self.dir_path / "results.jsonl"
+        self.word_list_path = self.dir_path / "words.txt"
+        self.word_list_path.write_text("ging\n\ngehen\nging\nbruh123\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_read_words(self, get):
+        self.assertEqual(
+            read_words(self.word_list_path), ["ging", "gehen", "bruh123"]
+        )
+
+    def test_records(self, get):
+        words = read_words(self.word_list_path)
+        self.assertEqual(run_batch(words, DEWiktionaryWord, self.out_path), 3)
+        records = {record["word"]: record for record in self.records()}
+        self.assertEqual(records["ging"]["root"], "gehen")
+        self.assertEqual(records["ging"]["ipa"], DEWiktionaryWord("ging").ipa)
+        self.assertEqual(records["ging"]["root_ipa"], DEWiktionaryWord("gehen").ipa)
+        self.assertIn("gegangen", records["ging"]["inflections"])
+        self.assertIsNone(records["gehen"]["error"])
+        self.assertEqual(records["gehen"]["root_info"], DEWiktionaryWord("gehen").root_info)
+        self.assertEqual(Entry.from_json(records["gehen"]["entry"]), DEWiktionaryWord("gehen").root_entry)
+        self.assertIn("Word not available", records["bruh123"]["error"])
+
+    def test_resume(self, get):
+        Checkpoint(str(self.out_path) + ".checkpoint").add("ging")
+        words = read_words(self.word_list_path)
+        self.assertEqual(run_batch(words, DEWiktionaryWord, self.out_path), 2)
+        self.assertEqual(run_batch(words, DEWiktionaryWord, self.out_path), 0)
+        self.assertEqual(
+            sorted(record["word"] for record in self.records()), ["bruh123", "gehen"]
+        )
+
+    def test_resume_after_crash(self, get):
+        # ging was recorded but not checkpointed, and gehen was being written
+        record = lookup(DEWiktionaryWord, "ging")
+        self.out_path.write_text(json.dumps(record) + "\n" + '{"word": "ge')
+        words = read_words(self.word_list_path)
+        self.assertEqual(run_batch(words, DEWiktionaryWord, self.out_path), 2)
+        self.assertEqual(
+            sorted(record["word"] for record in self.records()), ["bruh123", "gehen", "ging"]
+        )
+
+    def test_network_errors_are_retried(self, get):
+        get.side_effect = requests.exceptions.ConnectionError("offline")
+        self.assertEqual(run_batch(["ging"], DEWiktionaryWord, self.out_path), 0)
+        self.assertEqual(self.records(), [])
+        get.side_effect = fixture_get
+        self.assertEqual(run_batch(["ging"], DEWiktionaryWord, self.out_path), 1)
+
+    def test_resume_after_network_errors(self, get):
+        def offline_ging(url, **kwargs):
+            if url.endswith("/ging"):
+                raise requests.exceptions.ConnectionError("offline")
+            return fixture_get(url, **kwargs)
+
+        words = read_words(self.word_list_path)
+        get.side_effect = offline_ging
+        self.assertEqual(run_batch(words, DEWiktionaryWord, self.out_path), 2)
+        get.side_effect = fixture_get
+        self.assertEqual(run_batch(words, DEWiktionaryWord, self.out_path), 1)
+        records = self.records()
+        # every word is recorded once, without the network error
+        self.assertEqual(sorted(record["word"] for record in records), ["bruh123", "gehen", "ging"])
+        self.assertEqual(next(record for record in records if record["word"] == "ging")["root"], "gehen")
+
+    def records(self):
+        with open(self.out_path) as out:
+            return [json.loads(line) for line in out]
+
+
+if __name__ == "__main__":
+    main()
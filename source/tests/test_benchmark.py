@@ -0,0 +1,51 @@
+import sys, pathlib
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+from benchmark import *
+from utils import make_soup
+
+
+class CorpusTestCase(TestCase):
+    def test_every_class_has_definitions(self):
+        # pages of inflections (like "ging") have no definitions of their own
+        classes_with_definitions = set()
+        for word_class, word in CORPUS:
+            page = word_class._only_relevant_part(make_soup(corpus_page(word_class, word)))
+            if extract(word_class, word, page).sections:
+                classes_with_definitions.add(word_class)
+        self.assertEqual(classes_with_definitions, {word_class for word_class, _ in CORPUS})
+        self.assertEqual(len(classes_with_definitions), 9)
+
+    def test_large_pages(self):
+        content = corpus_page(DudenWord, "Stuhl")
+        large = enlarge(content, 3)
+        page = make_soup(large)
+        self.assertEqual(len(page.find_all("body")), 1)
+        self.assertEqual(len(page.find_all("h1")), 3 * len(make_soup(content).find_all("h1")))
+
+
+class BenchmarkTestCase(TestCase):
+    def test_run(self):
+        results = run(repeat=2, large_copies=2, only="BRDicioWord")
+        self.assertEqual(set(results), {"BRDicioWord/bola/page", "BRDicioWord/bola/large"})
+        for result in results.values():
+            for phase in PHASES:
+                self.assertLessEqual(result[phase]["p50"], result[phase]["p99"])
+        self.assertIn("BRDicioWord/bola/large", report(results))
+
+    def test_regressions(self):
+        def result(seconds):
+            return {phase: {"p50": seconds} for phase in PHASES}
+
+        baseline = {"A/a/page": result(0.010), "B/b/page": result(0.00001)}
+        self.assertEqual(regressions({"A/a/page": result(0.012)}, baseline, 0.25), [])
+        self.assertEqual(len(regressions({"A/a/page": result(0.020)}, baseline, 0.25)), 3)
+        self.assertEqual(len(regressions({"A/a/page": result(0.020)}, baseline, 1.5)), 0)
+        # too small to be more than noise
+        self.assertEqual(regressions({"B/b/page": result(0.0001)}, baseline, 0.25), [])
+        self.assertEqual(regressions({"C/c/page": result(1)}, baseline, 0.25), [])
+
+
+if __name__ == "__main__":
+    main()
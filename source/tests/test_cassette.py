@@ -0,0 +1,137 @@
+import sys, pathlib, tempfile, http.server, threading, time, urllib.parse, requests
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main, mock
+from cassette import *
+from utils import NeverSayNeverSession, RetryPolicy
+from word_info_extractor import SESSION, DEWiktionaryWord
+
+FIXTURE_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serves FIXTURE_DIR/<host>/<word>.html at /<host>/<word>"""
+
+    def do_GET(self):
+        path = FIXTURE_DIR / urllib.parse.unquote(self.path.lstrip("/") + ".html")
+        body = path.read_bytes() if path.exists() else b"\x00\xff not found"
+        self.send_response(200 if path.exists() else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureAdapter(requests.adapters.BaseAdapter):
+    """Answers https://<host>/.../<word> with FIXTURE_DIR/<host>/<word>.html"""
+
+    def send(self, request, **kwargs):
+        url = urllib.parse.urlparse(request.url)
+        word = urllib.parse.unquote(url.path.split("/")[-1])
+        path = FIXTURE_DIR / url.netloc / f"{word}.html"
+        response = requests.Response()
+        response.request, response.url, response.encoding = request, request.url, "utf-8"
+        response.status_code = 200 if path.exists() else 404
+        response._content = path.read_bytes() if path.exists() else b""
+        return response
+
+    def close(self):
+        pass
+
+
+class CassetteTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.test_dir.name) / "cassette.json"
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def session(self):
+        return NeverSayNeverSession(RetryPolicy(max_attempts=3, backoff_factor=0))
+
+    def test_record_and_replay(self):
+        url = self.base_url + "www.duden.de/Stuhl"
+        session = self.session()
+        mount_cassette(session, self.path, "record")
+        recorded = session.get(url)
+        self.assertIn(("GET", url), Cassette(self.path).exchanges)
+        session = self.session()
+        mount_cassette(session, self.path, "replay")
+        with mock.patch.object(requests.adapters.HTTPAdapter, "send", side_effect=AssertionError):
+            replayed = session.get(url)
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.content, recorded.content)
+        self.assertEqual(replayed.text, recorded.text)
+        self.assertEqual(replayed.headers["Content-Type"], "text/html; charset=utf-8")
+
+    def test_binary_body_and_gzip(self):
+        self.path = self.path.with_suffix(".json.gz")
+        url = self.base_url + "nowhere/bruh123"
+        session = self.session()
+        mount_cassette(session, self.path, "once")
+        self.assertEqual(session.get(url).status_code, 404)
+        session = self.session()
+        mount_cassette(session, self.path, "replay")
+        response = session.get(url)
+        self.assertEqual((response.status_code, response.content), (404, b"\x00\xff not found"))
+
+    def test_miss_in_replay_mode(self):
+        session = self.session()
+        mount_cassette(session, self.path, "replay")
+        with mock.patch("time.sleep") as sleep:
+            with self.assertRaises(CassetteMiss):
+                session.get(self.base_url + "www.duden.de/Stuhl")
+        # not retried
+        sleep.assert_not_called()
+        self.assertFalse(self.path.exists())
+
+    def test_latency(self):
+        url = self.base_url + "www.duden.de/Stuhl"
+        session = self.session()
+        mount_cassette(session, self.path, "once")
+        session.get(url)
+        session = self.session()
+        mount_cassette(session, self.path, "replay", latency=0.05)
+        start = time.perf_counter()
+        session.get(url)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_use_cassette_restores_adapters(self):
+        session = NeverSayNeverSession(RetryPolicy(host_pool_sizes={"de.wiktionary.org": 2}))
+        adapters = dict(session.adapters)
+        with use_cassette(session, self.path, "replay"):
+            self.assertTrue(
+                all(isinstance(adapter, CassetteAdapter) for adapter in session.adapters.values())
+            )
+        self.assertEqual(dict(session.adapters), adapters)
+
+    def test_words_from_cassette(self):
+        with use_cassette(SESSION, self.path, "record") as cassette:
+            for adapter in SESSION.adapters.values():
+                adapter.real_adapter = FixtureAdapter()
+            with mock.patch.object(SESSION, "cache", None):
+                recorded = DEWiktionaryWord("ging")
+                recorded.root_info
+        self.assertEqual(len(cassette.exchanges), 2)
+        with use_cassette(SESSION, self.path, "replay"), mock.patch.object(SESSION, "cache", None):
+            replayed = DEWiktionaryWord("ging")
+            self.assertEqual(replayed.root, "gehen")
+            self.assertEqual(replayed.root_info, recorded.root_info)
+
+
+if __name__ == "__main__":
+    main()
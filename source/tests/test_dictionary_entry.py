@@ -0,0 +1,63 @@
+import sys, pathlib, json
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+from dictionary_entry import *
+
+
+class EntryTestCase(TestCase):
+    def setUp(self):
+        self.entry = Entry(
+            "wiktionary",
+            [
+                Section(
+                    "Noun",
+                    "house (plural houses)",
+                    [("1", "A structure serving as an abode of human beings.")],
+                    [("", "house (plural houses)"), ("1", "This is my house.")],
+                ),
+                Section("Verb", "house (third-person singular houses)", [("1", "To keep within a structure.")]),
+            ],
+            hidden_word="house",
+        )
+
+    def test_json_round_trip(self):
+        data = json.loads(json.dumps(self.entry.to_json()))
+        self.assertEqual(Entry.from_json(data), self.entry)
+        self.assertEqual(Entry.from_json(data).render(), self.entry.render())
+
+    def test_render(self):
+        text = self.entry.render()
+        self.assertIn("NOUN\nhouse (plural houses)\n[1] A structure", text)
+        self.assertIn("EXAMPLES:\nhouse (plural houses)\n[1] This is my house.", text)
+        self.assertIn("VERB", text)
+
+    def test_hidden_word(self):
+        text = self.entry.render(show_word=False)
+        self.assertNotIn("house", text)
+        self.assertIn("[1] This is my _.", text)
+
+    def test_layouts(self):
+        for layout in LAYOUTS:
+            with self.subTest(layout):
+                entry = Entry(layout, self.entry.sections)
+                self.assertIn("A structure", entry.render(title="house"))
+
+    def test_dictionary_layout(self):
+        entry = Entry("dictionary", [Section(senses=[("1", "Sitzmöbel"), ("1a", "Lehnstuhl")])])
+        self.assertEqual(
+            entry.render(title="Stuhl", pronunciation=("ʃtuːl", "https://example.org/Stuhl.mp3")),
+            "Stuhl\nPhonetics: ʃtuːl https://example.org/Stuhl.mp3\n[1] Sitzmöbel\n[1a] Lehnstuhl",
+        )
+
+    def test_dwds_layout(self):
+        senses = [("1", "Sitzmöbel"), ("1a", "Lehnstuhl"), ("9", "Amt"), ("10", "Stuhlgang")]
+        entry = Entry("dwds", [Section(senses=senses)])
+        self.assertEqual(
+            entry.render(title="Stuhl", pronunciation=("ʃtuːl", "https://example.org/Stuhl.mp3")),
+            "Stuhl\nPhonetics: ʃtuːl https://example.org/Stuhl.mp3\n[1] Sitzmöbel\n [1a] Lehnstuhl\n[9] Amt\n [10] Stuhlgang",
+        )
+
+
+if __name__ == "__main__":
+    main()
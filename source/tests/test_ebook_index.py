@@ -0,0 +1,82 @@
+import sys, pathlib, tempfile
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+from ebook_index import *
+
+
+class SentenceUnitsTestCase(TestCase):
+    def test_units(self):
+        text = "Er ging. Dann kam sie\nund sagte nichts. Ende ohne Zeile! Noch\neins?\nRest"
+        self.assertEqual(
+            list(sentence_units(text)),
+            [(0, "Er ging."), (9, "Dann kam sie\nund sagte nichts."), (40, "Ende ohne Zeile!"), (57, "Noch\neins?")],
+        )
+
+    def test_bytes(self):
+        # offsets are in bytes, sentences are decoded
+        self.assertEqual(list(sentence_units("Öl floß. Ärger kam.".encode("utf-8"))), [(0, "Öl floß."), (11, "Ärger kam.")])
+
+    def test_match_query(self):
+        self.assertEqual(match_query(["schläft", 'sag"te', "..."]), '"schläft" OR "sag""te"')
+
+
+class SentenceIndexTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.test_dir.name) / "de.sqlite"
+        self.index = SentenceIndex(self.path)
+        self.index.add("faust", "Da steh ich nun.\nIch armer Tor!\nUnd bin so klug als wie zuvor.", "1:1")
+        self.index.add("werther", "Wie froh bin ich.\nDass ich weg bin!", "2:2")
+
+    def tearDown(self):
+        self.index.close()
+        self.test_dir.cleanup()
+
+    def candidates(self, phrases) -> dict:
+        """Returns {book name: its sentences containing any of phrases}"""
+        found = {name: list(self.index.book_candidates(name, phrases)) for name in self.index.books()}
+        return {name: sentences for name, sentences in found.items() if sentences}
+
+    def test_candidates(self):
+        self.assertEqual(
+            self.candidates(["ich"]),
+            {"faust": ["Da steh ich nun.", "Ich armer Tor!"], "werther": ["Wie froh bin ich.", "Dass ich weg bin!"]},
+        )
+        self.assertEqual(self.candidates(["klug", "froh"]), {
+            "faust": ["Und bin so klug als wie zuvor."], "werther": ["Wie froh bin ich."]
+        })
+        # accents matter
+        self.assertEqual(self.candidates(["Dass"]), {"werther": ["Dass ich weg bin!"]})
+        self.assertEqual(self.candidates(["Daß"]), {})
+        self.assertEqual(self.candidates([]), {})
+
+    def test_book_candidates(self):
+        self.assertEqual(list(self.index.book_candidates("faust", ["ich"])), ["Da steh ich nun.", "Ich armer Tor!"])
+        self.index.add("faust", "Ich bin klug. Du nicht. Er schon.", "1:2")
+        self.assertEqual(list(self.index.book_candidates("faust", ["er", "ich", "du"])), ["Ich bin klug.", "Du nicht.", "Er schon."])
+        self.assertEqual(list(self.index.book_candidates("faust", [])), [])
+
+    def test_persistent(self):
+        self.index.close()
+        self.index = SentenceIndex(self.path)
+        self.assertEqual(self.index.books(), {"faust": "1:1", "werther": "2:2"})
+        self.assertIn("faust", self.candidates(["Tor"]))
+
+    def test_rules_version(self):
+        self.index._connection.execute(f"PRAGMA user_version = {SENTENCE_RULES_VERSION - 1}")
+        self.index.close()
+        self.index = SentenceIndex(self.path)
+        self.assertEqual(self.index.books(), {})
+
+    def test_replace_and_remove(self):
+        self.index.add("faust", "Habe nun, ach!", "1:2")
+        self.assertEqual(self.candidates(["Tor"]), {})
+        self.assertEqual(self.index.books()["faust"], "1:2")
+        self.index.remove("werther")
+        self.assertEqual(self.index.books(), {"faust": "1:2"})
+        self.assertEqual(self.candidates(["froh"]), {})
+
+
+if __name__ == "__main__":
+    main()
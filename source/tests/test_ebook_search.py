@@ -1,7 +1,7 @@
-import sys, pathlib
+import sys, pathlib, tempfile, time
 
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
-from unittest import TestCase, main
+from unittest import TestCase, main, mock
 from ebook_search import *
 
 
@@ -21,13 +21,13 @@ Und wo sie stand, da schläft sie ein."""
 
     def test_get_examples(self):
         with self.subTest("not separable"):
-            result = get_examples("Luft", self.text)
+            result = list(get_examples("Luft", self.text))
             self.assertEqual(len(result), 1)
         with self.subTest("separable"):
-            result = get_examples("schläft ein", self.text)
+            result = list(get_examples("schläft ein", self.text))
             self.assertEqual(len(result), 1)
         with self.subTest("case sensitivity"):
-            result = get_examples("und", self.text)
+            result = list(get_examples("und", self.text))
             self.assertEqual(len(result), 1)
 
     def test_colored_words(self):
@@ -41,5 +41,244 @@ Und wo sie stand, da schläft sie ein."""
             self.assertEqual(result, ["schläft", "ein"])
 
 
+class ExampleMatcherTestCase(TestCase):
+    def setUp(self):
+        self.text = (
+            "Und wenn er zu Mittage schläft,\nSich nicht das Blatt am Zweige regt. Und wo sie stand,\n"
+            "da schläft sie ein. Die Luft\nist still; und die Nymphe schläft ein, leise.\n"
+            "Nie schläft sie mein! Er schlief. Wenn er einschläft? UND er\nschlief gut. "
+            "Ihre E-Mail\nkam nie. Die Mail? Ohne Ende"
+        )
+
+    def find(self, words) -> dict:
+        """Returns {example without colors: colored words}"""
+        return {
+            re.sub(r"\x1b\[\d+m", "", example): get_colored_text(example)
+            for example in self.examples(words)
+        }
+
+    def examples(self, words) -> list:
+        """Returns every match of words in self.text, colored"""
+        return [color_spans(*match) for match in ExampleMatcher(words).matches(self.text.encode("utf-8"))]
+
+    def test_trie_pattern(self):
+        self.assertEqual(trie_pattern(["gehe", "gehen", "ging"]), "g(?:ehe(?:n)?|ing)")
+        self.assertEqual(trie_pattern(["a", "ab", "b"]), "(?:a(?:b)?|b)")
+
+    def test_sentences(self):
+        self.assertEqual(
+            self.find("und"),
+            {
+                "Und wenn er zu Mittage schläft,\nSich nicht das Blatt am Zweige regt.": ["Und"],
+                "Und wo sie stand,\nda schläft sie ein.": ["Und"],
+                "Die Luft\nist still; und die Nymphe schläft ein, leise.": ["und"],
+                "UND er\nschlief gut.": ["UND"],
+            },
+        )
+        # "Ohne Ende" has no terminator
+        self.assertEqual(self.find(("ende", "bruh123")), {})
+
+    def test_separable(self):
+        self.assertEqual(
+            self.find("schläft ein"),
+            {
+                "Und wo sie stand,\nda schläft sie ein.": ["schläft", "ein"],
+                "Die Luft\nist still; und die Nymphe schläft ein, leise.": ["schläft", "ein"],
+                "Wenn er einschläft?": ["einschläft"],
+            },
+        )
+        self.assertEqual(self.find("Schläft ein"), {})
+
+    def test_words_with_hyphens(self):
+        self.assertEqual(self.find("E-Mail"), {"Ihre E-Mail\nkam nie.": ["E-Mail"]})
+        examples = self.examples(("Mail", "nie"))
+        self.assertEqual(
+            sorted(map(get_colored_text, examples)), [["Mail"], ["Mail"], ["Nie"], ["nie"]]
+        )
+
+    def test_sentences_searched(self):
+        with mock.patch.object(
+            ExampleMatcher, "sentence_matches", autospec=True, return_value=[]
+        ) as sentence_matches:
+            list(get_examples(("schlief", "einschläft", "Luft"), self.text))
+        # the other sentences aren't decoded, they don't contain the words
+        self.assertEqual(sentence_matches.call_count, 4)
+
+    def test_case_in_bytes(self):
+        self.assertEqual(utf8_case_pattern("ä"), r"(?:\xc3\x84|\xc3\xa4)")
+        self.assertEqual(utf8_case_pattern("a"), r"[\x41\x61]")
+        self.assertEqual(self.find("SCHLÄFT"), self.find("schläft"))
+        self.assertEqual(len(self.find("schläft")), 4)
+        # letters that aren't ASCII are told apart from punctuation once decoded
+        self.assertEqual(list(get_examples("Tor", "„Tor“ rief er. Torö kam.")), ["„" + termcolor.colored("Tor", "red") + "“ rief er."])
+
+    def test_language(self):
+        self.assertEqual(len(list(get_examples("Mai", "Er kam am 3. Mai. Gut.", "de"))), 1)
+        self.assertIn("Er kam", next(iter(get_examples("Mai", "Er kam am 3. Mai. Gut.", "de"))))
+        self.assertNotIn("Er kam", next(iter(get_examples("Mai", "Er kam am 3. Mai. Gut."))))
+
+    def test_linear_time(self):
+        hostile = {
+            "schläft ein": "schläft " * 100_000 + "aus.",
+            "Haus": "Haus\n" * 100_000 + "Baum.",
+            "oder": "a\n" * 200_000 + "oder",
+        }
+        for words, text in hostile.items():
+            with self.subTest(words):
+                start = time.perf_counter()
+                list(get_examples(words, text))
+                self.assertLess(time.perf_counter() - start, 2)
+
+
+class RankExamplesTestCase(TestCase):
+    def test_early_termination(self):
+        text = "Das Haus steht. " * 100_000
+        with mock.patch.object(
+            ExampleMatcher, "sentence_matches", autospec=True, side_effect=ExampleMatcher.sentence_matches
+        ) as sentence_matches:
+            examples = get_examples("Haus", text, limit=3)
+            self.assertEqual(get_colored_text(next(examples)), ["Haus"])
+        # the rest of the text isn't split nor searched
+        self.assertEqual(sentence_matches.call_count, 3 * CANDIDATES_PER_EXAMPLE)
+        # near-identical sentences are only shown once
+        self.assertEqual(list(examples), [])
+
+    def test_ranking(self):
+        short, long = ("Ein Haus.", "Das alte Haus am Ende der Straße steht seit hundert Jahren leer, sagt man im Dorf.")
+        text = f"{short} {long} {'Und ' * 40}ein Haus."
+        self.assertEqual([re.sub(r"\x1b\[\d+m", "", example) for example in get_examples("Haus", text, limit=2)], [long, short])
+        # without limit, in the order of the text
+        self.assertEqual(len(list(get_examples("Haus", text))), 3)
+
+    def test_books_take_turns(self):
+        books = [
+            ("a", [("Eins a.", [(0, 4)]), ("Zwei a.", [(0, 4)]), ("Drei a!", [(0, 4)])]),
+            ("b", [("Eins b.", [(0, 4)]), ("EINS, a.", [(0, 4)])]),
+        ]
+        self.assertEqual(
+            [(name, sentence) for name, (sentence, spans) in rank_examples(books, 4)],
+            [("a", "Eins a."), ("b", "Eins b."), ("a", "Zwei a."), ("a", "Drei a!")],
+        )
+        self.assertEqual(len(list(rank_examples(books))), 4)
+        self.assertEqual(example_key("EINS, a."), example_key("Eins a."))
+
+    def test_books_read_as_examples_are_picked(self):
+        read = []
+
+        def books():
+            for name in "abc":
+                read.append(name)
+                yield name, [(f"Eins {name}.", [(0, 4)]), (f"Zwei {name}.", [(0, 4)])]
+
+        examples = rank_examples(books(), 2)
+        self.assertEqual(next(examples), ("a", ("Eins a.", [(0, 4)])))
+        self.assertEqual(read, ["a"])
+        self.assertEqual(next(examples), ("b", ("Eins b.", [(0, 4)])))
+        self.assertEqual(list(examples), [])
+        self.assertEqual(read, ["a", "b"])
+
+
+class EbookLibraryTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        directory = pathlib.Path(self.test_dir.name)
+        (directory / "de").mkdir()
+        (directory / "en-ru").mkdir()
+        (directory / "de" / "faust.txt").write_text("Da steh ich nun, ich armer Tor! " * 100)
+        (directory / "de" / "werther.txt").write_text("Wie froh bin ich, dass ich weg bin! " * 100)
+        (directory / "en-ru" / "мать.txt").write_text("Каждый день над рабочей слободкой. " * 100)
+        self.directory = directory
+        self.library = EbookLibrary.from_directory(directory, memory_budget=2**20)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_registered_without_reading(self):
+        self.assertEqual(self.library.names("de"), ["faust", "werther"])
+        self.assertEqual(self.library.names("en-ru"), ["мать"])
+        self.assertEqual(self.library.names("fr"), [])
+        self.assertEqual(len(self.library._books), 0)
+
+    def test_mapped_once(self):
+        with mock.patch("ebook_search.map_book", side_effect=map_book) as mapped:
+            examples = list(self.library.examples("de", "ich"))
+            self.assertEqual(list(self.library.examples("de", "ich")), examples)
+        self.assertEqual(mapped.call_count, 2)
+        self.assertEqual({name for name, example in examples}, {"faust", "werther"})
+        data, sentences = self.library.book("de", "faust")
+        self.assertIsInstance(data, mmap.mmap)
+        # the other languages aren't mapped, and the text isn't in the process
+        sizes = [book_size(self.library.book("de", name)) for name in self.library.names("de")]
+        self.assertEqual(self.library._books.currsize, sum(sizes))
+        self.assertLess(self.library._books.currsize, sum(path.stat().st_size for path in self.library.paths["de"].values()))
+
+    def test_memory_budget(self):
+        # room for one of the books only
+        size = max(book_size(self.library.book("de", name)) for name in self.library.names("de"))
+        library = EbookLibrary(self.library.paths, memory_budget=size + 100)
+        library.book("de", "faust")
+        library.book("de", "werther")
+        self.assertLessEqual(library._books.currsize, library.memory_budget)
+        with mock.patch("ebook_search.map_book", side_effect=map_book) as mapped:
+            library.book("de", "werther")
+            mapped.assert_not_called()
+            library.book("de", "faust")
+            mapped.assert_called_once()
+
+    def test_indexed_examples(self):
+        text = (
+            "Und wenn er zu Mittage schläft,\nSich nicht das Blatt am Zweige regt. Und wo sie stand,\n"
+            "da schläft sie ein. Die Luft\nist still; und die Nymphe schläft ein, leise.\n"
+            "Nie schläft sie mein! Er schlief. Wenn er einschläft? Und er\nschlief gut."
+        ) * 3
+        (self.directory / "de" / "faust.txt").write_text(text)
+        words = ("schläft ein", "schlief", "Und", "luft", "bruh123")
+        expected = [("faust", example) for example in get_examples(words, text)]
+        self.assertEqual(list(self.library.examples("de", words)), expected)
+        self.assertEqual(len(list(self.library.examples("de", words, limit=3))), 3)
+        index_ebooks(self.directory)
+        library = EbookLibrary.from_directory(self.directory)
+        with mock.patch("ebook_search.map_book", side_effect=AssertionError):
+            self.assertEqual(list(library.examples("de", words)), expected)
+            self.assertEqual(list(library.examples("de", words, limit=3)), list(self.library.examples("de", words, limit=3)))
+            self.assertEqual({name for name, example in library.examples("en-ru", ["день"])}, {"мать"})
+        # books changed after indexing are searched whole
+        (self.directory / "de" / "werther.txt").write_text("Und er schlief ein.\n" + text)
+        self.assertEqual(
+            list(library.examples("de", words)),
+            expected + [("werther", example) for example in get_examples(words, "Und er schlief ein.")],
+        )
+
+    def test_partition_books(self):
+        sizes = {"a": 100, "b": 10, "c": 30, "d": 5, "e": 55}
+        self.assertEqual(partition_books(sizes, 2), [["a"], ["e", "c", "b", "d"]])
+        self.assertEqual(partition_books(sizes, 100), [["a"], ["e"], ["c"], ["b"], ["d"]])
+        self.assertEqual(partition_books({}, 4), [])
+
+    def test_workers(self):
+        (self.directory / "de" / "werther.txt").write_text("Da schlief ich ein. " * 1000)
+        for name in ("egmont", "tasso", "iphigenie"):
+            (self.directory / "de" / f"{name}.txt").write_text(f"Ich bin {name}. Ich schlief nie, {name}! " * 100)
+        words = ("schlief ein", "schlief", "bin")
+        in_process = EbookLibrary.from_directory(self.directory, workers=1)
+        library = EbookLibrary.from_directory(self.directory, workers=2)
+        try:
+            self.assertCountEqual(library.examples("de", words), in_process.examples("de", words))
+            self.assertCountEqual(library.examples("de", words, 4), in_process.examples("de", words, 4))
+            pool = library._executor()
+            self.assertIsNotNone(pool)
+            # reused by the next searches, even if they stop early
+            next(library.examples("de", words))
+            self.assertIs(library._executor(), pool)
+        finally:
+            library.close()
+        self.assertIsNone(library._pool)
+
+    def test_book_bigger_than_budget(self):
+        library = EbookLibrary(self.library.paths, memory_budget=100)
+        self.assertEqual([name for name, example in library.examples("en-ru", "слободкой")], ["мать"])
+        self.assertEqual(len(library._books), 0)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+import sys, pathlib, tempfile, time
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main, mock
+from http_cache import *
+
+
+def make_response(url, status_code=200, content=b"<html>Stuhl</html>", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.encoding = "utf-8"
+    response.headers = CaseInsensitiveDict({"Content-Type": "text/html", **(headers or {})})
+    response._content = content
+    return response
+
+
+class NormalizeUrlTestCase(TestCase):
+    def test_equivalent_urls(self):
+        self.assertEqual(
+            normalize_url("HTTPS://De.Wiktionary.org/wiki/Stra%C3%9Fe#Deutsch"),
+            normalize_url("https://de.wiktionary.org/wiki/Straße"),
+        )
+
+    def test_query_order(self):
+        self.assertEqual(
+            normalize_url("https://a.org/w?b=2&a=1"),
+            normalize_url("https://a.org/w?a=1&b=2"),
+        )
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(pathlib.Path(self.test_dir.name) / "cache.sqlite")
+        self.url = "https://de.wiktionary.org/wiki/Stuhl"
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_opened_when_used(self):
+        path = pathlib.Path(self.test_dir.name) / "cache.sqlite"
+        self.cache.flush()
+        self.assertFalse(path.exists())
+        self.assertIsNone(self.cache.get(self.url))
+        self.assertTrue(path.exists())
+
+    def test_hit(self):
+        self.assertIsNone(self.cache.get(self.url))
+        self.cache.put(self.url, make_response(self.url))
+        response = self.cache.get(self.url)
+        self.assertEqual(response.text, "<html>Stuhl</html>")
+        self.assertEqual(response.headers["content-type"], "text/html")
+        self.assertTrue(response.from_cache)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_negative_caching(self):
+        self.cache.put(self.url, make_response(self.url, status_code=404))
+        self.assertEqual(self.cache.get(self.url).status_code, 404)
+        self.cache.put(self.url, make_response(self.url, status_code=500))
+        self.assertEqual(self.cache.stats()["negative"], 1)
+
+    def test_host_ttl(self):
+        self.cache.host_ttls = {"de.wiktionary.org": -1}
+        self.cache.put(self.url, make_response(self.url))
+        self.assertIsNone(self.cache.get(self.url))
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        content = bytes(range(256)) * 4
+        self.cache.max_size = len(zlib.compress(content)) * 2
+        for word in ("Stuhl", "Tisch"):
+            url = self.cache_url(word)
+            self.cache.put(url, make_response(url, content=content))
+        time.sleep(0.01)
+        self.cache.get(self.cache_url("Stuhl"))
+        url = self.cache_url("Bank")
+        self.cache.put(url, make_response(url, content=content))
+        self.assertIsNotNone(self.cache.get(self.cache_url("Stuhl")))
+        self.assertIsNone(self.cache.get(self.cache_url("Tisch")))
+        self.assertIsNotNone(self.cache.get(self.cache_url("Bank")))
+
+    def test_persistence(self):
+        self.cache.put(self.url, make_response(self.url))
+        self.cache.flush()
+        other_cache = ResponseCache(self.cache.path)
+        self.assertIsNotNone(other_cache.get(self.url))
+
+    def cache_url(self, word):
+        return "https://de.wiktionary.org/wiki/" + word
+
+
+class CachedSessionTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        cache = ResponseCache(pathlib.Path(self.test_dir.name) / "cache.sqlite")
+        self.session = CachedSession(cache)
+        self.url = "https://de.wiktionary.org/wiki/Stuhl"
+        self.etag = '"v1"'
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def server_get(self, url, headers=None, **kwargs):
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return make_response(url, 304, b"", {"ETag": self.etag})
+        content = f"<html>{self.etag}</html>".encode()
+        return make_response(url, content=content, headers={"ETag": self.etag})
+
+    def test_revalidation(self):
+        self.session.cache.host_ttls = {"de.wiktionary.org": -1}
+        with mock.patch("requests.Session.get", side_effect=self.server_get) as get:
+            first = self.session.get(self.url)
+            revalidated = self.session.get(self.url)
+            self.assertEqual(get.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+            self.assertEqual(revalidated.text, first.text)
+            self.assertEqual(revalidated.cache_version, first.cache_version)
+            self.etag = '"v2"'
+            self.session.cache.host_ttls = HOST_TTLS
+            refetched = self.session.get(self.url)
+            self.assertIn("v2", refetched.text)
+            self.assertNotEqual(refetched.cache_version, first.cache_version)
+            self.assertEqual(self.session.get(self.url).text, refetched.text)
+        stats = self.session.cache.stats()
+        self.assertEqual(
+            [stats[name] for name in COUNTER_NAMES], [1, 1, 1, 1]
+        )
+
+    def test_expired_entries_with_validators_are_kept(self):
+        with mock.patch("requests.Session.get", side_effect=self.server_get):
+            self.session.get(self.url)
+        self.session.cache.host_ttls = {"de.wiktionary.org": -1}
+        self.session.cache.refresh(self.url)
+        self.assertEqual(self.session.cache.prune(), 0)
+
+    def test_results(self):
+        self.session.cache.put_result("key", self.url, {"root": "Stuhl"})
+        self.assertEqual(self.session.cache.get_result("key"), {"root": "Stuhl"})
+        self.assertEqual(self.session.cache.prune(), 0)
+        self.assertIsNone(self.session.cache.get_result("key"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import sys, pathlib, tempfile, subprocess, os
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+
+SOURCE_DIR = pathlib.Path(__file__).parent.parent
+MAIN_PATH = SOURCE_DIR / "main.py"
+# only needed by the debugger, ebook conversion, image search and gTTS
+LAZY_MODULES = ("ipdb", "IPython", "fitz", "pymupdf", "ebooklib", "google_images_search", "googleapiclient", "gtts")
+# runs main.py like a new interactive session, with a language set instead of
+# reading (or creating) the configfile, and writes the modules it imported
+STARTUP_SCRIPT = """
+import sys, runpy, atexit
+sys.path.insert(0, {source!r})
+import utils
+utils.CONFIG_PARSER.read_dict({{"DEFAULT": {{"language": "de"}}}})
+atexit.register(lambda: open("modules.txt", "w").write("\\n".join(sys.modules)))
+sys.argv = [{main!r}]
+runpy.run_path({main!r}, run_name="__main__")
+"""
+
+
+def startup_modules(commands: str) -> tuple:
+    """Starts main.py interactively and types commands into it.
+
+    Returns:
+        tuple: (set of the modules imported until it exited, what it printed)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        process = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT.format(source=str(SOURCE_DIR), main=str(MAIN_PATH))],
+            cwd=directory,
+            input=commands,
+            capture_output=True,
+            text=True,
+            # the command history is kept in ~/.wiktionary_history
+            env={**os.environ, "HOME": directory},
+        )
+        assert not pathlib.Path(directory, "main.log").exists(), "main.log created at startup"
+        modules = set(pathlib.Path(directory, "modules.txt").read_text().splitlines())
+    return modules, process.stdout
+
+
+class StartupTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.modules, cls.output = startup_modules("q\n")
+
+    def test_reached_prompt(self):
+        self.assertIn("Word: ", self.output)
+        self.assertIn("programs", self.modules)
+
+    def test_lazy_modules(self):
+        for module in LAZY_MODULES:
+            with self.subTest(module):
+                self.assertNotIn(module, self.modules)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import sys, pathlib, tempfile
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+from metrics import *
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.metrics = Metrics(window=3)
+
+    def test_phase(self):
+        with self.metrics.phase("DEWiktionaryWord", "parse", 100):
+            pass
+        with self.metrics.phase("DEWiktionaryWord", "parse") as timer:
+            timer.bytes = 50
+        (row,) = self.metrics.summary()
+        self.assertEqual((row["source"], row["phase"], row["count"], row["bytes"]), ("DEWiktionaryWord", "parse", 2, 150))
+        self.assertLessEqual(row["p50"], row["p99"])
+
+    def test_rolling_window(self):
+        for seconds in (10, 1, 2, 3):
+            self.metrics.record("de.wiktionary.org", "request", seconds)
+        (row,) = self.metrics.summary()
+        self.assertEqual(row["count"], 4)
+        self.assertEqual((row["p50"], row["p99"]), (2, 3))
+
+    def test_disabled(self):
+        metrics = Metrics(enabled=False)
+        with metrics.phase("DEWiktionaryWord", "parse") as timer:
+            timer.bytes = 10
+        metrics.record("DEWiktionaryWord", "extract", 1)
+        self.assertIs(metrics.phase("DEWiktionaryWord", "parse"), NULL_TIMER)
+        self.assertEqual(metrics.summary(), [])
+
+    def test_report_and_export(self):
+        self.metrics.record("DWDSWord", "extract", 0.002, 10)
+        self.assertIn("DWDSWord", self.metrics.report())
+        with tempfile.TemporaryDirectory() as test_dir:
+            path = pathlib.Path(test_dir) / "metrics.prom"
+            self.metrics.export(path)
+            text = path.read_text()
+        self.assertIn('lookup_phase_seconds{source="DWDSWord",phase="extract",quantile="0.5"} 0.002000', text)
+        self.assertIn('lookup_phase_bytes_total{source="DWDSWord",phase="extract"} 10', text)
+        self.metrics.clear()
+        self.assertEqual(self.metrics.summary(), [])
+
+    def test_percentile(self):
+        self.assertEqual(percentile(range(100), 0.95), 95)
+        self.assertEqual(percentile([5], 0.99), 5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import sys, pathlib, tempfile, gzip, shutil
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main, mock
+from offline_dictionary import *
+import word_info_extractor
+from word_info_extractor import SESSION, DEWiktionaryWord, ENWiktionaryWord, WordNotAvailable
+
+SAMPLE_PATH = pathlib.Path(__file__).parent / "fixtures" / "kaikki" / "sample.jsonl"
+
+
+class OfflineStoreTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.store = OfflineStore(pathlib.Path(self.test_dir.name) / "offline.sqlite")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_import_per_language(self):
+        self.assertEqual(self.store.import_dump(SAMPLE_PATH, "de", ["de"]), 2)
+        self.assertEqual(self.store.import_dump(SAMPLE_PATH, "de", ["de", "nl"]), 3)
+        self.assertEqual(self.store.stats(), {("de", "de"): 2, ("de", "nl"): 1})
+
+    def test_compressed_dump(self):
+        gzip_path = pathlib.Path(self.test_dir.name) / "sample.jsonl.gz"
+        with open(SAMPLE_PATH, "rb") as dump, gzip.open(gzip_path, "wb") as gzip_dump:
+            shutil.copyfileobj(dump, gzip_dump)
+        self.assertEqual(self.store.import_dump(gzip_path, "en"), 4)
+
+    def test_entries(self):
+        self.store.import_dump(SAMPLE_PATH, "de", ["de"])
+        entries = self.store.entries("de", "de", "gehen")
+        self.assertEqual(len(entries), 1)
+        self.assertNotIn("de-conj", entries[0]["forms"])
+        self.assertEqual(self.store.entries("de", "nl", "gehen"), [])
+
+
+@mock.patch.object(SESSION, "get", side_effect=AssertionError("no requests offline"))
+class OfflineWordTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.test_dir = tempfile.TemporaryDirectory()
+        cls.store = OfflineStore(pathlib.Path(cls.test_dir.name) / "offline.sqlite")
+        cls.store.import_dump(SAMPLE_PATH, "de", ["de"])
+        cls.store.import_dump(SAMPLE_PATH, "en", ["en"])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.test_dir.cleanup()
+
+    def setUp(self):
+        patcher = mock.patch.object(word_info_extractor, "OFFLINE_STORE", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_root(self, get):
+        word = DEWiktionaryWord("ging")
+        self.assertEqual(word.root, "gehen")
+        self.assertEqual((word.ipa, word.root_ipa), ("ɡɪŋ", "ˈɡeːən"))
+        self.assertTrue(word.root_pronunciation_url.endswith("De-gehen.ogg"))
+        self.assertIn("[2] Wie geht es dir?", word.root_info)
+        self.assertEqual(word.get_inflections(), ("gehe", "gehst", "ging", "gegangen"))
+
+    def test_english(self, get):
+        word = ENWiktionaryWord("house")
+        self.assertEqual(word.root, "house")
+        self.assertIn("NOUN", word.root_info)
+        self.assertIn("[1] This is my house and my family's ancestral home", word.root_info)
+
+    def test_unavailable_word(self, get):
+        with self.assertRaises(WordNotAvailable):
+            DEWiktionaryWord("house")
+
+
+if __name__ == "__main__":
+    main()
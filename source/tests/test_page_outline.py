@@ -0,0 +1,49 @@
+import sys, pathlib, re
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+from page_outline import *
+from utils import make_soup
+
+FIXTURE_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+
+class PageOutlineTestCase(TestCase):
+    def setUp(self):
+        self.page = make_soup((FIXTURE_DIR / "en.wiktionary.org" / "house.html").read_bytes())
+        self.outline = PageOutline.of(self.page)
+
+    def test_indexed_once(self):
+        self.assertIs(PageOutline.of(self.page), self.outline)
+
+    def test_find_all(self):
+        self.assertEqual(
+            self.outline.find_all("strong", class_="headword"),
+            self.page.find_all("strong", class_="headword"),
+        )
+        self.assertEqual(
+            self.outline.find_all(class_=re.compile("usage")),
+            self.page.find_all(class_=re.compile("usage")),
+        )
+        self.assertEqual(self.outline.find_all("h2"), self.page.find_all("h2"))
+        self.assertIsNone(self.outline.find(title="Grammatische Merkmale"))
+
+    def test_same_as_find_previous_and_find_next(self):
+        for head_word in self.page.find_all("strong", class_="headword"):
+            with self.subTest(head_word=head_word.parent.text):
+                self.assertIs(
+                    self.outline.previous(head_word, ("h4", "h3")),
+                    head_word.find_previous(["h4", "h3"]),
+                )
+                self.assertIs(self.outline.next(head_word, "ol"), head_word.find_next("ol"))
+
+    def test_siblings_only(self):
+        first_list = self.page.find("ol")
+        self.assertEqual(self.outline.previous(first_list, ("h4",), siblings_only=True).text[:4], "Noun")
+        self.assertIsNone(self.outline.previous(first_list, ("h1",), siblings_only=True))
+        self.assertIsNotNone(self.outline.previous(first_list, ("h1",)))
+        self.assertIsNone(self.outline.next(self.page.find("li"), "ol", siblings_only=True))
+
+
+if __name__ == "__main__":
+    main()
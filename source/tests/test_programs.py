@@ -4,10 +4,15 @@ from unittest import TestCase, main
 
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
 from programs import *
+from test_word_info_extractor import live_cassette
 from ipdb import set_trace as s
 
 
 class ProgramTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(live_cassette(cls.__name__))
+
     def setUp(self):
         self.test_in = io.StringIO()
         self.test_out = io.StringIO()
@@ -22,15 +27,13 @@ class ProgramTestCase(TestCase):
     def test_examples(self):
         self.inp("examples oder")
         self.assertIn("oder", self.output)
-        ebook_names = self.cmd.ebook_lang_name_txt["de"]
-        ebook_names = [
-            (name, txt)
-            for book_name_txt in ebook_names
-            for name, txt in book_name_txt.items()
-        ]
-        for ebook_name, _ in ebook_names:
+        for ebook_name in self.cmd.ebooks.names("de"):
             self.assertIn(ebook_name.upper(), self.output)
 
+    def test_examples_limit(self):
+        self.inp("examples --limit 2 oder")
+        self.assertEqual(self.output.count("\n\n"), 2)
+
     def test_other_sources(self):
         with self.subTest("en"):
             self.inp("lang en")
@@ -47,13 +50,21 @@ class ProgramTestCase(TestCase):
             self.inp("dwds")
             self.assertNotIn("noun", self.output)
             self.assertIn("kugelförmiges", self.output)
+
+    def test_all_sources(self):
+        self.inp("lang de")
+        self.inp("all Ball")
+        for source_name in ("DE.WIKTIONARY.ORG", "DWDS", "DUDEN"):
+            self.assertIn(source_name, self.output)
+        self.assertIn("kugelförmiges", self.output)
+        self.assertEqual(self.cmd.previous_word.root, "Ball")
+
     def test_other_sources_wrong_language(self):
         self.inp("lang de")
         self.inp("Huhn")
         self.inp("dict")
         self.assertIn("Change your language", self.output)
 
-
     def inp(self, text: str):
         """write in self.test_in and run a cmdloop in self.cmd
 
@@ -0,0 +1,57 @@
+import sys, pathlib, time
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main
+from sentences import *
+
+
+def split(text, language=None):
+    data = text.encode("utf-8")
+    sentences = sentence_offsets(data, language)
+    return [data[start:end].decode("utf-8") for start, end in (sentences[i] for i in range(len(sentences)))]
+
+
+class SentenceOffsetsTestCase(TestCase):
+    def test_terminators(self):
+        self.assertEqual(
+            split("Er ging. Kam sie?\nJa!  „Wer?“ fragte er. Dann... Nichts. Das ist 3.5 m lang. Ende"),
+            ["Er ging.", "Kam sie?", "Ja!", "„Wer?“ fragte er.", "Dann...", "Nichts.", "Das ist 3.5 m lang."],
+        )
+
+    def test_abbreviations(self):
+        self.assertEqual(
+            split("Er kam z. B. am 3. Mai. Im Jahr 1990. Vgl. S. 120. Ich bzw. du usw. Ende.", "de"),
+            ["Er kam z. B. am 3. Mai.", "Im Jahr 1990.", "Vgl. S. 120.", "Ich bzw. du usw. Ende."],
+        )
+        self.assertEqual(split("Mr. Smith came, i.e. he came. Dr. No left.", "en"), ["Mr. Smith came, i.e. he came.", "Dr. No left."])
+        self.assertEqual(split("См. стр. 5. Конец.", "en-ru"), ["См. стр. 5.", "Конец."])
+        # other languages don't know the German ones
+        self.assertEqual(split("Ich bzw. Du.", "en"), ["Ich bzw.", "Du."])
+
+    def test_blank_lines(self):
+        self.assertEqual(split("Kapitel 1\n\n  Es war einmal.\nDas Ende\n \nNeu."), ["Es war einmal.", "Neu."])
+
+    def test_containing(self):
+        sentences = sentence_offsets(b"Er ging. Sie kam.")
+        self.assertEqual(sentences.containing(3, 7), 0)
+        self.assertEqual(sentences.containing(9, 12), 1)
+        self.assertEqual(sentences.containing(8, 9), -1)
+        self.assertEqual(sentences.nbytes, 16)
+
+    def test_byte_offsets(self):
+        sentences = sentence_offsets("Öl floß. Ärger kam.".encode("utf-8"))
+        self.assertEqual([sentences[i] for i in range(len(sentences))], [(0, 10), (11, 22)])
+        # lowercase letters that aren't ASCII don't start sentences
+        self.assertEqual(split("Er kam. über alles. Éric ging."), ["Er kam. über alles.", "Éric ging."])
+
+    def test_linear_time(self):
+        hostile = ["a\n" * 200_000, "." * 200_000 + "x", "\n" + " " * 200_000 + "x", "z. " * 100_000]
+        for text in hostile:
+            with self.subTest(text[:5]):
+                start = time.perf_counter()
+                sentence_offsets(text.encode("utf-8"), "de")
+                self.assertLess(time.perf_counter() - start, 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import sys, pathlib, tempfile, threading
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+from unittest import TestCase, main, mock
+from speech_cache import *
+
+
+class FakeTTS:
+    """Stand-in for gtts.gTTS that records what it would say"""
+
+    def __init__(self, text, tld):
+        self.text, self.tld = text, tld
+
+    def write_to_fp(self, file):
+        file.write(f"{self.tld}:{self.text}".encode("utf-8"))
+
+
+class SpeechCacheTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.cache = SpeechCache(pathlib.Path(self.test_dir.name) / "speech")
+        patcher = mock.patch("gtts.gTTS", side_effect=FakeTTS)
+        self.tts = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_url(self):
+        url = self.cache.url("house")
+        self.assertEqual(url, self.cache.path("house").as_uri())
+        self.assertEqual(self.cache.synthesize("house").result().read_bytes(), b"us:house")
+
+    def test_synthesized_once(self):
+        for _ in range(3):
+            self.cache.synthesize("house").result()
+        self.cache.synthesize("house", tld="co.uk").result()
+        self.assertEqual(self.tts.call_count, 2)
+        self.assertNotEqual(self.cache.path("house"), self.cache.path("house", tld="co.uk"))
+
+    def test_background_synthesis(self):
+        release = threading.Event()
+
+        class SlowTTS(FakeTTS):
+            def write_to_fp(self, file):
+                release.wait()
+                super().write_to_fp(file)
+
+        self.tts.side_effect = SlowTTS
+        self.cache.url("house")
+        self.assertFalse(self.cache.path("house").exists())
+        release.set()
+        self.cache.synthesize("house").result()
+        self.assertTrue(self.cache.path("house").exists())
+        self.assertEqual(self.tts.call_count, 1)
+
+    def test_failed_synthesis(self):
+        self.tts.side_effect = OSError("no network")
+        with self.assertRaises(OSError):
+            self.cache.synthesize("house").result()
+        self.assertEqual(list(self.cache.directory.iterdir()), [])
+
+
+if __name__ == "__main__":
+    main()
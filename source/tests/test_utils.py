@@ -1,7 +1,7 @@
 import sys, pathlib
 
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
-from unittest import TestCase, main
+from unittest import TestCase, main, mock
 from collections import Counter
 from utils import *
 from ipdb import set_trace as s
@@ -38,5 +38,70 @@ class UtilsTestCase(TestCase):
         result = remove_common(*self.similar_element_list)
         self.assertEqual(result, ['Jules  Payot', 'Jean   Guitton', 'AntoninSertillanges'])
 
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+@mock.patch("time.sleep")
+class NeverSayNeverSessionTestCase(TestCase):
+    def setUp(self):
+        policy = RetryPolicy(max_attempts=3, backoff_factor=1, jitter=0)
+        self.session = NeverSayNeverSession(policy)
+
+    def test_bounded_attempts(self, sleep):
+        with mock.patch(
+            "requests.Session.get", side_effect=requests.exceptions.Timeout
+        ) as get:
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.session.get("https://de.wiktionary.org/wiki/ging")
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1.0, 2.0])
+        self.assertEqual(self.session.retries, 2)
+
+    def test_retry_after(self, sleep):
+        responses = [make_response(429, {"Retry-After": "5"}), make_response(200)]
+        with mock.patch("requests.Session.get", side_effect=responses):
+            response = self.session.get("https://de.wiktionary.org/wiki/ging")
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_called_once_with(5.0)
+
+    def test_no_retry_on_404(self, sleep):
+        with mock.patch("requests.Session.get", return_value=make_response(404)):
+            response = self.session.get("https://de.wiktionary.org/wiki/bruh123")
+        self.assertEqual(response.status_code, 404)
+        sleep.assert_not_called()
+
+    def test_host_pool_size(self, sleep):
+        session = NeverSayNeverSession(
+            RetryPolicy(host_pool_sizes={"de.wiktionary.org": 32})
+        )
+        adapter = session.get_adapter("https://de.wiktionary.org/wiki/ging")
+        self.assertEqual(adapter._pool_maxsize, 32)
+
+    def test_policy_from_config(self, sleep):
+        config = configparser.ConfigParser()
+        config.read_dict({"DEFAULT": {"retry_max_attempts": "2", "host_pool_sizes": '{"de.wiktionary.org": 32}'}})
+        with mock.patch("utils.CONFIG_PARSER", config):
+            policy = RetryPolicy.from_config()
+        self.assertEqual(policy.max_attempts, 2)
+        self.assertEqual(policy.host_pool_sizes, {"de.wiktionary.org": 32})
+
+    def test_failure_reported(self, sleep):
+        errors = [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, make_response(200)]
+        with mock.patch("requests.Session.get", side_effect=errors), mock.patch("builtins.print") as print:
+            self.session.get("https://de.wiktionary.org/wiki/ging")
+        self.assertEqual(
+            [call.args[0] for call in print.call_args_list],
+            [
+                "Request to de.wiktionary.org failed (ConnectionError). Trying again...",
+                "Request to de.wiktionary.org failed (ReadTimeout). Trying again...",
+            ],
+        )
+
+
 if __name__ == "__main__":
     main()
@@ -1,8 +1,116 @@
-import sys, pathlib
+import sys, os, pathlib, contextlib, asyncio, http.server, threading, re, json, tempfile
 
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
-from unittest import TestCase, main
+from unittest import TestCase, SkipTest, main, mock
 from word_info_extractor import *
+from http_cache import ResponseCache
+from metrics import Metrics
+from cassette import use_cassette
+
+FIXTURE_DIR = pathlib.Path(__file__).parent / "fixtures"
+CASSETTE_DIR = pathlib.Path(__file__).parent / "cassettes"
+# CASSETTE_MODE=once records the requests missing from the cassettes
+CASSETTE_MODE = os.environ.get("CASSETTE_MODE", "replay")
+
+
+def fixture_path(url) -> pathlib.Path:
+    """Returns where the page of url is stored: FIXTURE_DIR/<host>/<word>.html"""
+    parsed_url = urllib.parse.urlparse(url)
+    word = urllib.parse.unquote(parsed_url.path.split("/")[-1])
+    return FIXTURE_DIR / parsed_url.netloc / f"{word}.html"
+
+
+def fixture_get(url, **kwargs):
+    """Stand-in for SESSION.get that answers with the pages in FIXTURE_DIR"""
+    path = fixture_path(url)
+    response = requests.Response()
+    response.url = url
+    response.encoding = "utf-8"
+    response.status_code = 200 if path.exists() else 404
+    response._content = path.read_bytes() if path.exists() else b""
+    return response
+
+
+@contextlib.contextmanager
+def live_cassette(name: str):
+    """Answers the requests of a test case that uses the real sites with
+    tests/cassettes/<name>.json.gz, without the cache of the user.
+
+    Raises:
+        SkipTest: if the cassette wasn't recorded and CASSETTE_MODE is replay
+    """
+    path = CASSETTE_DIR / f"{name}.json.gz"
+    if CASSETTE_MODE == "replay" and not path.exists():
+        raise SkipTest(f"{path.name} wasn't recorded, run the tests with CASSETTE_MODE=once to record it")
+    with mock.patch.object(SESSION, "cache", None), use_cassette(SESSION, path, CASSETTE_MODE):
+        yield
+
+
+def word_result(word) -> dict:
+    """Returns what the parity fixtures record about word"""
+    if isinstance(word, SecondaryWord):
+        return {"info": word.info}
+    result = {attribute: getattr(word, attribute) for attribute in RESULT_ATTRIBUTES}
+    result["root_info"] = word.root_info
+    inflections = word.get_inflections()
+    # FRWiktionaryWord returns its root instead of a tuple
+    result["inflections"] = inflections if isinstance(inflections, str) else sorted(inflections)
+    return result
+
+
+class FixtureWikiHandler(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for a wiki serving the de.wiktionary.org fixtures,
+    both as /wiki/ pages and through /w/api.php?action=parse"""
+
+    heading_pattern = re.compile(r'<h([2-6])><span class="mw-headline" id="([^"]+)"')
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        if url.path.startswith("/wiki/"):
+            page = self.read_fixture(urllib.parse.unquote(url.path[len("/wiki/") :]))
+            if page is None:
+                return self.send_body(404, b"", "text/html")
+            return self.send_body(200, page.encode(), "text/html")
+        page = self.read_fixture(query["page"])
+        if page is None:
+            answer = {"error": {"code": "missingtitle"}}
+        elif query["prop"] == "sections":
+            sections = [
+                {"level": level, "index": str(index + 1), "anchor": anchor}
+                for index, (level, anchor) in enumerate(self.headings(page))
+            ]
+            answer = {"parse": {"title": query["page"], "sections": sections}}
+        else:
+            answer = {"parse": {"title": query["page"], "text": self.section(page, int(query["section"]))}}
+        self.send_body(200, json.dumps(answer).encode(), "application/json")
+
+    def headings(self, page):
+        return [match.groups() for match in self.heading_pattern.finditer(page)]
+
+    def section(self, page, index):
+        matches = list(self.heading_pattern.finditer(page))
+        start = matches[index - 1]
+        end = page.index("</div></div></div></div>")
+        for match in matches[index:]:
+            if match.group(1) <= start.group(1):
+                end = match.start()
+                break
+        return f'<div class="mw-parser-output">{page[start.start():end]}</div>'
+
+    def read_fixture(self, word):
+        path = FIXTURE_DIR / "de.wiktionary.org" / f"{word}.html"
+        return path.read_text() if path.exists() else None
+
+    def send_body(self, status_code, body, content_type):
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type + "; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
 
 
 class BaseTestCases:
@@ -14,6 +122,7 @@ class BaseTestCases:
 
         @classmethod
         def setUpClass(cls):
+            cls.enterClassContext(live_cassette(cls.__name__))
             word_to_instance_dict = {}
             for word in cls.words:
                 instance = cls.class_(word)
@@ -206,5 +315,253 @@ class LAWiktionaryTestCase(WiktionaryTestCases.WiktionaryTestCase):
         self.assertIn("NOUN", self.word_to_instance_dict["homo"].root_info)
 
 
+@mock.patch.object(SESSION, "get", side_effect=fixture_get)
+class FetchTestCase(TestCase):
+    def test_same_result_as_sync(self, get):
+        sync_word = DEWiktionaryWord("ging")
+        async_word = asyncio.run(DEWiktionaryWord.fetch("ging"))
+        self.assertEqual(async_word.root, "gehen")
+        for attribute in ("root", "ipa", "pronunciation_url", "root_ipa", "root_info"):
+            with self.subTest(attribute):
+                self.assertEqual(
+                    getattr(sync_word, attribute), getattr(async_word, attribute)
+                )
+        self.assertEqual(
+            sorted(sync_word.get_inflections()), sorted(async_word.get_inflections())
+        )
+
+    def test_concurrent_fetch(self, get):
+        async def fetch_all():
+            return await asyncio.gather(
+                *[DEWiktionaryWord.fetch(word) for word in ("ging", "gehen")]
+            )
+
+        words = asyncio.run(fetch_all())
+        self.assertEqual([word.root for word in words], ["gehen", "gehen"])
+
+    def test_error(self, get):
+        with self.assertRaises(WordNotAvailable):
+            asyncio.run(DEWiktionaryWord.fetch("bruh123"))
+
+
+@mock.patch.object(SESSION, "cache", None)
+class SectionTransportTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureWikiHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{cls.server.server_port}/wiki/"
+        cls.transport = SectionTransport(SESSION)
+
+        class LocalWord(DEWiktionaryWord):
+            pass
+
+        class LocalSectionWord(DEWiktionaryWord):
+            section_transport = cls.transport
+
+        LocalWord.base_url = LocalSectionWord.base_url = base_url
+        cls.page_class, cls.section_class = LocalWord, LocalSectionWord
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_same_result_as_page(self):
+        page_word = self.page_class("ging")
+        section_word = self.section_class("ging")
+        for attribute in ("root", "ipa", "pronunciation_url", "root_ipa", "root_info"):
+            with self.subTest(attribute):
+                self.assertEqual(
+                    getattr(page_word, attribute), getattr(section_word, attribute)
+                )
+        self.assertEqual(
+            sorted(page_word.get_inflections()), sorted(section_word.get_inflections())
+        )
+
+    def test_only_section_is_downloaded(self):
+        self.transport.bytes_received = 0
+        self.section_class("gehen")
+        page_size = len((FIXTURE_DIR / "de.wiktionary.org" / "gehen.html").read_bytes())
+        self.assertLess(self.transport.bytes_received, page_size)
+        self.assertFalse(self.section_class("gehen").page.find(id="gehen_(Niederländisch)"))
+
+    def test_section_map_is_cached(self):
+        self.section_class("gehen")
+        with mock.patch.object(self.transport, "_api_get", wraps=self.transport._api_get) as api_get:
+            self.section_class("gehen")
+        self.assertEqual(api_get.call_count, 1)
+
+    def test_unavailable_word(self):
+        with self.assertRaises(WordNotAvailable):
+            self.section_class("bruh123")
+
+
+class StoredResultTestCase(TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(
+            pathlib.Path(self.test_dir.name) / "cache.sqlite", host_ttls={}, default_ttl=-1
+        )
+        self.get = mock.Mock(side_effect=self.revalidating_get)
+        for patcher in (
+            mock.patch.object(SESSION, "cache", self.cache),
+            mock.patch("requests.Session.get", self.get),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        RECENT_WORDS.clear()
+
+        # (old, new) replacement that simulates an edit of the pages
+        self.edit = (b"", b"")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def revalidating_get(self, url, headers=None, **kwargs):
+        response = fixture_get(url)
+        response._content = response.content.replace(*self.edit)
+        etag = f'"{len(response.content)}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            response.status_code, response._content = 304, b""
+        response.headers["ETag"] = etag
+        return response
+
+    def test_revalidated_pages_are_not_parsed(self):
+        first = DEWiktionaryWord("ging")
+        # the result is stored once it is complete
+        first.root_entry
+        with mock.patch.object(DEWiktionaryWord, "_get_info", side_effect=AssertionError):
+            second = DEWiktionaryWord("ging")
+        for attribute in RESULT_ATTRIBUTES:
+            with self.subTest(attribute):
+                self.assertEqual(getattr(first, attribute), getattr(second, attribute))
+        self.assertEqual(first.root_entry, second.root_entry)
+        self.assertEqual(first.root_info, second.root_info)
+        self.assertEqual(self.cache.stats()["revalidated"], 2)
+        self.assertIn("gegangen", second.get_inflections())
+
+    def test_only_computed_attributes_are_stored(self):
+        with mock.patch.object(SPEECH_CACHE, "url", return_value="file:///speech.mp3") as speech_url:
+            self.assertIn("a building in which people live.", ENDictionaryWord("houseful").root_info)
+            self.assertEqual([call.args[0] for call in self.get.call_args_list], [DICTIONARY_URL + "houseful"])
+            speech_url.assert_not_called()
+            RECENT_WORDS.clear()
+            # the stored result has no pronunciation, it is computed when used
+            word = ENDictionaryWord("houseful")
+            self.assertEqual(word.ipa, "hous-fool")
+        speech_url.assert_called_once_with("houseful", tld="us")
+        self.assertEqual(self.cache.stats()["revalidated"], 1)
+
+    def test_changed_pages_are_parsed(self):
+        DEWiktionaryWord("ging").root_entry
+        self.edit = ("Wie geht es dir?".encode(), "Wie geht es Ihnen?".encode())
+        word = DEWiktionaryWord("ging")
+        self.assertIn("Wie geht es Ihnen?", word.root_info)
+        self.assertEqual(self.cache.stats()["refetched"], 1)
+
+
+@mock.patch.object(SESSION, "get", side_effect=fixture_get)
+class LazyAttributesTestCase(TestCase):
+    def test_ipa_without_root_page(self, get):
+        word = DEWiktionaryWord("ging")
+        self.assertEqual(word.ipa, "ɡɪŋ")
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(word.root, "gehen")
+        self.assertEqual(get.call_count, 2)
+        self.assertIn("Wie geht es dir?", word.root_info)
+        self.assertEqual(get.call_count, 2)
+
+    def test_definitions_are_extracted_once(self, get):
+        word = FRWiktionaryWord("chat")
+        with mock.patch.object(FRWiktionaryWord, "_get_info", wraps=word._get_info) as get_info:
+            word.root_info, word.root_info
+        self.assertEqual(get_info.call_count, 1)
+
+    def test_unavailable_definitions(self, get):
+        word = DWDSWord("Stuhl")
+        with mock.patch.object(DWDSWord, "_get_info", return_value=Entry("dictionary")):
+            with self.assertRaises(WordNotAvailable):
+                word.root_info
+        with self.assertRaises(WordNotAvailable):
+            DWDSWord("bruh123")
+
+
+@mock.patch.object(SESSION, "get", side_effect=fixture_get)
+class PhaseMetricsTestCase(TestCase):
+    def test_phases(self, get):
+        metrics = Metrics()
+        with mock.patch("word_info_extractor.METRICS", metrics):
+            DEWiktionaryWord("ging").root_info
+        phases = {(row["phase"], row["count"]) for row in metrics.summary()}
+        self.assertEqual(
+            phases,
+            {
+                ("lookup", 1),
+                ("parse", 2),
+                ("isolate", 1),
+                ("root_page", 1),
+                ("extract", 1),
+            },
+        )
+
+
+@mock.patch.object(SESSION, "get", side_effect=fixture_get)
+class DictionaryAudioTestCase(TestCase):
+    def setUp(self):
+        RECENT_WORDS.clear()
+        patcher = mock.patch.object(SPEECH_CACHE, "url", return_value="file:///speech.mp3")
+        self.speech_url = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_fetch(self, get):
+        self.assertIn("a building in which people live.", ENDictionaryWord("house").root_info)
+        self.assertEqual(get.call_count, 1)
+
+    def test_reuses_wiktionary_word(self, get):
+        ENWiktionaryWord("house")
+        word = ENDictionaryWord("house")
+        self.assertIn("/haʊs/", word.ipa)
+        self.assertTrue(word.pronunciation_url.endswith("En-us-house-noun.ogg"))
+        self.assertEqual(get.call_count, 2)
+        self.speech_url.assert_not_called()
+
+    def test_synthesized_audio(self, get):
+        word = ENDictionaryWord("houseful")
+        self.assertEqual(word.ipa, "hous-fool")
+        self.assertEqual(word.pronunciation_url, "file:///speech.mp3")
+        self.speech_url.assert_called_once_with("houseful", tld="us")
+
+
+@mock.patch.object(SESSION, "get", side_effect=fixture_get)
+class ParserParityTestCase(TestCase):
+    """Every parser must extract what html.parser extracted from the
+    fixture pages, as recorded in fixtures/expected/results.json."""
+
+    parsers = ("html.parser", "lxml")
+    word_classes = {
+        word_class.__name__: word_class
+        for word_class in (
+            ENWiktionaryWord,
+            DEWiktionaryWord,
+            FRWiktionaryWord,
+            DWDSWord,
+            DudenWord,
+            BRDicioWord,
+        )
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = json.loads((FIXTURE_DIR / "expected" / "results.json").read_bytes())
+
+    def test_parity(self, get):
+        for parser in self.parsers:
+            for key, expected in self.expected.items():
+                class_name, word = key.split("/")
+                with self.subTest(parser=parser, word=key), mock.patch("utils.HTML_PARSER", parser):
+                    self.assertEqual(word_result(self.word_classes[class_name](word)), expected)
+
+
 if __name__ == "__main__":
     main()
@@ -1,12 +1,17 @@
-import glob, os, re, bs4, pathlib, termcolor, ipdb, requests
-from ebooklib import epub
+import glob, os, re, bs4, pathlib, requests, random, sys, time, email.utils, ast, threading
+import urllib.parse
 import configparser
 from collections import Counter
-from ipdb import set_trace as s
+from metrics import Metrics
 
 CONFIG_PATH = os.path.dirname(os.path.realpath(__file__)) + "/.configfile.ini"
 CONFIG_PARSER = configparser.ConfigParser()
 CONFIG_PARSER.read(CONFIG_PATH)
+# any tree builder bs4 knows: "lxml" (C, the fastest), "html.parser" or "html5lib"
+HTML_PARSER = CONFIG_PARSER["DEFAULT"].get("html_parser", "lxml")
+# durations of the phases of every lookup, shown by the stats command;
+# "metrics = 0" in the config file turns the recording off
+METRICS = Metrics(enabled=CONFIG_PARSER["DEFAULT"].get("metrics", "1") != "0")
 VALID_LANGUAGES = {
     "en": "English",
     "de": "Deutsch",
@@ -67,20 +72,146 @@ TRENNBARE_PRÄFIXE = [
 ]
 
 
+class RetryPolicy:
+    """How NeverSayNeverSession retries failed requests.
+    Args:
+        max_attempts (int, optional): attempts before giving up (the first one included).
+        backoff_factor (float, optional): the n-th retry waits backoff_factor * 2 ** (n - 1) seconds.
+        backoff_max (float, optional): maximum wait between two attempts.
+        jitter (float, optional): fraction of the wait that is randomized.
+        retry_statuses (tuple, optional): status codes that are worth another try.
+        max_retry_after (float, optional): longest Retry-After the session is willing to honour.
+        pool_connections (int, optional): number of per-host connection pools to cache.
+        pool_maxsize (int, optional): connections kept alive in each pool.
+        host_pool_sizes (dict, optional): {host: pool_maxsize} for hosts that need bigger pools.
+    """
+
+    def __init__(
+        self,
+        max_attempts=4,
+        backoff_factor=0.5,
+        backoff_max=8.0,
+        jitter=0.5,
+        retry_statuses=(429, 502, 503, 504),
+        max_retry_after=30.0,
+        pool_connections=10,
+        pool_maxsize=10,
+        host_pool_sizes=None,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = retry_statuses
+        self.max_retry_after = max_retry_after
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.host_pool_sizes = host_pool_sizes or {}
+
+    @classmethod
+    def from_config(cls):
+        config = CONFIG_PARSER["DEFAULT"]
+        return cls(
+            max_attempts=int(config.get("retry_max_attempts", 4)),
+            backoff_factor=float(config.get("retry_backoff_factor", 0.5)),
+            backoff_max=float(config.get("retry_backoff_max", 8.0)),
+            pool_maxsize=int(config.get("pool_maxsize", 10)),
+            # like {"de.wiktionary.org": 32}
+            host_pool_sizes=ast.literal_eval(config.get("host_pool_sizes", "{}")),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Returns how many seconds to wait after the attempt-th attempt failed.
+        >>> policy = RetryPolicy(backoff_factor=1, jitter=0)
+        >>> [policy.backoff(attempt) for attempt in range(1, 6)]
+        [1.0, 2.0, 4.0, 8.0, 8.0]
+        """
+        delay = min(self.backoff_factor * 2 ** (attempt - 1), self.backoff_max)
+        return delay - delay * self.jitter * random.random()
+
+    def retry_after(self, response: requests.Response):
+        """Returns the wait asked by the Retry-After header of response,
+        capped at self.max_retry_after, or None if there isn't one."""
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                date = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            delay = date.timestamp() - time.time()
+        return min(max(delay, 0), self.max_retry_after)
+
+
 class NeverSayNeverSession(requests.Session):
+    """requests.Session that retries timeouts, connection errors and
+    overloaded servers according to a RetryPolicy.
+    Args:
+        policy (RetryPolicy, optional): retry policy. Defaults to RetryPolicy.from_config().
+    Relevant attributes:
+        self.retries = number of retries made so far.
+        self.retry_time = seconds spent on failed attempts and waiting between them.
+    """
+
+    def __init__(self, policy=None):
+        super().__init__()
+        self.policy = policy or RetryPolicy.from_config()
+        self.retries = 0
+        self.retry_time = 0.0
+        # the session is shared by the threads of a batch
+        self._stats_lock = threading.Lock()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.policy.pool_connections,
+            pool_maxsize=self.policy.pool_maxsize,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        for host, pool_maxsize in self.policy.host_pool_sizes.items():
+            self.mount(
+                f"https://{host}/",
+                requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize),
+            )
+
     def get(self, url, **kwargs):
-        r"""Sends a GET requests until it doesn't timeout.
+        r"""Sends a GET request, retrying it according to self.policy.
         Returns :class:`Response` object.
 
         :param url: URL for the new :class:`Request` object.
         :param \*\*kwargs: Optional arguments that ``request`` takes.
         :rtype: requests.Response
         """
-        try:
-            return super().get(url, **kwargs)
-        except requests.exceptions.Timeout:
-            print("Request timed out. Trying again...")
-            return self.get(url, **kwargs)
+        host = urllib.parse.urlsplit(url).netloc
+        with METRICS.phase(host, "request") as request_timer:
+            for attempt in range(1, self.policy.max_attempts + 1):
+                start = time.perf_counter()
+                try:
+                    response = super().get(url, **kwargs)
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as error:
+                    if attempt == self.policy.max_attempts:
+                        raise
+                    print(f"Request to {host} failed ({type(error).__name__}). Trying again...")
+                    delay = self.policy.backoff(attempt)
+                else:
+                    if (
+                        response.status_code not in self.policy.retry_statuses
+                        or attempt == self.policy.max_attempts
+                    ):
+                        # time until the headers arrived, DNS and TLS included
+                        METRICS.record(host, "headers", response.elapsed.total_seconds())
+                        if not kwargs.get("stream"):
+                            request_timer.bytes = len(response.content or b"")
+                        return response
+                    delay = self.policy.retry_after(response)
+                    if delay is None:
+                        delay = self.policy.backoff(attempt)
+                time.sleep(delay)
+                with self._stats_lock:
+                    self.retries += 1
+                    self.retry_time += time.perf_counter() - start
+                METRICS.record(host, "retry", time.perf_counter() - start)
 
 
 class SetRecordsUpdates(set):
@@ -220,8 +351,82 @@ def remove_navigable_strings(bs4_list: list):
     return result
 
 
+def find_by_id(page: bs4.Tag, id) -> bs4.Tag:
+    """Returns the first tag of page with the given id or None. Works like
+    page.find(id=id), but without going through bs4's generic matching,
+    which makes it several times faster on big pages.
+
+    Args:
+        page (bs4.Tag): tag to search in.
+        id (str or re.Pattern): id, or a pattern that has to match part of it.
+
+    Returns:
+        bs4.Tag: the tag with that id
+    """
+    if isinstance(id, re.Pattern):
+        matches = lambda tag_id: id.search(tag_id) is not None
+    else:
+        matches = lambda tag_id: tag_id == id
+    for tag in page.descendants:
+        if isinstance(tag, bs4.Tag) and "id" in tag.attrs and matches(tag["id"]):
+            return tag
+    return None
+
+
+def detach_siblings(first: bs4.Tag):
+    """Yields first and the tags that follow it, skipping the strings
+    between them, each one already extracted from the tree so that it can
+    be appended somewhere else. Stop iterating to leave the remaining
+    siblings in place. Nothing is copied or re-parsed.
+
+    Args:
+        first (bs4.Tag): first tag to detach.
+
+    Yields:
+        bs4.Tag: the detached tags, in document order
+    """
+    parent = first.parent
+    index = parent.index(first)
+    while index < len(parent.contents):
+        if type(parent.contents[index]) is bs4.NavigableString:
+            index += 1
+            continue
+        yield parent.contents[index].extract()
+
+
+def make_soup(markup, encoding=None, parser=None) -> bs4.BeautifulSoup:
+    """Parses markup with the configured parser. Give it response.content
+    instead of response.text: the bytes go straight to the parser, without
+    being decoded to a str first.
+
+    Args:
+        markup (bytes or str): html to parse.
+        encoding (str, optional): encoding of markup when it is bytes, usually
+            response.encoding. When missing, bs4 looks for it in the document.
+        parser (str, optional): parser to use instead of HTML_PARSER.
+
+    Returns:
+        bs4.BeautifulSoup: the parsed document
+    """
+    parser = parser or HTML_PARSER
+    if isinstance(markup, bytes) and encoding:
+        return bs4.BeautifulSoup(markup, parser, from_encoding=encoding)
+    return bs4.BeautifulSoup(markup, parser)
+
+
+def s(*args, **kwargs):
+    """ipdb.set_trace() in the caller's frame. ipdb (and IPython with it)
+    takes longer to import than the rest of the program, so it's only
+    imported when a breakpoint is hit."""
+    import ipdb
+
+    ipdb.set_trace(sys._getframe(1), *args, **kwargs)
+
+
 def epub_to_bs(epub_path: str):
     """Picks all EpubHtmls from the epub file and returns a nice BeautifulSoup object with them"""
+    from ebooklib import epub
+
     book = epub.read_epub(epub_path, options={"ignore_ncx": True})
     book_items = book.get_items()
     ugly_book_html = bytes()
@@ -229,7 +434,7 @@ def epub_to_bs(epub_path: str):
         item_class = str(item.__class__)
         if item_class == "<class 'ebooklib.epub.EpubHtml'>":
             ugly_book_html += item.content + bytes("\n", "utf-8")
-    book_html = bs4.BeautifulSoup(ugly_book_html, "html.parser")
+    book_html = make_soup(ugly_book_html)
     return book_html
 
 def setup_empty_config():
@@ -0,0 +1,106 @@
+import json, html, threading, urllib.parse, requests, cachetools
+
+
+class SectionTransport:
+    """Fetches only one language section of a Wiktionary entry through the
+    MediaWiki parse API (action=parse&section=N) instead of the whole
+    article. The section index of every entry is cached, so looking up
+    the same entry again costs a single request.
+
+    The response looks like the one of the /wiki/ page: its html starts
+    with the page title (span.mw-page-title-main) followed by the section,
+    so the Word subclasses can parse it the way they parse whole pages.
+
+    Args:
+        session (requests.Session): session used for the API calls.
+        timeout (float, optional): timeout of every API call.
+        max_section_maps (int, optional): number of section maps kept in memory.
+    """
+
+    def __init__(self, session, timeout=None, max_section_maps=4096):
+        self.session = session
+        self.timeout = timeout
+        # {(api_url, word): (title, {anchor: section index})}
+        self.section_maps = cachetools.LRUCache(max_section_maps)
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def api_url(base_url: str) -> str:
+        """Returns the api.php url of the wiki that base_url belongs to.
+        >>> SectionTransport.api_url("https://de.wiktionary.org/wiki/")
+        'https://de.wiktionary.org/w/api.php'
+        """
+        parts = urllib.parse.urlsplit(base_url)
+        return f"{parts.scheme}://{parts.netloc}/w/api.php"
+
+    def _api_get(self, api_url: str, **params) -> requests.Response:
+        params.update({"action": "parse", "format": "json", "formatversion": 2, "redirects": 1})
+        url = api_url + "?" + urllib.parse.urlencode(params)
+        response = self.session.get(url, timeout=self.timeout)
+        self.bytes_received += len(response.content)
+        return response
+
+    def section_map(self, api_url: str, word: str):
+        """Returns (title, {anchor: section index}) for the entry of word
+        or None if there is no such entry."""
+        key = (api_url, word)
+        with self._lock:
+            if key in self.section_maps:
+                return self.section_maps[key]
+        response = self._api_get(api_url, page=word, prop="sections")
+        response.raise_for_status()
+        parsed = json.loads(response.content).get("parse")
+        if parsed is None:
+            return None
+        anchors = {}
+        for section in parsed["sections"]:
+            # sections coming from templates have indexes like "T-1"
+            # and can't be requested on their own.
+            if section["index"].isdigit():
+                anchors.setdefault(section["anchor"], int(section["index"]))
+        section_map = (parsed["title"], anchors)
+        with self._lock:
+            self.section_maps[key] = section_map
+        return section_map
+
+    def get(self, base_url: str, word: str, anchor_for) -> requests.Response:
+        """Returns a response with the section of word whose anchor is
+        anchor_for(title). When the entry doesn't exist, the status code
+        of the response is 404; when only the section doesn't exist, the
+        page contains just the title.
+
+        Args:
+            base_url (str): /wiki/ url of the site, like Word.base_url.
+            word (str): entry to fetch.
+            anchor_for (callable): receives the title of the entry and returns the anchor of the section.
+
+        Returns:
+            requests.Response: response with the html of the section
+        """
+        api_url = self.api_url(base_url)
+        section_map = self.section_map(api_url, word)
+        if section_map is None:
+            return self._build_response(base_url + word, 404, "")
+        title, anchors = section_map
+        index = anchors.get(anchor_for(title))
+        section_html = ""
+        if index is not None:
+            response = self._api_get(api_url, page=title, prop="text", section=index)
+            response.raise_for_status()
+            section_html = json.loads(response.content)["parse"]["text"]
+        page_html = (
+            '<h1 id="firstHeading" class="firstHeading mw-first-heading">'
+            f'<span class="mw-page-title-main">{html.escape(title)}</span></h1>'
+            + section_html
+        )
+        return self._build_response(base_url + title, 200, page_html)
+
+    @staticmethod
+    def _build_response(url: str, status_code: int, text: str) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = status_code
+        response.encoding = "utf-8"
+        response._content = text.encode("utf-8")
+        return response
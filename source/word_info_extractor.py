@@ -1,11 +1,67 @@
-import requests, bs4, re, pathlib, urllib, json, gtts, tempfile, unidecode
+import requests, bs4, re, pathlib, urllib, json, unidecode, asyncio, threading
+import concurrent.futures, functools, cachetools
 from utils import *
+from http_cache import CachedSession, cache_from_config
+from cassette import cassette_from_config
+from wiktionary_api import SectionTransport
+from offline_dictionary import store_from_config
+from page_outline import PageOutline
+from dictionary_entry import Entry, Section
+from speech_cache import speech_cache_from_config
 from collections import Counter
 
 DWDS_URL = "https://www.dwds.de/wb/"
 DUDEN_URL = "https://www.duden.de/rechtschreibung/"
 WIKTIONARY_URL = "https://de.wiktionary.org/wiki/"
-SESSION = NeverSayNeverSession()
+SESSION = CachedSession(cache_from_config())
+# "cassette = <path>" in the config file answers SESSION from recorded
+# exchanges (see cassette.py), for tests and benchmarks without network
+cassette_from_config(SESSION)
+# seconds to wait for each attempt; NeverSayNeverSession decides how many attempts there are
+TIMEOUT = float(CONFIG_PARSER["DEFAULT"].get("timeout", 0.8))
+MAX_ROOT_REDIRECTS = 5
+# part of the key of stored results; change it whenever the output of
+# the extractors changes, so that old results aren't reused
+RESULT_VERSION = 3
+# attributes of Word that are stored in SESSION.cache after the extraction,
+# along with root_entry, if they were computed by then
+RESULT_ATTRIBUTES = (
+    "root",
+    "ipa",
+    "pronunciation_url",
+    "root_ipa",
+    "root_pronunciation_url",
+)
+# "sections" makes the Wiktionary classes fetch only the section of their
+# language through the MediaWiki parse API; "page" fetches whole articles.
+WIKTIONARY_TRANSPORT = CONFIG_PARSER["DEFAULT"].get("wiktionary_transport", "page")
+# "backend = offline" in the config file answers the classes that have an
+# offline_dictionary from a local Wiktionary extract (see offline_dictionary.py)
+OFFLINE_STORE = store_from_config()
+SECTION_TRANSPORT = (
+    SectionTransport(SESSION, timeout=TIMEOUT)
+    if WIKTIONARY_TRANSPORT == "sections"
+    else None
+)
+# Word.fetch awaits requests made by IO_EXECUTOR, which has one thread per
+# connection kept alive by SESSION, so every async lookup shares its pool.
+IO_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    SESSION.policy.pool_maxsize, thread_name_prefix="fetch"
+)
+PARSE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="parse")
+# words looked up during this session, so that a class can reuse what
+# another one already fetched (see Word.recent)
+RECENT_WORDS = cachetools.LRUCache(16)
+RECENT_WORDS_LOCK = threading.Lock()
+SPEECH_CACHE = speech_cache_from_config()
+
+
+async def async_get(url: str) -> requests.Response:
+    """Awaitable SESSION.get(url)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        IO_EXECUTOR, functools.partial(SESSION.get, url, timeout=TIMEOUT)
+    )
 
 
 def raise_word_not_available(request: requests.Request, netloc=""):
@@ -48,50 +104,332 @@ class Word(CompatibilityMixin):
         base_url (str): url of the site you gonna use.
         go_to_root (bool, optional): use _root_page() to set self.root_page. Defaults to False.
         api (bool, optional): set to True if you are using an api. Defaults to False.
-    Relevant attributes:
+    Relevant attributes (except self.word and self.page, they are computed
+    the first time they are used, so that getting the ipa doesn't fetch
+    the root page nor extract the definitions):
         self.word = the same word you gave as input.
         self.page = parsed page from base_url + word.
         self.root_page = page you get redirected to when using _root_page().
         If go_to_root is set to false, then self.root_page is the same as self.page.
         self.root = word extracted from self.root_page.
-        self.root_info = where all the relevant info is contained.
+        self.root_entry = dictionary_entry.Entry with the definitions and examples of self.root.
+        self.root_info = self.root_entry as text, where all the relevant info is contained.
         self.ipa = ipa representation from word.
         self.root_ipa = ipa representation from root_word.
+    Raises:
+        WordNotAvailable: when the site has no page (or section) for word, in
+        the constructor. When the page has no definitions, the first time
+        root_entry or root_info is used, and when the root page can't be
+        reached, the first time something of the root is used.
     """
 
     base_url = None
     api = False
     go_to_root = False
     options = ""
+    # set to a wiktionary_api.SectionTransport to download only the
+    # section with _section_anchor() instead of the whole page
+    section_transport = None
+    # (edition, lang_code) of the entries in OFFLINE_STORE that this
+    # class uses when the offline backend is on, like ("en", "la")
+    offline_dictionary = None
+    offline = False
 
     def __init__(self, word):
         self.word = self.compatible(word) or word
-        url = self.base_url + self.word + self.options
-        request = SESSION.get(url, timeout=0.8)
+        self._given_word = word
+        with METRICS.phase(type(self).__name__, "lookup"):
+            if self._uses_offline_store():
+                self._load_offline(word)
+            else:
+                self._response = self._request(self.word)
+                if not self._load_stored_result(self._response):
+                    # parsing raises WordNotAvailable when the page has no section for the word
+                    self.page
+        self._remember()
+
+    @classmethod
+    async def fetch(cls, word):
+        """Asynchronous version of cls(word). Network requests (root page
+        redirects included) are awaited and parsing happens in PARSE_EXECUTOR,
+        so many words can be fetched concurrently from one event loop.
+        >>> words = await asyncio.gather(*[DEWiktionaryWord.fetch(w) for w in ("ging", "Stuhl")])
+
+        Unlike cls(word), everything is computed before returning, so
+        using the attributes never blocks the event loop.
+
+        Returns:
+            Word: the same object cls(word) would return
+        """
+        loop = asyncio.get_running_loop()
+        self = cls.__new__(cls)
+        self.word = self.compatible(word) or word
+        self._given_word = word
+        if self._uses_offline_store():
+            self._load_offline(word)
+            self._remember()
+            return self
+        self._response = await self._async_request(self.word)
+        if await loop.run_in_executor(IO_EXECUTOR, self._load_stored_result, self._response):
+            self._remember()
+            return self
+        await loop.run_in_executor(PARSE_EXECUTOR, self._load_page, self._response)
+        if await loop.run_in_executor(PARSE_EXECUTOR, self._needs_root_page):
+            with METRICS.phase(cls.__name__, "root_page"):
+                self._root = await self._async_root_page()
+        else:
+            self._root = (self.page, word)
+        self.root_entry = await loop.run_in_executor(PARSE_EXECUTOR, self._load_info)
+        await loop.run_in_executor(PARSE_EXECUTOR, self._load_pronunciations)
+        await loop.run_in_executor(IO_EXECUTOR, self._store_result)
+        self._remember()
+        return self
+
+    def _remember(self):
+        with RECENT_WORDS_LOCK:
+            RECENT_WORDS[(type(self), self.word)] = self
+
+    @classmethod
+    def recent(cls, word):
+        """Returns the cls(word) looked up earlier in this session if it
+        is still in RECENT_WORDS, otherwise None"""
+        with RECENT_WORDS_LOCK:
+            return RECENT_WORDS.get((cls, cls.compatible(word) or word))
+
+    def _uses_offline_store(self) -> bool:
+        return OFFLINE_STORE is not None and self.offline_dictionary is not None
+
+    def _load_offline(self, word):
+        """Sets the same attributes as the online lookup, but from
+        the entries of OFFLINE_STORE. No request is made."""
+        edition, lang_code = self.offline_dictionary
+        entries = OFFLINE_STORE.entries(edition, lang_code, self.word)
+        if not entries:
+            raise WordNotAvailable(
+                f"Word not available in the offline dictionary ({edition}.wiktionary.org)"
+            )
+        self.offline = True
+        self.page = self.root_page = None
+        self.root, root_entries = word, entries
+        root_words = {
+            root_word
+            for entry in entries
+            for sense in entry["senses"]
+            for root_word in sense["form_of"]
+        }
+        only_inflection = all(sense["form_of"] for entry in entries for sense in entry["senses"])
+        if self.go_to_root and only_inflection and len(root_words) == 1:
+            root_word = root_words.pop()
+            root_entries = OFFLINE_STORE.entries(edition, lang_code, root_word) or entries
+            if root_entries is not entries:
+                self.root = root_word
+        self.ipa, self.pronunciation_url = self._offline_pronunciation(entries)
+        self.root_ipa, self.root_pronunciation_url = self._offline_pronunciation(root_entries)
+        sections = []
+        for entry in root_entries:
+            senses = []
+            examples = []
+            for index, sense in enumerate(entry["senses"]):
+                senses.append((str(index + 1), "; ".join(sense["glosses"])))
+                examples += [(str(index + 1), example) for example in sense["examples"]]
+            sections.append(Section(entry["pos"], senses=senses, examples=examples))
+        self.root_entry = Entry("wiktionary", sections, hidden_word=self.root)
+        self.offline_inflections = tuple(
+            dict.fromkeys(form for entry in root_entries for form in entry["forms"])
+        )
+
+    @staticmethod
+    def _offline_pronunciation(entries) -> tuple:
+        ipas = [ipa for entry in entries for ipa in entry["ipa"]]
+        audios = [audio for entry in entries for audio in entry["audio"]]
+        return (ipas[0] if ipas else "", audios[0] if audios else "")
+
+    def get_inflections(self):
+        """Returns a tuple with the inflections of self.root"""
+        if self.offline:
+            return self.offline_inflections or (self.root,)
+        return (self.root,)
+
+    def _request(self, word: str) -> requests.Response:
+        """Returns the response with the page of word. Goes through
+        self.section_transport when the class has one."""
+        if self.section_transport is not None:
+            return self.section_transport.get(self.base_url, word, self._section_anchor)
+        return SESSION.get(self.base_url + word + self.options, timeout=TIMEOUT)
+
+    async def _async_request(self, word: str) -> requests.Response:
+        """Awaitable self._request(word)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(IO_EXECUTOR, self._request, word)
+
+    @classmethod
+    def _section_anchor(cls, title: str) -> str:
+        """Returns the anchor of the section of interest of the entry
+        called title. Only used by classes with a section_transport."""
+        return title
+
+    def _load_page(self, request: requests.Response):
+        """Sets self.page from the response to self._request(self.word)"""
         raise_word_not_available_404(request)
         if not self.api:
-            self.page = bs4.BeautifulSoup(request.text, "html.parser")
-            self.page = self._only_relevant_part(self.page)
+            source = type(self).__name__
+            with METRICS.phase(source, "parse", len(request.content)):
+                self.page = make_soup(request.content, request.encoding)
+            with METRICS.phase(source, "isolate"):
+                self.page = self._only_relevant_part(self.page)
         else:
             self.page = json.loads(request.text)
 
-        self.ipa, self.pronunciation_url = self._get_pronunciation(self.page)
-        if self.go_to_root and self._is_inflection_without_own_definition(self.page):
-            self.root_page, self.root = self._root_page()
-            self.root_ipa, self.root_pronunciation_url = self._get_pronunciation(
-                self.root_page
-            )
-        else:
-            self.root_page, self.root = self.page, word
-            self.root_ipa, self.root_pronunciation_url = (
-                self.ipa,
-                self.pronunciation_url,
-            )
-        self.root_info = self._get_info(self.root_page)
-        if not self.root_info.strip():
-            raise_word_not_available(request)
-        if CONFIG_PARSER["DEFAULT"].get("show_word")=="0":
-            self.root_info = self.root_info.replace(self._get_word(self.root_page), "_")
+    @functools.cached_property
+    def page(self):
+        # only reached after _load_stored_result(), __init__ parses the page right away
+        self._load_page(self._response)
+        return self.page
+
+    def _needs_root_page(self) -> bool:
+        return bool(
+            self.go_to_root and self._is_inflection_without_own_definition(self.page)
+        )
+
+    @functools.cached_property
+    def _root(self) -> tuple:
+        """(root page, root word). The root page is only fetched here,
+        when something needs it."""
+        if "_stored_root_request" in vars(self):
+            root_request = vars(self).pop("_stored_root_request")
+            if root_request is None:
+                return (self.page, self.root)
+            root_page = self._parse_root_page(root_request)
+            return (self._only_relevant_part(root_page), self.root)
+        if self._needs_root_page():
+            with METRICS.phase(type(self).__name__, "root_page"):
+                return self._root_page()
+        return (self.page, self._given_word)
+
+    @functools.cached_property
+    def root_page(self) -> bs4.BeautifulSoup:
+        return self._root[0]
+
+    @functools.cached_property
+    def root(self) -> str:
+        return self._root[1]
+
+    @functools.cached_property
+    def _pronunciation(self) -> tuple:
+        with METRICS.phase(type(self).__name__, "pronunciation"):
+            return self._get_pronunciation(self.page)
+
+    @functools.cached_property
+    def ipa(self) -> str:
+        return self._pronunciation[0]
+
+    @functools.cached_property
+    def pronunciation_url(self) -> str:
+        return self._pronunciation[1]
+
+    @functools.cached_property
+    def _root_pronunciation(self) -> tuple:
+        if self.root_page is self.page:
+            return self._pronunciation
+        with METRICS.phase(type(self).__name__, "pronunciation"):
+            return self._get_pronunciation(self.root_page)
+
+    @functools.cached_property
+    def root_ipa(self) -> str:
+        return self._root_pronunciation[0]
+
+    @functools.cached_property
+    def root_pronunciation_url(self) -> str:
+        return self._root_pronunciation[1]
+
+    def _load_pronunciations(self):
+        """Computes the phonetic attributes now instead of when they are used"""
+        self._pronunciation, self._root_pronunciation
+
+    @functools.cached_property
+    def root_entry(self) -> Entry:
+        self.root_entry = self._load_info()
+        self._store_result()
+        return self.root_entry
+
+    def _load_info(self) -> Entry:
+        """Returns the entry of self.root_page. Raises WordNotAvailable
+        when it has no definitions."""
+        root_page = self.root_page
+        with METRICS.phase(type(self).__name__, "extract"):
+            entry = self._get_info(root_page)
+        if not entry.sections:
+            raise_word_not_available(self._response)
+        try:
+            entry.hidden_word = self._get_word(self.root_page) or self.root
+        except AttributeError:
+            # pages cut down to their relevant part may have lost their title
+            entry.hidden_word = self.root
+        return entry
+
+    @property
+    def root_info(self) -> str:
+        """self.root_entry as text. The word is hidden when
+        show_word = 0 in the configfile."""
+        pronunciation = ("", "")
+        # the pronunciation can cost a request, so it is only computed if shown
+        if self.root_entry.shows_pronunciation:
+            pronunciation = (self.root_ipa, self.root_pronunciation_url)
+        return self.root_entry.render(
+            show_word=CONFIG_PARSER["DEFAULT"].get("show_word") != "0",
+            title=self.root,
+            pronunciation=pronunciation,
+        )
+
+    def _result_key(self) -> str:
+        class_name = f"{type(self).__module__}.{type(self).__qualname__}"
+        return f"{RESULT_VERSION}:{class_name}:{self.word}"
+
+    def _store_result(self):
+        """Stores the extracted attributes in SESSION.cache, along with the
+        versions of the pages they were extracted from. Only the attributes
+        computed so far are stored, so storing doesn't cost a request."""
+        root_versions = vars(self).get("_root_versions", [])
+        versions = [getattr(self._response, "cache_version", None)]
+        versions += [version for _, version in root_versions]
+        if SESSION.cache is None or None in versions:
+            return
+        # known once the root page is
+        self.root
+        computed = vars(self)
+        result = {attribute: computed[attribute] for attribute in RESULT_ATTRIBUTES if attribute in computed}
+        result["root_entry"] = self.root_entry.to_json()
+        result["root_words"] = [root_word for root_word, _ in root_versions]
+        result["versions"] = versions
+        SESSION.cache.put_result(self._result_key(), self._response.url, result)
+
+    def _load_stored_result(self, request: requests.Response) -> bool:
+        """Sets the extracted attributes from SESSION.cache if the pages
+        they come from didn't change (for example, when they were revalidated
+        with a 304). In that case, self.page and self.root_page are only
+        parsed if something uses them.
+
+        Returns:
+            bool: True if the stored result was used
+        """
+        version = getattr(request, "cache_version", None)
+        if SESSION.cache is None or version is None:
+            return False
+        result = SESSION.cache.get_result(self._result_key())
+        if result is None or result["versions"][0] != version:
+            return False
+        root_request = None
+        for root_word, root_version in zip(result["root_words"], result["versions"][1:]):
+            root_request = self._request(root_word)
+            if getattr(root_request, "cache_version", None) != root_version:
+                return False
+        # the attributes that weren't stored are computed when used, from the pages
+        for attribute in RESULT_ATTRIBUTES:
+            if attribute in result:
+                setattr(self, attribute, result[attribute])
+        self.root_entry = Entry.from_json(result["root_entry"])
+        self._stored_root_request = root_request
+        return True
 
     @classmethod
     def _only_relevant_part(cls, page: bs4.BeautifulSoup) -> bs4.BeautifulSoup:
@@ -108,14 +446,14 @@ class Word(CompatibilityMixin):
         return page
 
     @classmethod
-    def _get_info(cls, page: bs4.BeautifulSoup) -> str:
-        """Returns a string with information about the word
+    def _get_info(cls, page: bs4.BeautifulSoup) -> Entry:
+        """Returns the definitions and examples of the word
 
         Args:
             page (bs4.BeautifulSoup): word page
 
         Returns:
-            str: string with information about the word
+            Entry: entry without sections if the page has no definitions
         """
         pass
 
@@ -148,58 +486,84 @@ class Word(CompatibilityMixin):
         Returns:
             (bs4.BeautifulSoup, str): (root page of self.word, root word)
         """
-        return (bs4.BeautifulSoup("", "html.parser"), "")
+        page = self.page
+        self._root_versions = []
+        for _ in range(MAX_ROOT_REDIRECTS):
+            word = self._root_word(page)
+            page_request = self._request(word)
+            self._root_versions.append((word, getattr(page_request, "cache_version", None)))
+            page = self._parse_root_page(page_request)
+            if not self._is_inflection_without_own_definition(page):
+                return (self._only_relevant_part(page), word)
+        raise WordNotAvailable(f"Too many redirects while looking for the root of {self.word}")
+
+    async def _async_root_page(self):
+        """Asynchronous version of self._root_page()"""
+        loop = asyncio.get_running_loop()
+        page = self.page
+        self._root_versions = []
+        for _ in range(MAX_ROOT_REDIRECTS):
+            word = self._root_word(page)
+            page_request = await self._async_request(word)
+            self._root_versions.append((word, getattr(page_request, "cache_version", None)))
+            page = await loop.run_in_executor(
+                PARSE_EXECUTOR, self._parse_root_page, page_request
+            )
+            is_inflection = await loop.run_in_executor(
+                PARSE_EXECUTOR, self._is_inflection_without_own_definition, page
+            )
+            if not is_inflection:
+                root_page = await loop.run_in_executor(
+                    PARSE_EXECUTOR, self._only_relevant_part, page
+                )
+                return (root_page, word)
+        raise WordNotAvailable(f"Too many redirects while looking for the root of {self.word}")
+
+    @classmethod
+    def _root_word(cls, page) -> str:
+        """Returns the word page redirects to. Only called when
+        page is an inflection without its own definition."""
+        return ""
+
+    @classmethod
+    def _parse_root_page(cls, page_request: requests.Response) -> bs4.BeautifulSoup:
+        page_request.raise_for_status()
+        with METRICS.phase(cls.__name__, "parse", len(page_request.content)):
+            return make_soup(page_request.content, page_request.encoding)
 
     @classmethod
     def _get_word(cls, page):
         return ""
 
-    def format_info(
-        self, definitions, examples, show_phonetic_info=False, show_root=True
-    ):
-        """Returns padronized word information
+    @classmethod
+    def language_header(cls, wiktionary_page, lang_id, exact_id=True):
+        """Returns the header (usually an h2) that starts the section
+        of a language in a wiktionary page.
 
         Args:
-            definitions (iterable): iterable with definitions
-            examples (iterable): iterable with examples
-            show_phonetic_info (bool, optional): self-describing. Defaults to False.
-        """
-        info = "\n".join(definitions)
-        if len(examples) > 0:
-            info += f"\n\nEXAMPLES:\n"
-        info += "\n".join(examples)
-        if show_phonetic_info:
-            audio_section = (
-                f"Phonetics: {self.root_ipa} {self.root_pronunciation_url}"
-                if self.root_pronunciation_url
-                else ""
-            )
-        else:
-            audio_section = ""
-        info = f"{self.root if show_root else ''}\n{audio_section}\n{info}"
-        return info
+            wiktionary_page: page to search in;
+            lang_id: id of the span element that marks different languages."""
+        # usually, the element with id {lang_id} will be a
+        # span inside an h2 tag. We want that h2 tag.
+        id = lang_id if exact_id else re.compile(lang_id)
+        language_indicator = find_by_id(wiktionary_page, id)
+        if language_indicator is None:
+            raise WordNotAvailable("Word not found. Maybe you missed the language?")
+        return language_indicator.parent
 
     @classmethod
     def isolate_lang(cls, wiktionary_page, lang_id, exact_id=True):
-        """Isolate specific language in a wiktionary page.
+        """Isolate specific language in a wiktionary page. The tags of
+        the section are moved out of wiktionary_page, not copied.
 
         Args:
             wiktionary_page: page to narrow;
             lang_id: id of the span element that marks different languages."""
-        try:
-            # usually, the element with id {lang_id} will be a
-            # span inside an h2 tag. We want that h2 tag.
-            id = lang_id if exact_id else re.compile(lang_id)
-            language_indicator = wiktionary_page.find(id=id).parent
-        except AttributeError:
-            raise WordNotAvailable("Word not found. Maybe you missed the language?")
-        below_language_indicator = remove_navigable_strings(
-            language_indicator.next_siblings
-        )
-        isolated_page = bs4.BeautifulSoup(str(language_indicator), "html.parser")
-        for sibling in below_language_indicator:
+        language_indicator = cls.language_header(wiktionary_page, lang_id, exact_id)
+        isolated_page = make_soup("")
+        for sibling in detach_siblings(language_indicator):
             isolated_page.append(sibling)
-            if sibling.name == "h2":
+            if sibling.name == "h2" and sibling is not language_indicator:
                 break
         return isolated_page
 
@@ -219,10 +583,22 @@ class SecondaryWord(CompatibilityMixin):
 
     def __init__(self, word, base_url):
         self.word = self.compatible(word) or word
-        url = self.base_url + self.word
-        request = SESSION.get(url, timeout=0.8)
+        request = SESSION.get(self.base_url + self.word, timeout=TIMEOUT)
+        self._load(request)
+
+    @classmethod
+    async def fetch(cls, word, base_url):
+        """Asynchronous version of cls(word, base_url)"""
+        loop = asyncio.get_running_loop()
+        self = cls.__new__(cls)
+        self.word = self.compatible(word) or word
+        request = await async_get(self.base_url + self.word)
+        await loop.run_in_executor(PARSE_EXECUTOR, self._load, request)
+        return self
+
+    def _load(self, request: requests.Response):
         raise_word_not_available_404(request)
-        self.page = bs4.BeautifulSoup(request.text, "html.parser")
+        self.page = make_soup(request.content, request.encoding)
         self.audio_url = self._get_audio_url()
         self.info = self._get_info()
 
@@ -252,28 +628,30 @@ class WiktionaryWord(Word):
     pron_li_text = ""
     api = False
     go_to_root = False
+    section_transport = SECTION_TRANSPORT
+
+    @classmethod
+    def _section_anchor(cls, title: str) -> str:
+        return cls.lang_id
 
     @classmethod
     def _get_word(cls, page: bs4.BeautifulSoup):
-        return page.find("strong", {"class": "headword"}).text
+        return PageOutline.of(page).find("strong", class_="headword").text
 
     def _get_info(self, page: bs4.BeautifulSoup):
-        head_words = page.find_all("strong", {"class": "headword"})
-        info = ""
+        outline = PageOutline.of(page)
+        head_words = outline.find_all("strong", class_="headword")
+        sections = []
         for head_word in head_words:
-            definitions = []
+            senses = []
             examples = []
-            grammar = (
-                head_word.find_previous(["h4", "h3"]).text.upper().replace("[EDIT]", "")
-            )
-            if not (grammar in info):
-                definitions.append(grammar)
-            # prevents repeating information
+            grammar = outline.previous(head_word, ("h4", "h3")).text.replace("[edit]", "")
             title_definition = head_word.find_parent("p").text.strip()
-            definitions.append(title_definition)
-            definition_list = head_word.find_next("ol")
+            definition_list = outline.next(head_word, "ol")
             if definition_list.find("dl"):
-                examples.append(title_definition)
+                # the examples are introduced by the headword line, even when
+                # none of the lists under the senses holds a usage example
+                examples.append(("", title_definition))
             for id, li in enumerate(remove_navigable_strings(definition_list.children)):
                 if len(list(li.children))==0:
                     continue
@@ -304,13 +682,11 @@ class WiktionaryWord(Word):
                         )
                     )
                 )
-                definitions.append(f"[{id+1}] {corresponding_definition}")
-                if examples_tags:
-                    for example in examples_tags:
-                        examples.append(f"[{id+1}] {example.text}")
-            info += self.format_info(definitions, examples, False, False) + "\n"
-        info = re.sub(r"\n_\n", "\n", info)
-        return info
+                senses.append((str(id + 1), corresponding_definition))
+                for example in examples_tags:
+                    examples.append((str(id + 1), example.text))
+            sections.append(Section(grammar, title_definition, senses, examples))
+        return Entry("wiktionary", sections)
 
     @classmethod
     def _only_relevant_part(cls, page: bs4.BeautifulSoup) -> bs4.BeautifulSoup:
@@ -319,10 +695,13 @@ class WiktionaryWord(Word):
 
     @classmethod
     def _get_pronunciation(cls, page: bs4.BeautifulSoup) -> tuple:
-        pron_li = page.select_one(f'li:-soup-contains("{cls.pron_li_text}")')
+        outline = PageOutline.of(page)
+        pron_li = next(
+            (li for li in outline.find_all("li") if cls.pron_li_text in li.get_text()), None
+        )
         try:
             ipa = ""
-            ipa_ul = page.find("span", {"class": "IPA"}).parent.parent
+            ipa_ul = outline.find("span", class_="IPA").parent.parent
             for li in ipa_ul.find_all("li"):
                 if li.find("span", {"class": "IPA"}):
                     ipa += li.text.strip() + "\n"
@@ -353,7 +732,7 @@ class DudenWord(Word):
 
     def _get_info(self, page: bs4.BeautifulSoup):
         word = page.find(class_="lemma__main").text
-        definitions = []
+        senses = []
         examples = []
 
         def setup_examples(bedeutung, index):
@@ -367,27 +746,26 @@ class DudenWord(Word):
             example_iter = example_tag.find(class_="note__list").children
             example_iter = remove_navigable_strings(example_iter)
             for example in example_iter:
-                examples.append(f"[{index}] {example.text.strip()}")
+                examples.append((index, example.text.strip()))
 
         if ugly_info := page.find(id="bedeutung"):
-            definitions.append(f"[1] {ugly_info.p.text}")
+            senses.append(("1", ugly_info.p.text))
             setup_examples(ugly_info, "1")
         else:
             ugly_info = page.find_all("li", id=re.compile("Bedeutung-"))
             for bedeutung in ugly_info:
                 bedeutung_index = bedeutung["id"].split("-")[1]
                 try:
-                    definition = f"[{bedeutung_index}] {bedeutung.div.text.strip()}"
+                    senses.append((bedeutung_index, bedeutung.div.text.strip()))
                 except:
                     # some Duden definitions are just a figure, without any text
                     if figure := bedeutung.figure:
-                        definition = f"[{bedeutung_index}] {figure.a['href']}"
+                        senses.append((bedeutung_index, figure.a["href"]))
                     else:
-                        definition = ""
-                definitions.append(definition)
+                        # shown as an empty line
+                        senses.append(("", ""))
                 setup_examples(bedeutung, bedeutung_index)
-        info = self.format_info(definitions, examples, show_phonetic_info=True)
-        return info
+        return Entry("dictionary", [Section(senses=senses, examples=examples)])
 
     def _get_pronunciation(self, page: bs4.BeautifulSoup):
         guide_tag = page.find(class_="pronunciation-guide")
@@ -424,21 +802,18 @@ class DWDSWord(Word):
         if word:
             word = word.text
         else:
-            # returning an empty string here raises an error later
-            return ""
+            # returning an empty entry here raises an error later
+            return Entry("dwds")
         main_definitions = page.find_all(id=re.compile("d-\d-\d"))
-        definitions = []
+        senses = []
         examples = []
         counter = Counter(["definition_number"])
         alphabet = "abcdefghijklmnopqrstuvwxyz"
 
         def append_definition_and_examples(definition: bs4.BeautifulSoup, preffix: str):
-            result = ""
-            sub = " " if len(preffix) > 1 else ""
-            definition_number = counter["definition_number"]
             content = list(definition.children)[1]
             main_definition = content.find("div", class_="dwdswb-lesart-def")
-            definitions.append(f"{sub}[{preffix}] {main_definition.text.strip()}")
+            senses.append((preffix, main_definition.text.strip()))
             try:
                 main_definition_examples = main_definition.next_sibling.children
             except AttributeError:
@@ -448,7 +823,7 @@ class DWDSWord(Word):
                     continue
                 elif "Beispiel" in example.text:
                     continue
-                examples.append(f"[{preffix}] {example.text.strip()}")
+                examples.append((preffix, example.text.strip()))
             return content
 
         def is_sub_definition(tag: bs4.BeautifulSoup):
@@ -470,8 +845,7 @@ class DWDSWord(Word):
             except KeyError:
                 pass
             counter.update(["definition_number"])
-        info = self.format_info(definitions, examples, show_phonetic_info=True)
-        return info
+        return Entry("dwds", [Section(senses=senses, examples=examples)])
 
     @classmethod
     def _get_pronunciation(self, page: bs4.BeautifulSoup):
@@ -492,34 +866,32 @@ class DEWiktionaryWord(Word):
     go_to_root = True
     base_url = WIKTIONARY_URL
     lang_id = "Deutsch"
+    section_transport = SECTION_TRANSPORT
+    offline_dictionary = ("de", "de")
+
+    @classmethod
+    def _section_anchor(cls, title: str) -> str:
+        return title.replace(" ", "_") + f"_({cls.lang_id})"
 
-    def _root_page(self, page: bs4.BeautifulSoup = False):
-        if not page:
-            page = self.page
-        merkmale_title = page.find(title="Grammatische Merkmale")
+    @classmethod
+    def _root_word(cls, page: bs4.BeautifulSoup):
+        merkmale_title = PageOutline.of(page).find(title="Grammatische Merkmale")
         merkmale_siblings = remove_navigable_strings(merkmale_title.next_siblings)
         first_merkmal = merkmale_siblings[0]
-        word = first_merkmal.text.split(" ")[-1]
-        page_request = SESSION.get(WIKTIONARY_URL + word, timeout=0.8)
-        page_request.raise_for_status()
-        base_word_page = bs4.BeautifulSoup(page_request.text, "html.parser")
-        is_inflection = self._is_inflection_without_own_definition(base_word_page)
-        if is_inflection:
-            return self._root_page(base_word_page)
-        base_word_page = self._only_relevant_part(base_word_page)
-        return (base_word_page, word)
+        return first_merkmal.text.split(" ")[-1]
 
     @classmethod
     def _get_pronunciation(cls, page):
+        outline = PageOutline.of(page)
         ipa = ""
         try:
-            ipa = page.find(class_="ipa").text
+            ipa = outline.find(class_="ipa").text
         except:
             pass
         link_to_pronunciation = ""
         try:
             link_to_pronunciation = (
-                "https:" + page.find(class_="aplay").next_sibling["href"]
+                "https:" + outline.find(class_="aplay").next_sibling["href"]
             )
         except:
             pass
@@ -543,46 +915,51 @@ class DEWiktionaryWord(Word):
         """Returns True when the word from wiktionary_page comes
         from another word and the wiktionary_page doesn't
         provide a definition for it."""
-        return wiktionary_page.find(
-            title="Grammatische Merkmale"
-        ) and not wiktionary_page.find(title="Sinn und Bezeichnetes (Semantik)")
+        outline = PageOutline.of(wiktionary_page)
+        return outline.find(title="Grammatische Merkmale") and not outline.find(
+            title="Sinn und Bezeichnetes (Semantik)"
+        )
 
     @classmethod
     def _get_info(self, page: bs4.BeautifulSoup):
-        info = ""
-        all_definition_headers = iter(
-            page.find_all(title="Sinn und Bezeichnetes (Semantik)")
-        )
-        all_example_headers = iter(page.find_all(title="Verwendungsbeispielsätze"))
-        result = ""
-        try:
-            for definitions, examples in zip(
-                all_definition_headers, all_example_headers
-            ):
-                definitions_ps = definitions.previous_siblings
-                grammatical_information_header = next(
-                    x for x in definitions_ps if x.name == "h3"
-                )
-                g_info_text = grammatical_information_header.text.replace(
-                    "[Bearbeiten]", ""
+        outline = PageOutline.of(page)
+        all_definition_headers = outline.find_all(title="Sinn und Bezeichnetes (Semantik)")
+        all_example_headers = outline.find_all(title="Verwendungsbeispielsätze")
+        sections = []
+        for definitions, examples in zip(all_definition_headers, all_example_headers):
+            grammatical_information_header = outline.previous(
+                definitions, ("h3",), siblings_only=True
+            )
+            if grammatical_information_header is None:
+                break
+            g_info_text = grammatical_information_header.text.replace("[Bearbeiten]", "")
+            definition_list = outline.next(definitions, "dl", siblings_only=True)
+            example_list = outline.next(examples, "dl", siblings_only=True)
+            sections.append(
+                Section(
+                    g_info_text,
+                    senses=self._numbered_items(definition_list),
+                    examples=self._numbered_items(example_list),
                 )
-                info += g_info_text + "\n"
-                for sibling in definitions.next_siblings:
-                    if sibling.name == "dl":
-                        info += "\n" + sibling.text
-                        break
-                for sibling in examples.next_siblings:
-                    if sibling.name == "dl":
-                        info += "\n" * 2 + sibling.text
-                        break
-                result += info + "\n"
-                info = ""
-        except StopIteration:
-            pass
-        return result
+            )
+        return Entry("de.wiktionary", sections)
+
+    @staticmethod
+    def _numbered_items(definition_list) -> list:
+        """Returns [(number, text)] from the items of a list like
+        <dl><dd>[1] sich entwickeln</dd>...</dl>"""
+        if definition_list is None:
+            return []
+        items = []
+        for item in remove_navigable_strings(definition_list.children):
+            number, text = re.fullmatch(r"(?:\[([^\]]+)\] )?(.*)", item.text, re.DOTALL).groups()
+            items.append((number or "", text))
+        return items
 
     def get_inflections(self):
-        all_inflection_tables = self.root_page.find_all(
+        if self.offline:
+            return super().get_inflections()
+        all_inflection_tables = PageOutline.of(self.root_page).find_all(
             class_=re.compile("inflection-table")
         )
         all_inflection_tables.reverse()  # because g_info is reversed
@@ -629,12 +1006,11 @@ class DEWiktionaryWord(Word):
 # ENGLISH
 
 DICTIONARY_URL = "https://www.dictionary.com/browse/"
-TEMPORARY_DIR = tempfile.TemporaryDirectory()
-TEMPORARY_DIR_PATH = pathlib.Path(TEMPORARY_DIR.name)
 
 
 class ENWiktionaryWord(WiktionaryWord):
     lang_id = "English"
+    offline_dictionary = ("en", "en")
     pron_li_text = "Audio (US)"
 
 
@@ -642,40 +1018,38 @@ class ENDictionaryWord(Word):
     base_url = DICTIONARY_URL
 
     def _get_pronunciation(self, page: bs4.BeautifulSoup):
-        pronunciation_tag = page.find(class_=re.compile("LgvbRZvyfgILDYMd8Lq6"))
-        ipa = ""
+        """Returns the ipa and the audio of en.wiktionary.org, reusing the
+        ENWiktionaryWord of this session if there is one. Without Wiktionary
+        audio, the url is the one of a gTTS recording made in the background."""
+        wiktionary_word = ENWiktionaryWord.recent(self.word)
         try:
-            ipa = pronunciation_tag.text.strip("[").strip("]")
-        except AttributeError:
-            pass
-        path_to_pronunciation = str(TEMPORARY_DIR_PATH / f"{self.word}.wav")
-        pronunciation = gtts.gTTS(self.word, tld="us")
-        with open(path_to_pronunciation, "w+b") as file:
-            pronunciation.write_to_fp(file)
-        wik = ENWiktionaryWord(self.word)
-        return (wik.ipa, wik.pronunciation_url or f"file://{path_to_pronunciation}")
+            wiktionary_word = wiktionary_word or ENWiktionaryWord(self.word)
+            ipa, pronunciation_url = wiktionary_word.ipa, wiktionary_word.pronunciation_url
+        except WordNotAvailable:
+            # dictionary.com only has a respelling, like "hous"
+            pronunciation_tag = page.find(class_=re.compile("LgvbRZvyfgILDYMd8Lq6"))
+            ipa = pronunciation_tag.text.strip("[ ]") if pronunciation_tag else ""
+            pronunciation_url = ""
+        return (ipa, pronunciation_url or SPEECH_CACHE.url(self.word, tld="us"))
 
     def _get_info(self, page: bs4.BeautifulSoup):
         definition_blocks = page.find_all(attrs={"data-type": "word-definitions"})
         if not definition_blocks:
-            return ""
-        definitions_text = f"{self.word}\n"
+            return Entry("dictionary.com")
+        sections = []
         for block in definition_blocks:
             try:
                 block_grammar = block.find(class_="OoNk445te7MEusWxZIjw").text
             except AttributeError:
                 continue
             definitions = block.find_all(class_="ESah86zaufmd2_YPdZtq")
-            definitions_text += "\n" + block_grammar + "\n"
-            for definition in definitions:
-                definitions_text += definition.text + "\n"
-
+            sections.append(
+                Section(block_grammar, senses=[("", definition.text) for definition in definitions])
+            )
+        # the examples of the page aren't grouped by meaning
         examples = page.find_all(class_="VvALg_9aE120lhieur0R")
-        examples_text = ""
-        for example in examples:
-            examples_text += example.p.text + "\n"
-        content = f"{definitions_text}\n\nEXAMPLES\n{examples_text}"
-        return content
+        sections.append(Section(examples=[("", example.p.text) for example in examples]))
+        return Entry("dictionary.com", sections)
 
 
 # Portuguese
@@ -693,13 +1067,7 @@ class BRDicioWord(Word):
 
     def _get_info(self, page: bs4.BeautifulSoup):
         meaning = page.find("p", class_="significado").children
-        result = ""
-        for span in meaning:
-            if getattr(span, "class", False) == "cl":
-                result += "\n" * 2 + span.text + "\n" * 2
-                break
-            result += span.text + "\n"
-        return result
+        return Entry("lines", [Section(senses=[("", span.text) for span in meaning])])
 
 
 # Latin
@@ -708,6 +1076,7 @@ class BRDicioWord(Word):
 class LAWiktionaryWord(WiktionaryWord):
     pron_li_text = "modern Italianate Ecclesiastical"
     lang_id = "Latin"
+    offline_dictionary = ("en", "la")
 
 
 # French
@@ -719,6 +1088,12 @@ class FRWiktionaryWord(Word):
     base_url = FRWIKTIONARY_URL
     api = False
     go_to_root = True
+    section_transport = SECTION_TRANSPORT
+    offline_dictionary = ("fr", "fr")
+
+    @classmethod
+    def _section_anchor(cls, title: str) -> str:
+        return "Français"
 
     @classmethod
     def _get_word(cls, page: bs4.BeautifulSoup):
@@ -728,39 +1103,48 @@ class FRWiktionaryWord(Word):
     @classmethod
     def _only_relevant_part(cls, wiktionary_page: bs4.BeautifulSoup):
         """Returns a BeautifulSoup object without any non-french definitions"""
-        french_id = "Français"
-        only_fr_page = cls.isolate_lang(wiktionary_page, french_id)
-        only_definitions_page = bs4.BeautifulSoup("", "html.parser")
-
-        definition_titles = [
-            element
-            for element in only_fr_page.find_all("h3")
-            if element.find(class_="titredef") or element.find(class_="titrepron")
-        ]
-        for definition_title in definition_titles:
-            siblings = list(definition_title.next_siblings)
-            only_definitions_page.append(definition_title)
-            for sibling in siblings:
-                if sibling.name == "h3":
-                    break
+        french_header = cls.language_header(wiktionary_page, "Français")
+        only_definitions_page = make_soup("")
+        # keeps the definition and pronunciation sections, in one pass
+        # over the french section
+        is_relevant = False
+        for sibling in detach_siblings(french_header):
+            if sibling.name == "h3":
+                is_relevant = bool(
+                    sibling.find(class_="titredef") or sibling.find(class_="titrepron")
+                )
+            if is_relevant:
                 only_definitions_page.append(sibling)
+            if sibling.name == "h2" and sibling is not french_header:
+                break
         return only_definitions_page
 
+    @classmethod
+    def _definition_lists(cls, page: bs4.BeautifulSoup) -> list:
+        """Returns the ols of page that aren't lists of references"""
+        return [
+            ol
+            for ol in PageOutline.of(page).find_all("ol")
+            if "references" not in ol.get("class", ())
+        ]
+
+    @classmethod
+    def _grammatical_header(cls, page: bs4.BeautifulSoup, ol: bs4.Tag) -> bs4.Tag:
+        """Returns the h3 right above the definition list ol or None"""
+        return PageOutline.of(page).previous(ol, ("h3",), siblings_only=True)
+
     @classmethod
     def _get_info(cls, page: bs4.BeautifulSoup):
-        definitions_and_examples = page.select("ol:not(.references)")
-        info = ""
+        definitions_and_examples = cls._definition_lists(page)
+        sections = []
+        ipa = None
         # each li in the ols above contains a definition along
         # with a set of usage examples.
         for ol in definitions_and_examples:
-            gr_info_list = [
-                gr_info for gr_info in ol.previous_siblings if gr_info.name == "h3"
-            ]
-
-            grammatical_info = "NO GRAMMATICAL INFORMATION"
-            if len(gr_info_list) == 0:
+            grammatical_header = cls._grammatical_header(page, ol)
+            if grammatical_header is None:
                 continue
-            grammatical_info = gr_info_list[0].text
+            grammatical_info = grammatical_header.text.replace("[modifier le wikicode]", "")
             more_grammatical_info = ol.previous_sibling.text
             # remove already known IPA transcription:
             # The french word chat can be pronounced as \ʃa\ or \tʃat\.
@@ -769,59 +1153,41 @@ class FRWiktionaryWord(Word):
             # to include it together with every function of the word that uses this
             # pronunciation. We are only going to include the IPA transcription in
             # more_grammatical_info if its IPA transcription contains something different.
-            more_grammatical_info = more_grammatical_info.replace(
-                cls._get_pronunciation(page)[0], ""
-            )
+            if ipa is None:
+                ipa = cls._get_pronunciation(page)[0]
+            more_grammatical_info = more_grammatical_info.replace(ipa, "")
             word = more_grammatical_info.split(" ")[0]
             more_grammatical_info = more_grammatical_info.replace(word, "")
-            info += "\n\n" + (
-                grammatical_info.upper().replace("[MODIFIER LE WIKICODE]", "").strip()
-                + "\n"
-                + more_grammatical_info.strip()
-                + "\n"
-            )
-            definitions = ""
-            examples = ""
+            senses = []
+            examples = []
             for index, def_tag in enumerate(remove_navigable_strings(ol)):
-                definition_number = f"[{index+1}]"
+                definition_number = str(index + 1)
                 example_list = def_tag.find("ul")
-                examples_li = []
                 if example_list:
-                    examples_li = [
-                        definition_number + example_tag.text
-                        for example_tag in remove_navigable_strings(
-                            example_list.children
-                        )
+                    examples += [
+                        (definition_number, example_tag.text)
+                        for example_tag in remove_navigable_strings(example_list.children)
                     ]
-                only_definition_tags = [tag for tag in def_tag if tag.name != "ul"]
-                examples_text = "\n".join(examples_li)
-                definition = definition_number
-                definition += "".join(
-                    [
-                        definition_part.text
-                        for definition_part in only_definition_tags
-                        # the example list is the last thing that appears in def_set,
-                        # so we just need to get the text of all its previous siblings
-                        # to get the corresponding definition. But before getting the definition
-                        # we have to reverse the siblings list, since the elements we get from the previous_siblings
-                        # property are in a reversed order.
-                    ]
-                )
-                definitions += definition.strip() + "\n"
-                if examples_text:
-                    examples += examples_text.strip() + "\n"
-            info += "\n" + definitions + "\n\n" + examples
-        return info
+                # the example list is the last thing that appears in def_tag,
+                # everything else is the definition
+                definition = "".join(tag.text for tag in def_tag if tag.name != "ul")
+                senses.append((definition_number, definition))
+            sections.append(
+                Section(grammatical_info.strip(), more_grammatical_info.strip(), senses, examples)
+            )
+        return Entry("fr.wiktionary", sections)
 
     def get_inflections(self):
+        if self.offline:
+            return super().get_inflections()
         return self.root
 
     # TODO: redirect to root only when user wants it.
     @classmethod
     def _get_pronunciation(cls, page: bs4.BeautifulSoup) -> tuple:
-        first_definition_set = page.select("ol:not(.references)")[0]
+        first_definition_set = cls._definition_lists(page)[0]
         ipa = first_definition_set.previous_sibling.find(class_="API").text
-        audio_tags = page.find_all("span", {"class": "audio-pronunciation"})
+        audio_tags = PageOutline.of(page).find_all("span", class_="audio-pronunciation")
         fr_audio_tags = filter(lambda el: "France" in el.text, audio_tags)
         fr_audio_links = map(lambda fr_el: fr_el.find("source")["src"], fr_audio_tags)
         # TODO: get the user to chose from the list of audios (maybe adding the region)
@@ -831,40 +1197,32 @@ class FRWiktionaryWord(Word):
             link = ""
         return (ipa, "http:" + link)
 
-    def _root_page(self) -> bs4.BeautifulSoup:
-        definitions_and_examples = self.page.select("ol:not(.references)")
+    @classmethod
+    def _root_word(cls, page: bs4.BeautifulSoup):
+        definitions_and_examples = cls._definition_lists(page)
         redirect_link = definitions_and_examples[0].find("a")
         # redirect_link.get("href") will be something like /wiki/femme
-        redirect_word = redirect_link.get("href").split("/")[-1]
-        page_request = SESSION.get(FRWIKTIONARY_URL + redirect_word, timeout=0.8)
-        page_request.raise_for_status()
-        base_word_page = bs4.BeautifulSoup(page_request.text, "html.parser")
-        is_inflection = self._is_inflection_without_own_definition(base_word_page)
-        if is_inflection:
-            return self._root_page(base_word_page)
-        base_word_page = self._only_relevant_part(base_word_page)
-        return (base_word_page, redirect_word)
+        return redirect_link.get("href").split("/")[-1]
 
     @classmethod
     def _is_inflection_without_own_definition(cls, page: bs4.BeautifulSoup) -> bool:
-        definitions_and_examples = page.select("ol:not(.references)")
+        definitions_and_examples = cls._definition_lists(page)
         if len(definitions_and_examples) > 1:
             return False
 
         for ol in definitions_and_examples:
-            gr_info_list = [
-                gr_info for gr_info in ol.previous_siblings if gr_info.name == "h3"
-            ]
-            return gr_info_list[0].text.startswith("Forme d")
+            return cls._grammatical_header(page, ol).text.startswith("Forme d")
 
 
 class ENFRWiktionaryWord(WiktionaryWord):
     lang_id = "French"
     pron_li_text = "audio"
+    offline_dictionary = ("en", "fr")
 
 
 class DEFRWiktionaryWord(DEWiktionaryWord):
     lang_id = "Französisch"
+    offline_dictionary = ("de", "fr")
 
 
 # Russian (English)
@@ -873,6 +1231,7 @@ class DEFRWiktionaryWord(DEWiktionaryWord):
 class ENRUWiktionaryWord(WiktionaryWord):
     lang_id = "Russian"
     pron_li_text = "Audio"
+    offline_dictionary = ("en", "ru")
 
     def _get_pronunciation(self, page):
         ipa, link = super()._get_pronunciation(page)